@@ -0,0 +1 @@
+""" Benchmarks for the performance critical parts of torpido """
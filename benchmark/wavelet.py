@@ -0,0 +1,267 @@
+"""
+Micro-benchmarks for the wavelet engine. Times the decomposition, reconstruction
+and thresholding of the FastWaveletTransform for every registered wavelet over
+1-D signals of 2^10 to 2^24 samples plus odd lengths and 2-D matrices, and
+reports the throughput (samples/s) and the peak memory of every case.
+
+Results can be saved as a JSON baseline and later runs compared against it,
+a case slower than the baseline by more than the tolerance is a regression.
+
+    python -m benchmark.wavelet --save baseline.json
+    python -m benchmark.wavelet --compare baseline.json --tolerance 0.2
+    python -m benchmark.wavelet --wavelets haar coif1 --max-power 16
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+from collections import namedtuple
+from time import perf_counter
+
+import numpy as np
+
+from torpido.wavelet import FastWaveletTransform, VisuShrinkCompressor
+from torpido.wavelet.wavelets import getAllWavelets
+
+# operations on the transform
+OPERATIONS = ("wavedec", "waverec", "threshold")
+
+# powers of 2 for the 1-D signal lengths
+MIN_POWER, MAX_POWER = 10, 24
+
+# lengths that are not a power of 2, run through the ancient egyptian decomposition
+ODD_LENGTHS = (1000, 44100, 100003, 1000001)
+
+# shapes of the 2-D signals
+SHAPES = ((32, 32), (128, 128), (512, 512), (100, 130))
+
+# single benchmark, shape is a tuple of the dimensions
+Case = namedtuple("Case", ("wavelet", "operation", "shape"))
+
+
+def getCases(wavelets=None, minPower=MIN_POWER, maxPower=MAX_POWER, oddLengths=ODD_LENGTHS, shapes=SHAPES,
+             operations=OPERATIONS):
+    """
+    Returns the cases to run, every wavelet for every length and operation.
+    Thresholding does not depend on the wavelet, so it is only run once per shape
+
+    Parameters
+    ----------
+    wavelets : list
+        names of the wavelets, all registered if None
+    minPower : int
+        shortest 1-D signal as a power of 2
+    maxPower : int
+        longest 1-D signal as a power of 2
+    oddLengths : iterable
+        1-D lengths that are not a power of 2
+    shapes : iterable
+        2-D shapes
+    operations : iterable
+        operations to run
+
+    Returns
+    -------
+    list
+        list of Case
+    """
+    wavelets = getAllWavelets() if wavelets is None else list(wavelets)
+    lengths = sorted([1 << power for power in range(minPower, maxPower + 1)] +
+                     [length for length in oddLengths if length <= (1 << maxPower)])
+    allShapes = [(length,) for length in lengths] + [tuple(shape) for shape in shapes]
+    cases = list()
+
+    for shape in allShapes:
+        for operation in operations:
+            if operation == "threshold":
+                cases.append(Case(None, operation, shape))
+                continue
+
+            for name in wavelets:
+                cases.append(Case(name, operation, shape))
+
+    return cases
+
+
+def getKey(case):
+    """ Returns the key of the case in the results, ex: coif1/wavedec/1024 or -/threshold/32x32 """
+    return "%s/%s/%s" % (case.wavelet or "-", case.operation, "x".join(str(size) for size in case.shape))
+
+
+def _prepare(case, transforms):
+    """ Returns a function running the case once, inputs are built outside the timing """
+    data = np.random.default_rng(0).standard_normal(case.shape)
+
+    if case.operation == "threshold":
+        coefficients = data.reshape(-1)
+        compressor = VisuShrinkCompressor()
+        return lambda: compressor.compress(coefficients.copy())
+
+    if case.wavelet not in transforms:
+        transforms[case.wavelet] = FastWaveletTransform(case.wavelet)
+    transform = transforms[case.wavelet]
+
+    if case.operation == "wavedec":
+        return lambda: transform.wavedec(data)
+
+    coefficients = transform.wavedec(data)
+    return lambda: transform.waverec(coefficients)
+
+
+def measure(case, repeat=3, transforms=None):
+    """
+    Runs a single case, the time is the best of repeat runs and the peak memory
+    is measured on a separate run, as tracing slows the allocations
+
+    Parameters
+    ----------
+    case : Case
+        case to run
+    repeat : int
+        no of timed runs
+    transforms : dict
+        transforms reused between the cases
+
+    Returns
+    -------
+    dict
+        seconds, samples per second and the peak memory in bytes
+    """
+    function = _prepare(case, dict() if transforms is None else transforms)
+    best = None
+
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples = int(np.prod(case.shape))
+    return {
+        "seconds": best,
+        "samplesPerSec": samples / best if best > 0 else float("inf"),
+        "peakMemory": peak
+    }
+
+
+def run(cases, repeat=3, log=None):
+    """
+    Runs all the cases
+
+    Parameters
+    ----------
+    cases : list
+        list of Case
+    repeat : int
+        no of timed runs per case
+    log : callable
+        called with the key and the result of every case
+
+    Returns
+    -------
+    dict
+        key of the case -> result
+    """
+    results, transforms = dict(), dict()
+
+    for case in cases:
+        results[getKey(case)] = result = measure(case, repeat, transforms)
+        if log is not None:
+            log(getKey(case), result)
+
+    return results
+
+
+def save(results, filename):
+    """ Writes the results as a JSON baseline along with the machine info """
+    with open(filename, "w") as file:
+        json.dump({
+            "machine": {"python": platform.python_version(), "numpy": np.__version__,
+                        "processor": platform.processor(), "system": platform.platform()},
+            "results": results
+        }, file, indent=2, sort_keys=True)
+
+
+def load(filename):
+    """ Reads the results from the JSON baseline """
+    with open(filename) as file:
+        return json.load(file)["results"]
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compares the results with the baseline, only the cases present in both are
+    compared
+
+    Parameters
+    ----------
+    results : dict
+        results of the current run
+    baseline : dict
+        results of the baseline
+    tolerance : float
+        allowed drop in the throughput, 0.2 is 20 percent
+
+    Returns
+    -------
+    list
+        (key, baseline samples/s, current samples/s, ratio) for every regression
+    """
+    regressions = list()
+
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+
+        ratio = result["samplesPerSec"] / baseline[key]["samplesPerSec"]
+        if ratio < 1. - tolerance:
+            regressions.append((key, baseline[key]["samplesPerSec"], result["samplesPerSec"], ratio))
+
+    return regressions
+
+
+def _print(key, result):
+    """ Prints the result of a single case """
+    print("%-36s %14.0f samples/s %10.4f s %10.2f MB" % (key, result["samplesPerSec"], result["seconds"],
+                                                        result["peakMemory"] / (1 << 20)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Wavelet engine micro-benchmarks")
+    parser.add_argument("--wavelets", nargs="*", default=None, help="wavelets to run, default all")
+    parser.add_argument("--operations", nargs="*", default=OPERATIONS, choices=OPERATIONS)
+    parser.add_argument("--min-power", type=int, default=MIN_POWER, help="shortest signal 2^n")
+    parser.add_argument("--max-power", type=int, default=MAX_POWER, help="longest signal 2^n")
+    parser.add_argument("--no-2d", action="store_true", help="skip the 2-D signals")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--save", metavar="JSON", help="save the results as the baseline")
+    parser.add_argument("--compare", metavar="JSON", help="compare the results with the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed drop in throughput")
+    args = parser.parse_args(argv)
+
+    cases = getCases(args.wavelets, args.min_power, args.max_power,
+                     shapes=() if args.no_2d else SHAPES, operations=args.operations)
+    results = run(cases, args.repeat, log=_print)
+
+    if args.save:
+        save(results, args.save)
+
+    if args.compare:
+        regressions = compare(results, load(args.compare), args.tolerance)
+        for key, before, after, ratio in regressions:
+            print("REGRESSION %-36s %14.0f -> %14.0f samples/s (%.0f%%)" % (key, before, after, ratio * 100))
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import os
+import tempfile
+import unittest
+
+from benchmark import wavelet
+
+
+class WaveletBenchmarkTest(unittest.TestCase):
+    def test_cases(self):
+        cases = wavelet.getCases(["haar", "db2"], 10, 11, oddLengths=(1000,), shapes=((32, 32),))
+
+        # 4 shapes * (2 wavelets * 2 operations + threshold)
+        self.assertEqual(20, len(cases))
+        self.assertEqual("haar/wavedec/1000", wavelet.getKey(cases[0]))
+
+    def test_run_save_compare(self):
+        cases = wavelet.getCases(["haar"], 10, 10, oddLengths=(), shapes=((8, 8),))
+        results = wavelet.run(cases, repeat=1)
+        filename = os.path.join(tempfile.mkdtemp(), "baseline.json")
+        wavelet.save(results, filename)
+
+        self.assertEqual(len(cases), len(results))
+        self.assertEqual(results, wavelet.load(filename))
+        self.assertListEqual([], wavelet.compare(results, results))
+        self.assertEqual(len(cases), len(wavelet.compare(results, results, tolerance=-1.)))
+
+
+if __name__ == '__main__':
+    unittest.main()
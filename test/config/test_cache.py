@@ -1,9 +1,26 @@
+import time
 import unittest
+from multiprocessing import Pool, Process
+
+import numpy as np
 
 from torpido.config.cache import *
 from torpido.tools.ranking import Ranking
 
 
+def _hammer(worker):
+    cache = Cache()
+    for i in range(20):
+        cache.write_data(f"hammer_{worker}_{i}", np.full(100, worker * 100 + i))
+        cache.write_data("hammer_shared", [worker] * 1000)
+        cache.update_data("hammer_count", lambda count: count + 1, default=0)
+        cache.update_data("hammer_dict", lambda data: dict(data, **{f"{worker}_{i}": i}), default=dict())
+
+
+def _write_job_key():
+    Cache().write_data("job_key", os.getpid())
+
+
 class CacheTest(unittest.TestCase):
     def test_read_write_dtype(self):
         cache = Cache()
@@ -25,6 +42,94 @@ class CacheTest(unittest.TestCase):
 
         self.assertEqual(type(obg), type(cache))
 
+    def test_read_write_array(self):
+        cache = Cache()
+        cache.write_data("array", np.arange(10, dtype=np.float32))
+        arr = cache.read_data("array")
+
+        self.assertIsInstance(arr, np.memmap)
+        self.assertEqual(np.float32, arr.dtype)
+        self.assertFalse(arr.flags.writeable)
+        np.testing.assert_array_equal(np.arange(10), arr)
+
+        cache.write_data("empty", np.empty(0))
+        self.assertEqual(0, len(cache.read_data("empty")))
+
+    def test_overwrite(self):
+        cache = Cache()
+        cache.write_data("over", np.ones(5))
+        cache.write_data("over", [1, 2])
+
+        self.assertListEqual([1, 2], cache.read_data("over"))
+        self.assertFalse(any(key.endswith(TMP_SUFFIX) for key in os.listdir(os.path.join(CACHE_DIR, CACHE_NAME))))
+
+    def test_keys_delete(self):
+        cache = Cache()
+        cache.write_data("some/key with:chars", 1)
+
+        self.assertIn("some/key with:chars", cache.keys())
+        self.assertEqual(1, cache.read_data("some/key with:chars"))
+
+        cache.delete_data("some/key with:chars")
+        self.assertNotIn("some/key with:chars", cache.keys())
+        self.assertIsNone(cache.read_data("some/key with:chars"))
+
+        # the lock of the key goes with it
+        store = os.path.join(CACHE_DIR, CACHE_NAME)
+        self.assertFalse(any(name.startswith("some") for name in os.listdir(store)))
+
+    def test_concurrent_writes(self):
+        cache, workers = Cache(), 8
+        for key in ("hammer_count", "hammer_dict"):
+            cache.delete_data(key)
+
+        with Pool(workers) as pool:
+            pool.map(_hammer, range(workers))
+
+        # no update is lost and the last write wins as a whole
+        self.assertEqual(workers * 20, cache.read_data("hammer_count"))
+        self.assertEqual(workers * 20, len(cache.read_data("hammer_dict")))
+        self.assertEqual(1, len(set(cache.read_data("hammer_shared"))))
+
+        for worker in range(workers):
+            for i in range(20):
+                self.assertEqual(worker * 100 + i, cache.read_data(f"hammer_{worker}_{i}")[-1])
+                cache.delete_data(f"hammer_{worker}_{i}")
+
+    def test_namespaces(self):
+        first, second = new_namespace(), new_namespace()
+        self.assertNotEqual(first, second)
+
+        try:
+            set_namespace(first)
+            self.assertEqual(first, get_namespace())
+            job = Process(target=_write_job_key)
+            job.start()
+            job.join()
+            Cache().write_data("FPS", 1)
+
+            set_namespace(second)
+            Cache().write_data("FPS", 2)
+        finally:
+            set_namespace(None)
+
+        self.assertEqual(CACHE_NAME, get_namespace())
+        self.assertEqual(job.pid, Cache(first).read_data("job_key"))
+        self.assertEqual(1, Cache(first).read_data("FPS"))
+        self.assertEqual(2, Cache(second).read_data("FPS"))
+        self.assertIsNone(Cache(second).read_data("job_key"))
+
+        # clean up of a job leaves the others
+        Cache(first).clear()
+        self.assertIsNone(Cache(first).read_data("FPS"))
+        self.assertEqual(2, Cache(second).read_data("FPS"))
+
+        # abandoned jobs are removed
+        path = os.path.join(CACHE_DIR, second)
+        os.utime(path, (time.time() - CACHE_MAX_AGE - 10,) * 2)
+        self.assertIn(second, remove_stale_namespaces())
+        self.assertFalse(os.path.isdir(path))
+
     def test_ranking(self):
         Cache().write_data(CACHE_FPS, 20)
         Cache().write_data(CACHE_FRAME_COUNT, 600)
@@ -35,6 +140,10 @@ class CacheTest(unittest.TestCase):
 
         self.assertEqual(4, len(Ranking.ranks()))
 
+        # stored once as an array, read back memory mapped
+        self.assertIsInstance(Ranking.get("CACHE_RANK_BLUR"), np.memmap)
+        np.testing.assert_array_equal([1, 1, 1, 6, 7], Ranking.get("CACHE_RANK_BLUR"))
+
 
 if __name__ == '__main__':
     unittest.main()
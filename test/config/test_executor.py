@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+
+from torpido.tools.ffmpeg import FFmpegExecutor, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, _requested_threads, \
+    _with_threads
+
+COMMAND = ["ffmpeg", "-y", "-i", "in.mp4", "out.mp4"]
+
+
+def _wait_queued(executor, queued):
+    """ Waits for the jobs to be in the queue """
+    for _ in range(200):
+        if executor.stats()["queued"] == queued:
+            return
+        time.sleep(0.01)
+
+
+class ExecutorTest(unittest.TestCase):
+    def test_threads(self):
+        # no filters, only the threads of the encoding
+        self.assertEqual(["ffmpeg", "-y", "-i", "in.mp4", "-threads", "3", "out.mp4"], _with_threads(COMMAND, 3))
+
+        command = _with_threads(["ffmpeg", "-i", "in.mp4", "-vf", "scale=w=1:h=1", "out.mp4"], 3)
+        self.assertEqual(["ffmpeg", "-filter_threads", "3"], command[:3])
+
+        command = _with_threads(["ffmpeg", "-i", "in.mp4", "-filter_complex", "[0]scale=w=1:h=1[L0]", "-threads",
+                                 "8", "out.mp4"], 2)
+        self.assertEqual(["ffmpeg", "-filter_complex_threads", "2"], command[:3])
+        self.assertEqual(["-threads", "2", "out.mp4"], command[-3:])
+
+        # the last -threads is the one of the encoding, the one of the decoding is kept
+        command = ["ffmpeg", "-threads", "1", "-i", "in.mp4", "-threads", "6", "out.mp4"]
+        self.assertEqual(6, _requested_threads(command))
+        self.assertEqual(["ffmpeg", "-threads", "1", "-i", "in.mp4", "-threads", "2", "out.mp4"],
+                         _with_threads(command, 2))
+
+        executor = FFmpegExecutor(jobs=3, cores=8)
+        self.assertEqual(8, executor.threads(1))
+        self.assertEqual(2, executor.threads(4))
+
+    def test_core_budget(self):
+        executor = FFmpegExecutor(jobs=4, cores=4)
+
+        # a job without -threads running alone has all the cores, its command is left as it is
+        with executor.job(COMMAND) as command:
+            self.assertEqual(COMMAND, command)
+
+        # the share is among the jobs running and waiting, the next waits for the cores
+        with executor.job(COMMAND[:-1] + ["-threads", "2", "out.mp4"]):
+            with executor.job(COMMAND) as command:
+                self.assertEqual(["-threads", "2"], command[-3:-1])
+
+                done = list()
+
+                def run():
+                    with executor.job(COMMAND) as waited:
+                        done.extend(waited[-3:-1])
+
+                thread = threading.Thread(target=run)
+                thread.start()
+                _wait_queued(executor, 1)
+                self.assertEqual([], done)
+                self.assertEqual(2, executor.stats()["running"])
+
+            thread.join(5)
+            self.assertEqual(["-threads", "2"], done)
+
+        # jobs asking for their share run at the same time
+        with executor.job(COMMAND[:-1] + ["-threads", "1", "out.mp4"]):
+            with executor.job(COMMAND[:-1] + ["-threads", "2", "out.mp4"]) as command:
+                self.assertEqual(2, executor.stats()["running"])
+                self.assertEqual("2", command[command.index("-threads") + 1])
+
+    def test_interrupted(self):
+        executor = FFmpegExecutor(jobs=1, cores=2)
+
+        with executor.job(COMMAND):
+            with mock.patch.object(threading.Event, "wait", side_effect=KeyboardInterrupt):
+                with self.assertRaises(KeyboardInterrupt):
+                    with executor.job(COMMAND):
+                        self.fail("an interrupted job should not run")
+
+        # the interrupted job left the queue, the next runs
+        with executor.job(COMMAND):
+            self.assertEqual((1, 0), (executor.stats()["running"], executor.stats()["queued"]))
+
+    def test_priority(self):
+        executor, order = FFmpegExecutor(jobs=1, cores=2), list()
+
+        def run(priority):
+            with executor.job(COMMAND, priority):
+                order.append(priority)
+
+        with executor.job(COMMAND):
+            threads = list()
+            for priority in (PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_HIGH):
+                threads.append(threading.Thread(target=run, args=(priority,)))
+                threads[-1].start()
+                _wait_queued(executor, len(threads))
+
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual([PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW], order)
+
+        stats = executor.stats()
+        self.assertEqual((4, 0, 0), (stats["jobs"], stats["running"], stats["queued"]))
+        self.assertGreater(stats["wait"], 0)
+
+    def test_cancel(self):
+        executor = FFmpegExecutor(jobs=1, cores=2)
+
+        async def queued():
+            async with executor.job_async(COMMAND):
+                self.fail("a cancelled job should not run")
+
+        async def main():
+            async with executor.job_async(COMMAND):
+                task = asyncio.ensure_future(queued())
+                await asyncio.sleep(0.05)
+                self.assertEqual(1, executor.stats()["queued"])
+
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+            async with executor.job_async(COMMAND) as command:
+                self.assertEqual(COMMAND, command)
+
+        asyncio.run(main())
+        self.assertEqual(0, executor.stats()["running"])
+
+
+if __name__ == '__main__':
+    unittest.main()
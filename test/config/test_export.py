@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from torpido.config.cache import Cache, new_namespace, set_namespace
+from torpido.config.constants import *
+from torpido.tools import export as export_module
+from torpido.tools.export import export, timecode
+from torpido.tools.ranking import Ranking
+
+
+class ExportTest(unittest.TestCase):
+    def setUp(self):
+        set_namespace(new_namespace())
+        self.output = tempfile.mkdtemp()
+
+        cache = Cache()
+        cache.write_data(CACHE_FPS, 25)
+        cache.write_data(CACHE_FRAME_COUNT, 100)
+        Ranking.add(CACHE_RANK_MOTION, [1, 1, 0, 0])
+        Ranking.add(CACHE_RANK_BLUR, [1, 0, 0, 0])
+        Ranking.add(CACHE_RANK_TEXT, [0, 0, 0, 0])
+        Ranking.add(CACHE_RANK_AUDIO, [3, 3, 0, 3])
+
+        # raw features, 25 frames per bin and the audio per bin
+        cache.write_data(CACHE_FEATURE_MOTION, np.repeat(np.arange(4, dtype=np.uint8), 25))
+        cache.write_data(CACHE_FEATURE_AUDIO, np.array([0.5, 0.25, 0.0]))
+
+    def tearDown(self):
+        Cache().clear()
+        set_namespace(None)
+        for name in os.listdir(self.output):
+            os.unlink(os.path.join(self.output, name))
+        os.rmdir(self.output)
+
+    def test_timecode(self):
+        self.assertEqual("00:00:00:00", timecode(0, 25))
+        self.assertEqual("01:01:01:10", timecode(3661.4, 25))
+        self.assertEqual("00:00:01:15", timecode(1.5, 30000 / 1001))
+
+    def test_export(self):
+        written = export(os.path.join("videos", "clip.mp4"), [[0, 2], [3, 4]], self.output)
+        self.assertEqual(os.path.join(self.output, "clip_features.npz"), written[0])
+
+        with np.load(written[0]) as table:
+            np.testing.assert_array_equal([0, 1, 2, 3], table["time"])
+            np.testing.assert_array_equal([1, 1, 0, 0], table["motion"])
+            np.testing.assert_array_equal([5, 4, 0, 3], table["rank"])
+
+            # raw values of the bins, missing ones are NaN
+            np.testing.assert_array_equal([0, 1, 2, 3], table["motion_raw"])
+            np.testing.assert_array_equal([0.5, 0.25, 0.0, np.nan], table["audio_raw"])
+            self.assertTrue(np.isnan(table["blur_raw"]).all())
+            np.testing.assert_array_equal([[0, 2], [3, 4]], table["timestamps"])
+
+        with open(os.path.join(self.output, "clip_cuts.json")) as file:
+            cuts = json.load(file)
+        self.assertEqual(25, cuts["fps"])
+        self.assertEqual([{"start": 0, "end": 2, "duration": 2}, {"start": 3, "end": 4, "duration": 1}],
+                         cuts["cuts"])
+
+        with open(os.path.join(self.output, "clip_cuts.edl")) as file:
+            edl = file.read().splitlines()
+        self.assertEqual("TITLE: clip", edl[0])
+        self.assertTrue(edl[3].startswith("001 "))
+        self.assertTrue(edl[6].endswith("00:00:03:00 00:00:04:00 00:00:02:00 00:00:03:00"))
+
+        # parquet only with pyarrow
+        parquet = os.path.join(self.output, "clip_features.parquet")
+        self.assertEqual(export_module.pyarrow is not None, parquet in written)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import time
+import unittest
+
+import numpy as np
+
+from torpido.config.cache import Cache, new_namespace, set_namespace
+from torpido.config.constants import CACHE_DIR, CACHE_FPS
+from torpido.tools.feature_cache import FeatureCache, content_hash
+from torpido.tools.ranking import Ranking
+
+
+class FeatureCacheTest(unittest.TestCase):
+    def setUp(self):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        self.file = os.path.join(CACHE_DIR, "feature_input.bin")
+        with open(self.file, "wb") as f:
+            f.write(np.arange(1 << 19, dtype=np.int32).tobytes())
+
+        self.features = FeatureCache(max_size=1, enabled=True)
+        self.features.clear()
+
+    def tearDown(self):
+        self.features.clear()
+        os.unlink(self.file)
+
+    def test_content_hash(self):
+        first = content_hash(self.file)
+        self.assertEqual(first, content_hash(self.file))
+
+        # a change in a sampled block changes the hash
+        with open(self.file, "r+b") as f:
+            f.write(b"\xff" * 8)
+        self.assertNotEqual(first, content_hash(self.file))
+
+    def test_key(self):
+        key = FeatureCache.key(self.file, "visual", {"a": 1, "b": 2})
+
+        self.assertEqual(key, FeatureCache.key(self.file, "visual", {"b": 2, "a": 1}))
+        self.assertNotEqual(key, FeatureCache.key(self.file, "visual", {"a": 1, "b": 3}))
+        self.assertNotEqual(key, FeatureCache.key(self.file, "textual", {"a": 1, "b": 2}))
+
+    def test_get_put(self):
+        key = FeatureCache.key(self.file, "visual", {})
+        self.assertIsNone(self.features.get(key))
+
+        self.features.put(key, {"cache": {CACHE_FPS: 25}, "rank": {"FEATURE_RANK": [1, 2]}})
+        entry = self.features.get(key)
+        self.assertEqual([1, 2], entry["rank"]["FEATURE_RANK"])
+        self.assertEqual({"hits": 1, "misses": 1}, self.features.stats())
+
+        try:
+            set_namespace(new_namespace())
+            FeatureCache.restore(entry)
+            self.assertEqual(25, Cache().read_data(CACHE_FPS))
+            np.testing.assert_array_equal([1, 2], Ranking.get("FEATURE_RANK"))
+            self.assertEqual({"hits": 0, "misses": 0}, Cache().read_data("CACHE_FEATURE_STATS") or
+                             {"hits": 0, "misses": 0})
+        finally:
+            Cache().clear()
+            set_namespace(None)
+
+        # disabled cache always misses
+        self.assertIsNone(FeatureCache(enabled=False).get(key))
+
+    def test_evict(self):
+        keys = [FeatureCache.key(self.file, "visual", {"i": i}) for i in range(4)]
+        for i, key in enumerate(keys[:-1]):
+            self.features.put(key, {"rank": {"FEATURE_RANK": np.zeros(1 << 15)}})
+            os.utime(os.path.join(CACHE_DIR, ".vea_features", key), (time.time() - 100 + i,) * 2)
+
+        # 3 of the 256KB entries fit in 1MB, first one is used so the second is the least recent
+        self.features.get(keys[0])
+        self.features.put(keys[-1], {"rank": {"FEATURE_RANK": np.zeros(1 << 15)}})
+
+        self.assertIsNotNone(self.features.get(keys[-1]))
+        self.assertIsNotNone(self.features.get(keys[0]))
+        self.assertIsNone(self.features.get(keys[1]))
+
+    def test_arrays(self):
+        features, key = FeatureCache(enabled=True), FeatureCache.key(self.file, "auditory", {})
+        audio = np.arange(1 << 10, dtype=np.int16)
+
+        # the array is a .npy file next to the entry, not pickled in it
+        features.put(key, {"rate": 16000}, arrays={"audio": audio, CACHE_FPS: np.zeros(2)})
+        entry = features.get(key)
+        self.assertEqual(["FPS", "audio"], sorted(entry["arrays"]))
+        self.assertIsInstance(entry["arrays"]["audio"], np.memmap)
+        np.testing.assert_array_equal(audio, features.array(key, "audio"))
+        self.assertLess(os.path.getsize(os.path.join(CACHE_DIR, ".vea_features", key)), audio.nbytes)
+
+        # only the arrays asked for go to the cache of the job
+        try:
+            set_namespace(new_namespace())
+            FeatureCache.restore(entry, arrays=(CACHE_FPS,))
+            self.assertEqual([CACHE_FPS], Cache().keys())
+        finally:
+            Cache().clear()
+            set_namespace(None)
+
+        # the array is evicted with the entry
+        self.assertEqual([key], FeatureCache(max_size=0, enabled=True).evict())
+        self.assertIsNone(features.array(key, "audio"))
+
+        # the entry is a miss without its array
+        features.put(key, {"rate": 16000}, arrays={"audio": audio})
+        os.unlink(os.path.join(CACHE_DIR, ".vea_features", key + ".audio"))
+        self.assertIsNone(features.get(key))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+
+import numpy as np
+
+from torpido.config.cache import Cache, new_namespace, set_namespace
+from torpido.config.config import Config
+from torpido.config.constants import *
+from torpido.tools.features import FeatureArray, per_bin, rank, rerank
+from torpido.tools.ranking import Ranking
+
+
+class FeaturesTest(unittest.TestCase):
+    def setUp(self):
+        set_namespace(new_namespace())
+
+    def tearDown(self):
+        Cache().clear()
+        set_namespace(None)
+
+    def test_per_bin(self):
+        values, fps, frame_count = np.random.default_rng(0).integers(0, 4, 107), 10, 110
+
+        # same as the loop over the frames
+        expected = list()
+        for i in range(0, frame_count, fps):
+            if len(values) >= (i + fps):
+                expected.append(np.mean(values[i: i + fps]))
+            else:
+                break
+
+        np.testing.assert_array_equal(expected, per_bin(values, fps, frame_count, 1))
+        self.assertEqual(3, len(per_bin(values, fps, 25, 1)))
+
+        # bins of 250ms at 29.97 fps follow the time of the frames
+        values, fps = np.random.default_rng(1).random(3000), 30000 / 1001
+        index = np.floor(np.arange(3000) / (fps * 0.25)).astype(int)
+        expected = [values[index == i].mean() for i in range(int(3000 / (fps * 0.25)))]
+        np.testing.assert_allclose(expected, per_bin(values, fps, resolution=0.25))
+
+        # bins shorter than a frame repeat the frame
+        np.testing.assert_array_equal([1, 1, 1, 1, 2, 2, 2, 2], per_bin([1, 2], 5, resolution=0.05))
+
+    def test_feature_array(self):
+        array = FeatureArray(np.uint8, chunk_size=4)
+        self.assertEqual(0, len(array.array()))
+
+        for value in range(6):
+            array.append(value)
+        array.append(9, repeat=7)
+
+        values = array.array()
+        self.assertEqual(np.uint8, values.dtype)
+        np.testing.assert_array_equal([0, 1, 2, 3, 4, 5] + [9] * 7, values)
+        del values
+        array.close()
+
+    def test_per_bin_chunks(self):
+        values = np.random.default_rng(2).random(1000)
+
+        # same means whatever the size of the chunks
+        for fps in (10, 30000 / 1001):
+            np.testing.assert_allclose(per_bin(values, fps, resolution=0.5),
+                                       per_bin(values, fps, resolution=0.5, chunk_size=7))
+
+        np.testing.assert_array_equal(per_bin(values > 0.5, 10), per_bin(values, 10, chunk_size=3,
+                                                                          transform=lambda chunk: chunk > 0.5))
+
+    def test_rank(self):
+        motion = np.array([0, 10, 50, 51, 255], dtype=np.uint8)
+        np.testing.assert_array_equal([0, 0, 0, 3, 3], rank(CACHE_FEATURE_MOTION, motion,
+                                                            {"MOTION_THRESHOLD": 50, "RANK_MOTION": 3}))
+
+        blur = np.array([10., 500., 900.])
+        np.testing.assert_array_equal([2, 0, 0], rank(CACHE_FEATURE_BLUR, blur,
+                                                      {"BLUR_THRESHOLD": 500, "RANK_BLUR": 2}))
+
+        text = np.array([0.2, 0.5, 0.9], dtype=np.float32)
+        np.testing.assert_array_equal([0, Config.RANK_TEXT, Config.RANK_TEXT],
+                                      rank(CACHE_FEATURE_TEXT, text, {"TEXT_MIN_CONFIDENCE": 0.5}))
+
+    def test_rerank(self):
+        cache = Cache()
+        cache.write_data(CACHE_FPS, 2)
+        cache.write_data(CACHE_FRAME_COUNT, 6)
+        cache.write_data(CACHE_FEATURE_MOTION, np.array([0, 90, 90, 90, 0, 0], dtype=np.uint8))
+        cache.write_data(CACHE_FEATURE_TEXT, np.empty(0, dtype=np.float32))
+        cache.write_data(CACHE_FEATURE_AUDIO, np.array([0.001, 0.5, 0.5]))
+
+        ranks = rerank(settings={"MOTION_THRESHOLD": 50, "RANK_MOTION": 2, "SILENCE_THRESHOLD": 0.1, "RANK_AUDIO": 3})
+        np.testing.assert_array_equal([1., 2., 0.], ranks[CACHE_RANK_MOTION])
+        np.testing.assert_array_equal([0., 0., 0.], ranks[CACHE_RANK_TEXT])
+        np.testing.assert_array_equal([0, 3, 3], ranks[CACHE_RANK_AUDIO])
+        self.assertNotIn(CACHE_RANK_BLUR, ranks)
+        np.testing.assert_array_equal([1., 2., 0.], Ranking.get(CACHE_RANK_MOTION))
+
+        # only the threshold changed, no re-run
+        ranks = rerank((CACHE_FEATURE_MOTION,), settings={"MOTION_THRESHOLD": 95}, save=False)
+        np.testing.assert_array_equal([0., 0., 0.], ranks[CACHE_RANK_MOTION])
+        np.testing.assert_array_equal([1., 2., 0.], Ranking.get(CACHE_RANK_MOTION))
+
+
+if __name__ == '__main__':
+    unittest.main()
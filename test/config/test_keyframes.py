@@ -0,0 +1,54 @@
+import os
+import unittest
+
+import numpy as np
+
+from torpido.config.constants import CACHE_DIR
+from torpido.tools.feature_cache import FeatureCache
+from torpido.tools.keyframes import KeyframeIndex
+
+
+class KeyframeIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = KeyframeIndex([4.0, 0.0, 2.0, 10.0])
+
+    def test_times(self):
+        np.testing.assert_array_equal([0, 2, 4, 10], self.index.times)
+        self.assertFalse(self.index.times.flags.writeable)
+        self.assertEqual(4, len(self.index))
+
+    def test_lookups(self):
+        self.assertEqual(1, self.index.before(3.9))
+        self.assertEqual(2, self.index.before(4.0))
+        self.assertEqual(-1, self.index.before(-1))
+        self.assertEqual(2, self.index.after(2.1))
+        self.assertEqual(4, self.index.after(11))
+
+        self.assertEqual(4.0, self.index.nearest(5))
+        self.assertEqual(2.0, self.index.nearest(3))
+        self.assertEqual(10.0, self.index.nearest(50))
+        np.testing.assert_array_equal([0, 4, 10], self.index.nearest(np.array([-1, 6.9, 7.1])))
+
+        self.assertEqual(4.0, self.index.snap(4.4, 0.5))
+        self.assertEqual(4.6, self.index.snap(4.6, 0.5))
+        self.assertEqual(1.0, KeyframeIndex([]).snap(1.0, 0.5))
+
+    def test_load_cached(self):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        video = os.path.join(CACHE_DIR, "keyframes_input.bin")
+        with open(video, "wb") as f:
+            f.write(b"\0" * 1024)
+
+        features = FeatureCache(enabled=True)
+        key = features.key(video, "keyframes", {"mtime": os.stat(video).st_mtime_ns})
+        try:
+            # an index in the cache is not probed again
+            features.put(key, dict(), arrays={"keyframes": np.array([0.0, 5.0])})
+            np.testing.assert_array_equal([0, 5], KeyframeIndex.load(video, features).times)
+        finally:
+            features.clear()
+            os.unlink(video)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import unittest
+
+from torpido.config.cache import Cache, new_namespace, set_namespace
+from torpido.tools.media_info import MediaInfo
+
+PROBE = {
+    "streams": [
+        {"codec_type": "video", "codec_name": "h264", "pix_fmt": "yuv420p", "width": 1280, "height": 720,
+         "sample_aspect_ratio": "1:1", "display_aspect_ratio": "16:9", "r_frame_rate": "30000/1001",
+         "avg_frame_rate": "30000/1001", "time_base": "1/30000", "nb_frames": "300", "profile": "High",
+         "level": 31},
+        {"codec_type": "audio", "codec_name": "aac", "sample_rate": "48000", "channels": 2,
+         "channel_layout": "stereo"}
+    ],
+    "format": {"duration": "10.010000"}
+}
+
+
+class MediaInfoTest(unittest.TestCase):
+    def setUp(self):
+        set_namespace(new_namespace())
+
+    def tearDown(self):
+        Cache().clear()
+        set_namespace(None)
+
+    def test_from_probe(self):
+        info = MediaInfo.from_probe(__file__, PROBE)
+
+        self.assertEqual(os.path.abspath(__file__), info.file_name)
+        self.assertAlmostEqual(29.97, info.fps, places=2)
+        self.assertEqual((300, 1280, 720, "16:9"), (info.frame_count, info.width, info.height, info.dar))
+        self.assertEqual((48000, 2, "stereo"), (info.sample_rate, info.channels, info.channel_layout))
+        self.assertEqual(10.01, info.duration)
+        self.assertEqual(("High", 31), (info.profile, info.level))
+        self.assertTrue(info.has_audio)
+
+        # frames estimated from the duration, no audio stream
+        info = MediaInfo.from_probe(__file__, {"streams": [dict(PROBE["streams"][0], nb_frames="N/A")],
+                                               "format": PROBE["format"]})
+        self.assertEqual(300, info.frame_count)
+        self.assertFalse(info.has_audio)
+
+    def test_save_load(self):
+        self.assertIsNone(MediaInfo.load())
+
+        info = MediaInfo.from_probe(__file__, PROBE).save()
+        self.assertEqual(info, MediaInfo.load(__file__))
+        self.assertIsNone(MediaInfo.load("other.mp4"))
+
+        # info of the job is not probed again
+        self.assertEqual(info, MediaInfo.get(__file__))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,21 @@
 import unittest
 
+import numpy as np
+
+from torpido.config.cache import Cache, new_namespace, set_namespace
+from torpido.config.config import Config
+from torpido.config.constants import CACHE_FPS, CACHE_FRAME_COUNT
 from torpido.tools.ranking import Ranking
 
 
 class CacheTest(unittest.TestCase):
     def test_add(self):
         Ranking.add("MOTION", [1, 2, 3])
-        self.assertEqual(list, type(Ranking.get("MOTION")))
+        self.assertIsInstance(Ranking.get("MOTION"), np.ndarray)
 
     def test_get(self):
         self.assertEqual(None, Ranking.get("NO_SUCH"))
-        self.assertEqual(list, type(Ranking.get("MOTION")))
+        self.assertIsInstance(Ranking.get("MOTION"), np.ndarray)
 
     def test_ranks(self):
         self.assertEqual(4, len(Ranking.ranks()))
@@ -26,5 +31,70 @@ class CacheTest(unittest.TestCase):
         self.assertEqual(int, type(Ranking.get_thumbnail_sec()))
 
 
+class RankingEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.min_rank, Config.MIN_RANK_OUT_VIDEO = Config.MIN_RANK_OUT_VIDEO, 3
+        set_namespace(new_namespace())
+        Cache().write_data(CACHE_FPS, 1)
+        Cache().write_data(CACHE_FRAME_COUNT, 8)
+        for key, rank in zip(Ranking.KEYS, ([0, 2, 2, 0, 2, 2, 2, 0], [0] * 8, [0, 1, 1, 0, 0, 2, 2, 0], [1] * 6)):
+            Ranking.add(key, rank)
+
+    def tearDown(self):
+        Cache().clear()
+        set_namespace(None)
+        Config.MIN_RANK_OUT_VIDEO = self.min_rank
+
+    def test_matrix(self):
+        matrix = Ranking.matrix()
+
+        self.assertEqual((4, 8), matrix.shape)
+        self.assertIs(matrix, Ranking.matrix())
+        np.testing.assert_array_equal([1, 4, 4, 1, 3, 5, 5, 1], Ranking.sum_ranks())
+        np.testing.assert_array_equal([0, 2, 2, 0, 2, 2, 2, 0], Ranking.sum_ranks([1, 0, 0, 0]))
+
+    def test_timestamps(self):
+        self.assertListEqual([[1, 2], [5, 6]], Ranking.get_timestamps())
+        self.assertEqual(2, Ranking.get_video_length())
+
+        # new rank is picked up
+        Ranking.add(Ranking.KEYS[1], [4] * 8)
+        self.assertListEqual([[0, 8]], Ranking.get_timestamps())
+
+    def test_hysteresis(self):
+        ranks = [0, 4, 3, 2, 4, 1, 2, 2, 0]
+
+        self.assertListEqual([[1, 1], [4, 4]], Ranking._trim_by_rank(ranks))
+        self.assertListEqual([[1, 4]], Ranking._trim_by_rank(ranks, hysteresis=2))
+
+    def test_post_process(self):
+        ranks = np.array([5, 5, 0, 5, 0, 0, 0, 9, 9, 9, 0, 5, 5, 5, 5, 5])
+        timestamps = Ranking._trim_by_rank(ranks)
+        self.assertListEqual([[0, 1], [3, 3], [7, 9], [11, 16]], timestamps)
+
+        # the empty segment is always dropped
+        self.assertListEqual([[0, 1], [7, 9], [11, 16]], Ranking._post_process(timestamps, ranks))
+        self.assertListEqual([[0, 3], [7, 16]], Ranking._post_process(timestamps, ranks, merge_gap=2))
+        self.assertListEqual([[11, 16]], Ranking._post_process(timestamps, ranks, min_length=3))
+        self.assertListEqual([[7, 9], [11, 16]], Ranking._post_process(timestamps, ranks, max_count=2))
+
+    def test_resolution(self):
+        resolution, Config.RANK_RESOLUTION = Config.RANK_RESOLUTION, 0.5
+        try:
+            # 8 frames at 1 fps are 16 bins, ranks are per bin
+            self.assertEqual((4, 16), Ranking.matrix().shape)
+            self.assertListEqual([[0.5, 1.0], [2.5, 3.0]], Ranking.get_timestamps())
+            self.assertIsInstance(Ranking.get_thumbnail_sec(), float)
+        finally:
+            Config.RANK_RESOLUTION = resolution
+
+    def test_segment_settings(self):
+        merge_gap, Config.SEGMENT_MERGE_GAP = Config.SEGMENT_MERGE_GAP, 3
+        try:
+            self.assertListEqual([[1, 6]], Ranking.get_timestamps())
+        finally:
+            Config.SEGMENT_MERGE_GAP = merge_gap
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,128 @@
+import os
+import unittest
+from unittest import mock
+
+from torpido.config.config import Config
+from torpido.tools import ffmpeg
+from torpido.exceptions.custom import FFmpegProcessException
+from torpido.tools.ffmpeg import (_build_concat_command, _build_cut_audio_command, _build_parallel_piece_command,
+                                  _build_piece_command, _get_encoder, _piece_segments, _plan_smart_render,
+                                  _render_workers)
+from torpido.tools.keyframes import KeyframeIndex
+from torpido.tools.media_info import MediaInfo
+
+PROBE = {
+    "streams": [{"codec_type": "video", "codec_name": "h264", "pix_fmt": "yuv420p", "profile": "High", "level": 31,
+                 "width": 1280, "height": 720, "sample_aspect_ratio": "1:1", "r_frame_rate": "30000/1001",
+                 "avg_frame_rate": "30000/1001", "time_base": "1/30000"}],
+    "format": {"duration": "10.0"}
+}
+
+KEYFRAMES = KeyframeIndex([0.0, 2.0, 4.0, 6.0, 8.0, 10.0, 12.5, 20.0, 24.0, 28.0, 30.0])
+
+
+class SmartRenderTest(unittest.TestCase):
+    def test_plan(self):
+        pieces = _plan_smart_render([[1, 9], [12, 13]], KEYFRAMES)
+
+        # partial GOPs at the edges are encoded, whole GOPs copied
+        self.assertEqual([(1, 2.0, False), (2.0, 8.0, True), (8.0, 9, False), (12, 13, False)], pieces)
+
+    def test_plan_snap(self):
+        self.assertEqual([(20.0, 30.0, True)], _plan_smart_render([[20.2, 29.7]], KEYFRAMES, snap=0.5))
+        self.assertEqual([(20.2, 24.0, False), (24.0, 28.0, True), (28.0, 29.7, False)],
+                         _plan_smart_render([[20.2, 29.7]], KEYFRAMES, snap=0.1))
+
+        # both cuts snapping to the same keyframe keeps the segment
+        self.assertEqual([(12, 13, False)], _plan_smart_render([[12, 13]], KEYFRAMES, snap=0.5))
+
+    def test_piece_command(self):
+        command = " ".join(_build_piece_command(__file__, "piece.ts", 2.0, 8.0))
+        self.assertIn("-ss 2.0 -t 6.0 -i", command)
+        self.assertIn("-map 0:v:0 -c:v copy", command)
+
+        # audio is not encoded per piece
+        command = " ".join(_build_piece_command(__file__, "piece.ts", 1, 2.0, {"-c:v": "libx264", "-level": "3.1"}))
+        self.assertIn("-c:v libx264 -level 3.1", command)
+        self.assertNotIn("-c:a", command)
+
+    def test_audio(self):
+        self.assertEqual([[1, 9], [12, 13]], _piece_segments([(1, 2.0, False), (2.0, 8.0, True), (8.0, 9, False),
+                                                              (12, 13, False)]))
+
+        command = " ".join(_build_cut_audio_command(__file__, "audio.m4a", [[1, 9], [12, 13]]))
+        self.assertEqual(1, command.count("-i "))
+        self.assertIn("concat=n=2:v=0:a=1[audio]", command)
+
+        command = _build_concat_command(__file__, "out.mp4", __file__)
+        self.assertEqual(["-map", "0:v:0", "-map", "1:a:0", "-c", "copy", "out.mp4"], command[-7:])
+
+    @mock.patch.object(ffmpeg, "_media_info")
+    def test_encoder(self, media_info):
+        info = MediaInfo.from_probe(__file__, PROBE)
+        media_info.return_value = info
+
+        self.assertEqual({"-c:v": "libx264", "-preset": "faster", "-pix_fmt": "yuv420p", "-profile:v": "high",
+                          "-s": "1280x720", "-vf": "setsar=1/1", "-r": "30000/1001", "-enc_time_base": "1/30000",
+                          "-level": "3.1"}, _get_encoder(__file__))
+
+        # parameters that can not be matched fall back to encoding the segments
+        for changes in ({"profile": "High 4:4:4 Intra"}, {"level": None}, {"video_codec": "vp9"}):
+            media_info.return_value = info._replace(**changes)
+            self.assertRaises(FFmpegProcessException, _get_encoder, __file__)
+
+
+class ParallelRenderTest(unittest.TestCase):
+    def setUp(self):
+        self.workers = Config.RENDER_WORKERS
+
+    def tearDown(self):
+        Config.RENDER_WORKERS = self.workers
+
+    def test_workers(self):
+        Config.RENDER_WORKERS = 3
+        self.assertEqual(3, _render_workers(10))
+        self.assertEqual(2, _render_workers(2))
+
+        Config.RENDER_WORKERS = 0
+        self.assertEqual(max(1, min(10, (os.cpu_count() or 1) // 2)), _render_workers(10))
+
+    def test_piece_command(self):
+        setsardar = "setsar=sar=1/1,setdar=dar=16/9"
+        segment = " ".join(_build_parallel_piece_command(__file__, __file__, "piece.ts", 1, 3.5, 640, 360, setsardar,
+                                                         "25/1", 2))
+        intro = " ".join(_build_parallel_piece_command(__file__, None, "piece.ts", 0, 4, 640, 360, setsardar, "25/1", 2))
+
+        # same encoder settings for every piece
+        for command in (segment, intro):
+            self.assertIn("-c:v libx264 -preset faster -pix_fmt yuv420p -c:a aac -ar 48000 -ac 1 -r 25/1 -threads 2",
+                          command)
+
+        self.assertIn("-ss 1 -t 2.5 -i", segment)
+        self.assertIn("[1]asetpts", segment)
+        self.assertNotIn("-ss", intro)
+        self.assertIn("[0:a]asetpts", intro)
+
+
+class SeekRenderTest(unittest.TestCase):
+    def setUp(self):
+        self.strategy, self.segments = Config.RENDER_STRATEGY, Config.SEEK_MAX_SEGMENTS
+        Config.RENDER_STRATEGY, Config.SEEK_MAX_SEGMENTS = "seek", 2
+
+    def tearDown(self):
+        Config.RENDER_STRATEGY, Config.SEEK_MAX_SEGMENTS = self.strategy, self.segments
+
+    @mock.patch.object(ffmpeg, "_ffmpeg_runner", return_value=iter(()))
+    @mock.patch.object(ffmpeg, "_build_merge_command_v2", return_value=["v2"])
+    @mock.patch.object(ffmpeg, "_build_merge_command_seek", return_value=["seek"])
+    def test_max_segments(self, seek, v2, runner):
+        list(ffmpeg.merge("in.mp4", "in.wav", "out.mp4", [[0, 1], [2, 3]]))
+        self.assertEqual((1, 0), (seek.call_count, v2.call_count))
+
+        # too many segments to open the inputs for each
+        list(ffmpeg.merge("in.mp4", "in.wav", "out.mp4", [[0, 1], [2, 3], [4, 5]]))
+        self.assertEqual((1, 1), (seek.call_count, v2.call_count))
+
+
+if __name__ == '__main__':
+    unittest.main()
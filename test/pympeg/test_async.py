@@ -0,0 +1,84 @@
+import asyncio
+import os
+import stat
+import tempfile
+import time
+import unittest
+
+from torpido import pympeg
+from torpido.pympeg._exceptions import FFmpegException
+
+# writes two progress blocks like ffmpeg -progress pipe:1, sleeps instead of the second if $SLEEP is set
+SCRIPT = """#!/bin/sh
+printf 'frame=10\\nfps=25.0\\nout_time_us=400000\\nspeed=1.5x\\nprogress=continue\\n'
+echo "log line" >&2
+[ -n "$SLEEP" ] && exec sleep $SLEEP
+printf 'frame=25\\nfps=N/A\\nout_time_us=1000000\\nspeed=N/A\\nprogress=end\\n'
+exit ${CODE:-0}
+"""
+
+
+class ProgressParserTest(unittest.TestCase):
+    def test_parse(self):
+        parser = pympeg.ProgressParser()
+        lines = ["frame=48", "fps=23.9", "out_time_us=2000000", "total_size=1024", "speed=1.02x"]
+
+        self.assertEqual([None] * len(lines), [parser.parse(line) for line in lines])
+        self.assertEqual(pympeg.FFmpegProgress(frame=48, fps=23.9, out_time=2.0, speed=1.02, total_size=1024,
+                                               end=False), parser.parse("progress=continue\n"))
+
+        # values of a block do not leak to the next, N/A is None
+        progress = parser.parse("out_time_us=N/A") or parser.parse("progress=end")
+        self.assertEqual((None, None, True), (progress.frame, progress.out_time, progress.end))
+
+
+class RunAsyncTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.ffmpeg = os.path.join(self.directory.name, "ffmpeg")
+
+        with open(self.ffmpeg, "w") as file:
+            file.write(SCRIPT)
+        os.chmod(self.ffmpeg, stat.S_IRWXU)
+
+    def tearDown(self):
+        os.environ.pop("SLEEP", None)
+        os.environ.pop("CODE", None)
+        self.directory.cleanup()
+
+    def test_progress(self):
+        progress, logs = list(), list()
+        asyncio.run(pympeg.run_async([self.ffmpeg, "-i", "in.mp4", "out.mp4"], on_progress=progress.append,
+                                     on_log=logs.append))
+
+        self.assertEqual([0.4, 1.0], [block.out_time for block in progress])
+        self.assertEqual([False, True], [block.end for block in progress])
+        self.assertEqual(["log line"], logs)
+
+    def test_error(self):
+        os.environ["CODE"] = "1"
+        with self.assertRaises(FFmpegException) as error:
+            asyncio.run(pympeg.run_async([self.ffmpeg]))
+
+        self.assertIn("log line", str(error.exception))
+
+    def test_timeout(self):
+        os.environ["SLEEP"] = "30"
+        start = time.monotonic()
+
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(pympeg.run_async([self.ffmpeg], timeout=0.5))
+
+        # ffmpeg is stopped, not waited for
+        self.assertLess(time.monotonic() - start, 3)
+
+    def test_run_all(self):
+        progress = dict()
+        asyncio.run(pympeg.run_all([[self.ffmpeg]] * 6, limit=2,
+                                   on_progress=lambda index, block: progress.__setitem__(index, block.out_time)))
+
+        self.assertEqual({index: 1.0 for index in range(6)}, progress)
+
+
+if __name__ == '__main__':
+    unittest.main()
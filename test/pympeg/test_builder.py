@@ -0,0 +1,54 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from torpido import pympeg
+
+
+def _trim_command(start):
+    """ Trim of the file in a stream of its own """
+    with pympeg.Stream():
+        return (
+            pympeg
+                .input(name=__file__)
+                .filter(filter_name="trim", params={"start": start, "duration": 1})
+                .setpts()
+                .output(name="out_%d.mp4" % start)
+                .argv(optimized=False)
+        )
+
+
+class BuilderTest(unittest.TestCase):
+    def setUp(self):
+        pympeg.init()
+
+    def test_labels(self):
+        # same chain, same labels
+        self.assertEqual(_trim_command(1)[-5:], _trim_command(1)[-5:])
+        self.assertEqual(["-filter_complex", "[0] trim=start=1:duration=1 [L0];[L0]setpts=PTS-STARTPTS[L1]",
+                          "-map", "[L1]", "out_1.mp4"], _trim_command(1)[-5:])
+
+    def test_nested(self):
+        outer = pympeg.input(name=__file__)
+
+        with pympeg.Stream() as stream:
+            pympeg.input(name=__file__).output(name="inner.mp4")
+            self.assertEqual(2, len(stream.graph()))
+
+            # init clears the stream of the with block only
+            pympeg.init()
+            self.assertEqual(0, len(stream.graph()))
+
+        self.assertEqual([outer], pympeg.graph())
+        self.assertEqual("[L0]", repr(outer.scale(w="640", h="360")[0]))
+
+    def test_threads(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            commands = list(pool.map(_trim_command, range(64)))
+
+        for start, command in enumerate(commands):
+            self.assertEqual(_trim_command(start), command)
+            self.assertEqual(1, command.count("-i"))
+
+
+if __name__ == '__main__':
+    unittest.main()
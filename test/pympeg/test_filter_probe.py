@@ -1,4 +1,7 @@
+import os
+import tempfile
 import unittest
+from unittest import mock
 
 from torpido import pympeg
 
@@ -18,6 +21,19 @@ class FFprobeTest(unittest.TestCase):
         except FileExistsError:
             self.assertTrue(True)
 
+    def test_keyframes_start_time(self):
+        output = b"packet,1.400000,K__\npacket,1.440000,___\npacket,3.400000,K__\nformat,1.400000\n"
+
+        with tempfile.NamedTemporaryFile(suffix=".ts") as file:
+            with mock.patch("subprocess.Popen") as popen:
+                popen.return_value.communicate.return_value = (output, b"")
+                popen.return_value.returncode = 0
+                times = pympeg.keyframes(file.name)
+
+        # times from the start of the file, as -ss counts them
+        self.assertEqual([0.0, 2.0], [round(time, 6) for time in times])
+        self.assertIn("packet=pts_time,flags:format=start_time", popen.call_args[0][0])
+
     def test_command_gen(self):
         pympeg.init()
         command = (
@@ -48,6 +64,17 @@ class FFprobeTest(unittest.TestCase):
         self.assertEqual(2, len(concat.inputs))
         self.assertEqual(2, len(concat.outputs))
 
+    def test_input_options(self):
+        pympeg.init()
+        command = (
+            pympeg
+                .input(name=__file__, options={"-ss": 10, "-t": 2.5})
+                .output(name="my_output.mp4", map_cmd="")
+                .command()
+        )
+
+        self.assertIn("ffmpeg -y -ss 10 -t 2.5 -i '%s'" % __file__, command)
+
     def test_options(self):
         pympeg.init()
         command = pympeg.option(tag="-f", name='ffmetadata', output='out').command()
@@ -55,6 +82,35 @@ class FFprobeTest(unittest.TestCase):
 
         self.assertEqual(str, command)
 
+    def test_argv(self):
+        pympeg.init()
+        args = (
+            pympeg
+                .input(name=__file__, options={"-ss": 10, "-t": 2.5})
+                .scale(w="640", h="360")
+                .output(name="my output.mp4")
+                .argv()
+        )
+
+        # file names are single arguments, nothing is quoted
+        self.assertEqual(["ffmpeg", "-y", "-ss", "10", "-t", "2.5", "-i", __file__, "-filter_complex"], args[:9])
+        self.assertEqual(["[0] scale=w=640:h=360 [L0]", "-map", "[L0]", "my output.mp4"], args[9:])
+
+    def test_filter_script(self):
+        pympeg.init()
+        segments = [pympeg.input(name=__file__, options={"-ss": i, "-t": 1}).setpts() for i in range(500)]
+        args = pympeg.concat(inputs=segments, outputs=2).output(name="my_output.mp4").argv()
+
+        # large graphs are read from a file
+        self.assertNotIn("-filter_complex", args)
+        script = args[args.index("-filter_complex_script") + 1]
+        with open(script) as file:
+            self.assertIn("concat=n=250:v=1:a=1", file.read())
+
+        pympeg.remove_filter_script(args)
+        self.assertFalse(os.path.exists(script))
+        self.assertIn("-filter_complex", pympeg.argv(script_length=None))
+
 
 if __name__ == '__main__':
     unittest.main()
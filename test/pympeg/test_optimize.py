@@ -0,0 +1,82 @@
+import unittest
+
+from torpido import pympeg
+from torpido.pympeg._node import FilterNode, GlobalNode
+from torpido.pympeg._optimize import optimize
+
+SETSARDAR = "setsar=sar=1/1,setdar=dar=16/9"
+
+
+class OptimizeTest(unittest.TestCase):
+    def setUp(self):
+        pympeg.init()
+
+    def _split_graph(self, size=None, trim_first=True):
+        """ same as the merge, split -> trim -> setpts -> scale -> setsar per branch, or scale first """
+        split_ = pympeg.arg(inputs=pympeg.input(name=__file__, size=size), args="split=2",
+                            outputs=["split_0", "split_1"])
+        branches = list()
+        for i, start in enumerate((1, 5)):
+            branch = split_[i]
+            if not trim_first:
+                branch = branch.scale(w="640", h="360").arg(args=SETSARDAR)
+
+            branch = branch.filter(filter_name="trim", params={"start": start, "duration": 2}).setpts()
+            if trim_first:
+                branch = branch.scale(w="640", h="360").arg(args=SETSARDAR)
+            branches.append(branch)
+
+        return pympeg.arg(inputs=branches, args="concat=n=2", outputs=["video"]).output(name="out.mp4")
+
+    def _count(self, graph, name):
+        return sum(1 for node in graph if isinstance(node, (FilterNode, GlobalNode)) and name in node.name)
+
+    def test_hoist(self):
+        self._split_graph(trim_first=False)
+        graph = optimize(pympeg.graph())
+
+        # one scale and setsar before the split instead of one per branch
+        self.assertEqual(1, self._count(graph, "scale"))
+        self.assertEqual(1, self._count(graph, "setsar"))
+        self.assertEqual(2, self._count(graph, "trim"))
+        self.assertEqual(2, self._count(pympeg.graph(), "scale"))
+
+        split_ = next(node for node in graph if isinstance(node, GlobalNode) and node.name == "split=2")
+        setsar = next(node for node in graph if isinstance(node, GlobalNode) and node.name == SETSARDAR)
+        self.assertEqual(setsar.outputs, split_.inputs)
+
+    def test_no_hoist_after_trim(self):
+        self._split_graph()
+        graph = optimize(pympeg.graph())
+
+        # filters after the trims only run on the frames kept, they stay in the branches
+        self.assertEqual(2, self._count(graph, "scale"))
+        self.assertEqual(2, self._count(graph, "setsar"))
+
+        split_ = next(node for node in graph if isinstance(node, GlobalNode) and node.name == "split=2")
+        self.assertEqual("0", split_.inputs[0].label)
+
+    def test_noop_scale(self):
+        self._split_graph(size=(640, 360))
+        command = pympeg.command()
+
+        self.assertNotIn("scale", command)
+        self.assertEqual(2, command.count("setsar"))
+        self.assertIn("scale", pympeg.command(optimized=False))
+
+    def test_fuse_trims(self):
+        (
+            pympeg.input(name=__file__)
+                .filter(filter_name="trim", params={"start": 2, "duration": 10})
+                .filter(filter_name="trim", params={"start": 4, "end": 20})
+                .output(name="out.mp4")
+        )
+        graph = optimize(pympeg.graph())
+        trims = [node for node in graph if isinstance(node, FilterNode) and node.name == "trim"]
+
+        self.assertEqual(1, len(trims))
+        self.assertEqual({"start": 4, "duration": 8}, trims[0].params)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+import numpy as np
+
+from torpido.wavelet import FastWaveletTransform
+from torpido.wavelet.extension.fft_transform import calibrate, getCrossover, setCrossover
+from torpido.wavelet.extension.wavelet_transform import WaveletTransform
+
+
+class FFTTransformTest(unittest.TestCase):
+    def test_same_as_direct(self):
+        data = np.random.default_rng(0).standard_normal(5000)
+
+        for name in ["haar", "coif5", "meyer"]:
+            direct, fft = FastWaveletTransform(name, "direct"), FastWaveletTransform(name, "fft")
+            coefficients = direct.wavedec(data)
+
+            self.assertTrue(np.allclose(coefficients, fft.wavedec(data)))
+            self.assertTrue(np.allclose(direct.waverec(coefficients), fft.waverec(coefficients)))
+
+    def test_overlap_save(self):
+        data = np.random.default_rng(1).standard_normal(1 << 13)
+        direct, fft = WaveletTransform("meyer", "direct"), WaveletTransform("meyer", "fft")
+
+        self.assertTrue(np.allclose(direct.dwt(data, len(data)), fft.dwt(data, len(data))))
+        self.assertTrue(np.allclose(direct.idwt(data, len(data)), fft.idwt(data, len(data))))
+
+    def test_crossover(self):
+        setCrossover(30)
+        self.assertEqual(30, getCrossover())
+        self.assertIsNone(WaveletTransform("coif1").fft)
+        self.assertIsNotNone(WaveletTransform("meyer").fft)
+
+        self.assertEqual(int, type(calibrate(signalLength=1 << 10, repeat=1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
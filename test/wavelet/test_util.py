@@ -1,6 +1,9 @@
 import unittest
 
-from torpido.wavelet import FastWaveletTransform, decomposeArbitraryLength, getExponent, scalb, isPowerOf2
+import numpy as np
+
+from torpido.wavelet import (FastWaveletTransform, VisuShrinkCompressor, decomposeArbitraryLength,
+                             getExponent, scalb, isPowerOf2, getLevelSlices, median, mad, threshold)
 
 
 class WaveletTest(unittest.TestCase):
@@ -49,6 +52,77 @@ class WaveletTest(unittest.TestCase):
         self.assertTrue(isPowerOf2(8))
         self.assertTrue(not isPowerOf2(10))
 
+    def test_median(self):
+        data = np.array([5., 1., 4., 2., 3., 6.])
+
+        self.assertEqual(3.5, median(data))
+        self.assertEqual(3., median(data[:5]))
+        self.assertListEqual([5., 1., 4., 2., 3., 6.], list(data))
+
+    def test_mad(self):
+        data = np.random.default_rng(0).standard_normal(1001)
+
+        self.assertAlmostEqual(np.median(np.abs(data - np.median(data))), mad(data))
+
+    def test_level_slices(self):
+        approximation, details = getLevelSlices(12)
+
+        self.assertListEqual([slice(0, 1), slice(8, 9)], approximation)
+        self.assertListEqual([slice(4, 8), slice(10, 12)], details[0])
+        self.assertListEqual([slice(1, 2)], details[2])
+
+    def test_threshold_modes(self):
+        data = np.array([-3., -1., 0., 0.5, 2.])
+
+        self.assertListEqual([-2., 0., 0., 0., 1.], list(threshold(data, 1.)))
+        self.assertListEqual([-3., -1., 0., 0., 2.], list(threshold(data, 1., mode="hard")))
+        self.assertListEqual([-3. + 1. / 3., 0., 0., 0., 1.5], list(threshold(data, 1., mode="garrote")))
+
+    def test_threshold_in_place(self):
+        data = np.random.default_rng(0).standard_normal(1000)
+        expected = threshold(data, 0.5, substitute=0.1)
+        out = threshold(data, 0.5, substitute=0.1, out=data, chunkSize=64)
+
+        self.assertIs(data, out)
+        self.assertTrue(np.allclose(expected, data))
+
+    def test_threshold_keep_approximation(self):
+        data = np.full(12, 0.5)
+        out = threshold(data, 1., keepApproximation=True)
+
+        self.assertEqual(0.5, out[0])
+        self.assertEqual(0.5, out[8])
+        self.assertEqual(0, np.count_nonzero(out[1:8]))
+
+    def test_visu_shrink(self):
+        compressor = VisuShrinkCompressor()
+        noise = np.random.default_rng(0).standard_normal(4096) * 0.1
+        coefficients = compressor.compress(noise)
+
+        self.assertAlmostEqual(0.1, compressor.getNoise(), delta=0.02)
+        self.assertEqual(noise[0], coefficients[0])
+
+    def test_visu_shrink_snr(self):
+        transform, compressor = FastWaveletTransform("db4"), VisuShrinkCompressor(mode="hard")
+        time = np.arange(1 << 14) / 16000
+        tones = 0.3 * np.sin(2 * np.pi * 220 * time) + 0.2 * np.sin(2 * np.pi * 660 * time)
+        noisy = tones + np.random.default_rng(0).standard_normal(len(tones)) * 0.1
+
+        # the decomposition is orthonormal, the snr of the coefficients is the one of the signal
+        def decompose(signal):
+            return [np.asarray(transform.wavedec(block)) for block in np.split(signal, 4)]
+
+        def snr(coefficients):
+            clean, coefficients = np.concatenate(decompose(tones)), np.concatenate(coefficients)
+            return 10 * np.log10(np.sum(clean ** 2) / np.sum((coefficients - clean) ** 2))
+
+        # de-noised in blocks as the audio is, the noise is streamed across them
+        cleaned = [compressor.compress(block) for block in decompose(noisy)]
+
+        self.assertIsInstance(compressor.getThreshold(), float)
+        self.assertAlmostEqual(0.1, compressor.getNoise(), delta=0.02)
+        self.assertGreater(snr(cleaned), snr(decompose(noisy)) + 2)
+
 
 if __name__ == '__main__':
     unittest.main()
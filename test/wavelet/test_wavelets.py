@@ -0,0 +1,39 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from torpido.wavelet import wavelets
+from torpido.wavelet.exceptions import WaveletImplementationMissing
+
+
+class WaveletsTest(unittest.TestCase):
+    def test_definition(self):
+        self.assertEqual(4, wavelets.getWaveletDefinition("db2").__motherWaveletLength__)
+        self.assertIs(wavelets.getWaveletDefinition("db2"), wavelets.getWaveletDefinition("db2"))
+
+    def test_missing(self):
+        with self.assertRaises(WaveletImplementationMissing):
+            wavelets.getFilterBank("no_such")
+
+    def test_filter_bank(self):
+        bank = wavelets.getFilterBank("coif1")
+
+        self.assertEqual(6, bank.length)
+        self.assertIs(bank, wavelets.getFilterBank("coif1"))
+        self.assertFalse(bank.decompositionLowFilter.flags.writeable)
+        self.assertTrue(bank.reconstructionHighFilter.flags.c_contiguous)
+
+    def test_packed_filter_bank(self):
+        filename = os.path.join(tempfile.mkdtemp(), "filter_bank.npz")
+        wavelets.packFilterBank(filename)
+
+        with np.load(filename) as packed:
+            self.assertEqual(len(wavelets.getAllWavelets()) * len(wavelets.FILTERS), len(packed.files))
+            np.testing.assert_array_equal(wavelets.getFilterBank("db4").decompositionHighFilter,
+                                          packed["db4:decompositionHighFilter"])
+
+
+if __name__ == '__main__':
+    unittest.main()
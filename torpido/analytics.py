@@ -59,8 +59,7 @@ class Analytics:
         self.__motion, self.__blur, self.__text, self.__audio = self.__data
         self.__rank_length = len(self.__motion)
 
-        self.__ranks = [self.__motion[i] + self.__blur[i] +
-                        self.__text[i] + self.__audio[i] for i in range(self.__rank_length)]
+        self.__ranks = Ranking.sum_ranks()
 
         try:
             self.__timestamps = Ranking.get_timestamps()
@@ -13,8 +13,9 @@ from matplotlib import pyplot as plt
 from .config.cache import Cache
 from .config.config import Config
 from .config.constants import *
+from .tools.feature_cache import FeatureCache
+from .tools.features import rerank
 from .tools.logger import Log
-from .tools.ranking import Ranking
 from .wavelet import FastWaveletTransform, VisuShrinkCompressor
 
 matplotlib.use("TkAgg")
@@ -37,8 +38,8 @@ class Auditory:
         plot the signal
     __info : object
         sound file object having the info of the audio file
-    __energy : list
-        list of the ranks for the audio signal
+    __energy : tuple
+        sum of the squared samples and the no of samples of every rank bin
     __silence_threshold : int
         threshold value to determine the rank
     __cache : Cache
@@ -47,36 +48,48 @@ class Auditory:
         performs dwt & idwt on the data
     __compressor : VisuShrinkCompressor
         performs visu shrink thresholding on the coefficients
+    __features : FeatureCache
+        persistent cache of the features and de-noised audio of the videos already processed
     """
     def __init__(self):
         self.__file_name = self.__rate = self.__data = None
         self.__plot = self.__info = self.__energy = None
         self.__silence_threshold, self.__cache = Config.SILENCE_THRESHOLD, Cache()
         self.__fwt = FastWaveletTransform(Config.WAVELET)
-        self.__compressor = VisuShrinkCompressor()
+        self.__compressor = VisuShrinkCompressor(mode=WAVE_THRESH)
+        self.__features = FeatureCache()
 
-    def __get_energy_rms(self, block):
+    def __add_energy(self, block, offset):
         """
         RMS = Root Mean Square to calculate the signal data to the dB, if signal
         satisfies some threshold the ranking can be affected and audio portion
         can be ranked
         RMS -> square root of mean of squared data
 
+        The squares are summed per rank bin of `RANK_RESOLUTION` secs, so a bin split
+        between two blocks is measured as a whole
+
         Audio data range : -1 to 1
 
         Parameters
         ----------
         block : np-array
             input signal block
-
-        Returns
-        -------
-        int
-            rank for the portion which is then set for all the portion of data
+        offset : int
+            position of the first sample of the block in the signal
         """
-        if np.sqrt(np.mean(np.power(block, 2))) > self.__silence_threshold:
-            return Config.RANK_AUDIO
-        return 0
+        power, samples = self.__energy
+        bins = ((offset + np.arange(len(block))) / (self.__rate * Config.RANK_RESOLUTION)).astype(np.int64)
+        first, bins = bins[0], bins - bins[0]
+
+        power[first: first + bins[-1] + 1] += np.bincount(bins, weights=np.square(block))
+        samples[first: first + bins[-1] + 1] += np.bincount(bins)
+
+    def __get_energy_rms(self):
+        """ RMS of every rank bin of the signal """
+        power, samples = self.__energy
+        measured = samples > 0
+        return np.sqrt(power[measured] / samples[measured])
 
     def __set_audio_info(self):
         """ Storing audio info """
@@ -142,13 +155,28 @@ class Auditory:
             Log.e(f"File {input_file} does not exists")
             return
 
-        self.__file_name, self.__energy = input_file, list()
+        # same audio already de-noised with the same settings, only the ranking is done again
+        key = self.__features.key(input_file, "auditory", {"wavelet": Config.WAVELET, "mode": WAVE_THRESH,
+                                                           "block_per": Config.AUDIO_BLOCK_PER,
+                                                           "resolution": Config.RANK_RESOLUTION})
+        entry = self.__features.get(key)
+        if entry is not None:
+            soundfile.write(output_file, entry["arrays"]["audio"], entry["rate"])
+            self.__features.restore(entry, arrays=(CACHE_FEATURE_AUDIO,))
+            rerank((CACHE_FEATURE_AUDIO,), settings={"SILENCE_THRESHOLD": self.__silence_threshold})
+            Log.i("Audio de noised from the feature cache")
+            return
+
+        self.__file_name = input_file
         self.__info = soundfile.info(self.__file_name)
         self.__rate = self.__info.samplerate
+
+        bins = int(np.ceil(self.__info.frames / (self.__rate * Config.RANK_RESOLUTION))) + 1
+        self.__energy = np.zeros(bins), np.zeros(bins, dtype=np.int64)
         self.__set_audio_info()
         Log.i(f"Audio duration is {self.__info.duration}.")
 
-        count, to_read = 0, int(self.__rate * self.__info.duration * Config.AUDIO_BLOCK_PER)
+        count, offset, to_read = 0, 0, int(self.__rate * self.__info.duration * Config.AUDIO_BLOCK_PER)
         # creating and opening the output audio file
         with soundfile.SoundFile(output_file, mode="w", samplerate=self.__rate, channels=1) as out:
             for block in soundfile.blocks(self.__file_name, to_read):
@@ -168,14 +196,22 @@ class Auditory:
                 out.write(cleaned)
 
                 # calculating the audio rank
-                self.__energy.extend([self.__get_energy_rms(cleaned)] * max(1, int(len(cleaned) / self.__rate)))
-                count += 1
+                self.__add_energy(cleaned, offset)
+                count, offset = count + 1, offset + len(cleaned)
 
                 if plot and (count == 5 or count == 7):
                     self._specshow(block, cleaned, self.__info.samplerate)
 
-        Ranking.add(CACHE_RANK_AUDIO, self.__energy)
+        # saving the raw rms and ranking it
+        energy = self.__get_energy_rms()
+        self.__cache.write_data(CACHE_FEATURE_AUDIO, energy)
+        rerank((CACHE_FEATURE_AUDIO,), settings={"SILENCE_THRESHOLD": self.__silence_threshold})
+
+        # the de-noised audio is only written to the output, not to the cache of the job
+        self.__features.put(key, {"cache": {CACHE_AUDIO_INFO: self.__info}, "rate": self.__rate},
+                            arrays={CACHE_FEATURE_AUDIO: energy,
+                                    "audio": soundfile.read(output_file, dtype="int16")[0]})
         Log.i("Audio de noised successfully")
-        Log.d(f"Audio ranking length {len(self.__energy)}")
+        Log.d(f"Audio ranking length {len(energy)}")
         Log.i("Audio ranking saved .............")
         Log.d(f"Garbage collected :: {gc.collect()}")
@@ -1,55 +1,249 @@
 """
 A simple cache storage helper to store minimal amount of data
-in the dictionary, if data exists it will return the val or None
+in the store, if data exists it will return the val or None.
+
+Every key is a separate file in the store directory, so reading or writing a key
+costs only the size of that key. Numpy arrays are saved in the .npy format and
+read back memory mapped (zero copy), any other object is pickled. Writes go to a
+temporary file which is renamed over the old one, so a reader never sees a half
+written value.
+
+The analysis processes write concurrently, the merge rule is
+- different keys are different files, so writers never interfere
+- writes to the same key are serialized by a lock file per key, the last write wins
+- `update_data` reads, merges and writes a key under the same lock, so values
+  built up by many processes (ex: dict of results) never lose an update
+
+Every job gets its own namespace (a store directory) so several videos can be
+processed at once from the same directory. The namespace of the current job is
+kept in an env var, so the analysis processes started by the job share it.
 """
 
-from joblib import dump, load
+import pickle
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import quote, unquote
+
+import numpy as np
 
 from torpido.config.constants import *
 from torpido.tools.logger import Log
 
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+    import msvcrt
+
+# suffix of the temporary and lock files, "," is always quoted in a key so they never clash
+TMP_SUFFIX = ",part"
+LOCK_SUFFIX = ",lock"
+
+
+def new_namespace():
+    """
+    Returns a new unique namespace for a job
+
+    Returns
+    -------
+    str
+        name of the namespace
+    """
+    return f"{CACHE_JOB_PREFIX}{uuid.uuid4().hex}"
+
+
+def set_namespace(namespace):
+    """
+    Sets the namespace of the current job, processes started after it share the
+    namespace
+
+    Parameters
+    ----------
+    namespace : str
+        name of the namespace, None for the default one
+    """
+    if namespace is None:
+        os.environ.pop(CACHE_NAMESPACE_ENV, None)
+    else:
+        os.environ[CACHE_NAMESPACE_ENV] = namespace
+
+
+def get_namespace():
+    """
+    Returns the namespace of the current job
+
+    Returns
+    -------
+    str
+        name of the namespace, CACHE_NAME if no job namespace is set
+    """
+    return os.environ.get(CACHE_NAMESPACE_ENV) or CACHE_NAME
+
+
+def remove_stale_namespaces(max_age=CACHE_MAX_AGE):
+    """
+    Removes the job namespaces which are not modified for max_age seconds, left
+    over by jobs that crashed or were killed before the clean up
+
+    Parameters
+    ----------
+    max_age : float
+        age in seconds after which a namespace is abandoned
+
+    Returns
+    -------
+    list
+        names of the removed namespaces
+    """
+    root, removed = os.path.join(os.getcwd(), CACHE_DIR), list()
+    if not os.path.isdir(root):
+        return removed
+
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if not name.startswith(CACHE_JOB_PREFIX) or not os.path.isdir(path) or name == get_namespace():
+            continue
+
+        if time.time() - os.path.getmtime(path) > max_age:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(name)
+
+    return removed
+
 
 class Cache:
     """
-    Stores a dictionary as a file using joblib. Key-value pair of any object type can be saved.
+    Stores the key-value pairs as a file per key in the store directory of the namespace.
+    Key-value pair of any object type can be saved.
 
     Attributes
     ----------
-    __file_name : str
-        file path and name for the cache file to store the data
+    __namespace : str
+        fixed namespace of the cache, if None the namespace of the current job is used
     """
 
-    def __init__(self):
-        if not os.path.isdir(os.path.join(os.getcwd(), CACHE_DIR)):
-            os.mkdir(os.path.join(os.getcwd(), CACHE_DIR))
-        self.__file_name = os.path.join(os.getcwd(), CACHE_DIR, CACHE_NAME)
+    def __init__(self, namespace=None):
+        self.__namespace = namespace
+
+    @property
+    def namespace(self):
+        """ Namespace of the cache, resolved on every access as the job may start after the object is created """
+        return get_namespace() if self.__namespace is None else self.__namespace
+
+    @property
+    def __store(self):
+        """ Directory for the cache files, one file per key """
+        return os.path.join(os.getcwd(), CACHE_DIR, self.namespace)
+
+    def __path(self, key):
+        """ File of the key in the store, key is quoted so any string is a valid name """
+        return os.path.join(self.__store, quote(str(key), safe=""))
 
     def write_data(self, key, value):
         """
-        Write the kay-value in the Cache file. If the file exists it would append the data to the dict object. Once data
-        is written Log is printed using `Log` class
+        Write the key-value in the Cache store. Only the file of the key is written, the
+        value is written to a temporary file first and then renamed. Once data is written
+        Log is printed using `Log` class
 
         Parameters
         ----------
         key : str
             Key value for the object to store
         value : object
-            Value to store any object can be store
+            Value to store any object can be store, numpy arrays are stored in the .npy format
 
         """
-        if os.path.isfile(self.__file_name):
-            data = load(self.__file_name)
-        else:
-            data = dict()
+        with self.__lock(key):
+            self.__write(key, value)
 
-        data[key] = value
-        dump(data, self.__file_name)
         Log.d(f"[CACHE] : {key} is stored")
 
+    def update_data(self, key, merge, default=None):
+        """
+        Read, merge and write the key while holding its lock, so concurrent updates from
+        different processes are never lost
+
+        Parameters
+        ----------
+        key : str
+            Key value for the object to update
+        merge : callable
+            called with the stored value (or default) and returns the new value
+        default : object
+            value passed to merge if the key does not exists
+
+        Returns
+        -------
+        object
+            new value of the key
+        """
+        with self.__lock(key):
+            try:
+                value = _load(self.__path(key), mmap=False)
+            except FileNotFoundError:
+                value = default
+
+            value = merge(value)
+            self.__write(key, value)
+
+        Log.d(f"[CACHE] : {key} is updated")
+        return value
+
+    @contextmanager
+    def __lock(self, key):
+        """ Exclusive lock on the key across processes """
+        os.makedirs(self.__store, exist_ok=True)
+        with open(self.__path(key) + LOCK_SUFFIX, "a+b") as file:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            else:
+                file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+
+            try:
+                yield
+            finally:
+                # the lock of a key that is deleted (or never written) goes with it
+                if not os.path.isfile(self.__path(key)):
+                    try:
+                        os.unlink(self.__path(key) + LOCK_SUFFIX)
+                    except OSError:  # removed by another process, or still open on windows
+                        pass
+
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+                else:
+                    file.seek(0)
+                    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def __write(self, key, value):
+        """ Writes the value to a temporary file and renames it as the file of the key """
+        fd, temp = tempfile.mkstemp(suffix=TMP_SUFFIX, dir=self.__store)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                if isinstance(value, np.ndarray) and not value.dtype.hasobject:
+                    np.save(file, value, allow_pickle=False)
+                else:
+                    pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self.__path(key))
+        except BaseException:
+            if os.path.isfile(temp):
+                os.unlink(temp)
+            raise
+
     def read_data(self, key):
         """
-        Read value for the key in cache if cache does not exists or cache file itself is not present the Log is
-        printed stating that Cache does not exists
+        Read value for the key in cache if key does not exists or cache store itself is not present
+        the Log is printed stating that Cache does not exists. Arrays are returned as read only memory
+        maps of the file
 
         Parameters
         ----------
@@ -61,9 +255,106 @@ class Cache:
         result
             if exists cache else None
         """
-        if os.path.isfile(self.__file_name):
-            data = load(self.__file_name)
-            return data[key] if key in data else None
+        if not os.path.isdir(self.__store):
+            Log.e(f"[CACHE] : Cache does not exists yet")
+            return None
+
+        try:
+            return _load(self.__path(key))
+        except FileNotFoundError:
+            return None
+
+    def keys(self):
+        """
+        Returns all the keys stored in the cache
+
+        Returns
+        -------
+        list
+            keys of the stored values
+        """
+        if not os.path.isdir(self.__store):
+            return list()
+
+        return [unquote(name) for name in sorted(os.listdir(self.__store))
+                if not name.endswith((TMP_SUFFIX, LOCK_SUFFIX))]
+
+    def entries(self):
+        """
+        Returns the size and the last access of every key, the last access is the
+        time of the last write or `touch`
+
+        Returns
+        -------
+        list
+            (key, size in bytes, last access time) for every key
+        """
+        if not os.path.isdir(self.__store):
+            return list()
+
+        entries = list()
+        for entry in os.scandir(self.__store):
+            if entry.name.endswith((TMP_SUFFIX, LOCK_SUFFIX)):
+                continue
+
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((unquote(entry.name), stat.st_size, stat.st_mtime))
+
+        return entries
+
+    def touch(self, key):
+        """
+        Marks the key as accessed now
+
+        Parameters
+        ----------
+        key : str
+            Key of the data
+        """
+        try:
+            os.utime(self.__path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_data(self, key):
+        """
+        Removes the key and its lock file from the cache if present
+
+        Parameters
+        ----------
+        key : str
+            Key of the data to remove
+        """
+        if not os.path.isdir(self.__store):
+            return
+
+        with self.__lock(key):
+            try:
+                os.unlink(self.__path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """ Removes the store of the namespace along with all its keys, other namespaces are untouched """
+        shutil.rmtree(self.__store, ignore_errors=True)
+        Log.d(f"[CACHE] : {self.namespace} is cleared")
+
+
+def _load(path, mmap=True):
+    """ Reads a single cache file, .npy files are memory mapped (if mmap) and others unpickled """
+    with open(path, "rb") as file:
+        if file.read(len(np.lib.format.MAGIC_PREFIX)) != np.lib.format.MAGIC_PREFIX:
+            file.seek(0)
+            return pickle.load(file)
+
+    if not mmap:
+        return np.load(path, allow_pickle=False)
 
-        Log.e(f"[CACHE] : Cache does not exists yet")
-        return None
+    try:
+        return np.load(path, mmap_mode="r", allow_pickle=False)
+    except ValueError:
+        # empty arrays can not be mapped
+        return np.load(path, allow_pickle=False)
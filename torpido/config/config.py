@@ -29,6 +29,21 @@ class _TorpidoSettings:
     # output video min rank
     MIN_RANK_OUT_VIDEO = 3
 
+    # duration of a rank of all the features (in secs), cuts are made at multiples of it
+    RANK_RESOLUTION = 1.0
+
+    # a segment starts above the min rank and ends below min rank - hysteresis
+    RANK_HYSTERESIS = 0
+
+    # segments closer than this are merged (in secs)
+    SEGMENT_MERGE_GAP = 0
+
+    # segments shorter than this are dropped (in secs)
+    SEGMENT_MIN_LENGTH = 0
+
+    # max no of segments, the best ranked are kept (0 for no limit)
+    SEGMENT_MAX_COUNT = 0
+
     # ******************* VIDEO PART *************************
     # threshold for video reading motion
     MOTION_THRESHOLD = 50
@@ -53,6 +68,39 @@ class _TorpidoSettings:
     # text detection is slow so some frames are skipped (sec)
     TEXT_SKIP_FRAMES = 10
 
+    # ******************* RENDER PART *************************
+    # "smart" copies the video between keyframes, "parallel" encodes the segments in separate processes,
+    # "seek" decodes only the segments of the video, "filter" trims the whole video
+    RENDER_STRATEGY = "filter"
+
+    # max segments of the "seek" render, it opens the video and the audio for every segment (more are trimmed)
+    SEEK_MAX_SEGMENTS = 64
+
+    # ffmpeg processes of the parallel render (0 for half the cpus)
+    RENDER_WORKERS = 0
+
+    # max secs of a piece of the parallel render (0 for no limit)
+    RENDER_TIMEOUT = 0
+
+    # ffmpeg processes running at once (0 for one per core)
+    FFMPEG_JOBS = 0
+
+    # cores shared by the threads of the ffmpeg processes (0 for all the cpus)
+    FFMPEG_CORES = 0
+
+    # max secs a cut is moved to a keyframe by the smart render
+    SMART_RENDER_SNAP = 0.5
+
+    # export the ranks and the cut list next to the output video
+    EXPORT_FEATURES = False
+
+    # ******************* FEATURE CACHE *************************
+    # reuse the analysis of a video already processed with the same settings
+    FEATURE_CACHE = True
+
+    # max size of the feature cache (in MB)
+    FEATURE_CACHE_SIZE = 1024
+
     # delay to check the CPU and MEM usage (in secs)
     WATCHER_DELAY = 5
 
@@ -15,8 +15,26 @@ NICE_MAX = 5
 # cache store dir
 CACHE_DIR = "torpido_tmp/"
 
-# cache file name
-CACHE_NAME = ".vea_cache.tmp"
+# cache store name, a directory with a file per key, the default namespace
+CACHE_NAME = ".vea_cache"
+
+# prefix of the per job cache namespaces
+CACHE_JOB_PREFIX = "job-"
+
+# env var holding the cache namespace of the current job, inherited by the sub processes
+CACHE_NAMESPACE_ENV = "TORPIDO_CACHE_NAMESPACE"
+
+# job namespaces untouched for longer (sec) are removed as abandoned
+CACHE_MAX_AGE = 24 * 60 * 60
+
+# namespace of the persistent feature cache shared by all the jobs
+FEATURE_CACHE_NAME = ".vea_features"
+
+# prefix of the feature cache entries
+FEATURE_CACHE_PREFIX = "feature-"
+
+# hits and misses over the life of the feature cache
+FEATURE_CACHE_STATS = "FEATURE_CACHE_STATS"
 
 # cache keys
 # video fps key
@@ -46,6 +64,24 @@ CACHE_VIDEO_WIDTH = "CACHE_VIDEO_WIDTH"
 # video height
 CACHE_VIDEO_HEIGHT = "CACHE_VIDEO_HEIGHT"
 
+# metadata of the input video, see `MediaInfo`
+CACHE_MEDIA_INFO = "CACHE_MEDIA_INFO"
+
+# raw per frame max pixel change between the frames (uint8)
+CACHE_FEATURE_MOTION = "CACHE_FEATURE_MOTION"
+
+# raw per frame variance of the laplacian (float32)
+CACHE_FEATURE_BLUR = "CACHE_FEATURE_BLUR"
+
+# raw per frame max confidence of the text detection (float32)
+CACHE_FEATURE_TEXT = "CACHE_FEATURE_TEXT"
+
+# raw rms of the de-noised audio per rank bin (float64)
+CACHE_FEATURE_AUDIO = "CACHE_FEATURE_AUDIO"
+
+# feature cache hits and misses of the job
+CACHE_FEATURE_STATS = "CACHE_FEATURE_STATS"
+
 # ******************* VIDEO PART *************************
 # video width to keep while processing
 VIDEO_WIDTH = 500
@@ -77,6 +113,12 @@ OUT_AUDIO_FILE = "_audio_de_noised.wav"
 # thumbnail file name
 THUMBNAIL_FILE = "_thumbnail.jpg"
 
+# exported features file name, without the extension
+EXPORT_FEATURES_FILE = "_features"
+
+# exported cut list file name, without the extension
+EXPORT_CUTS_FILE = "_cuts"
+
 # supported video file formats
 SUPPORTED_VIDEO_FILES = [".mp4", ".webm", ".mkv", ".mov", ".flv", ".avi", ".ogg"]
 
@@ -11,11 +11,15 @@ from time import time
 from multiprocessing import Process
 
 from . import Auditory, FFMPEG, Textual, Visual, Analytics
-from .config import Cache, LINUX, ID_COM_LOGGER, ID_COM_PROGRESS, ID_COM_VIDEO
+from .config import (Cache, Config, LINUX, ID_COM_LOGGER, ID_COM_PROGRESS, ID_COM_VIDEO, CACHE_FEATURE_STATS,
+                     new_namespace, set_namespace, remove_stale_namespaces)
 from .exceptions import RankingOfFeatureMissing, EastModelEnvironmentMissing
 from .manager import ManagerPool
 from .pmpi import Communication
+from .pympeg._exceptions import ProbeException
 from .tools import Watcher, Log
+from .tools.export import export
+from .tools.media_info import MediaInfo
 from .tools.ranking import Ranking
 from .util import check_type_video
 
@@ -87,6 +91,8 @@ class Controller:
         object of the class Communication that manages pipe communication
     _channel : Communication.Sender
         object of the class Sender that provides ability to send data to pipe with an identifier
+    _namespace : str
+        cache namespace of the current job
     """
 
     def __init__(self):
@@ -96,7 +102,10 @@ class Controller:
         self.__video_display = self.__text_detect_display = self.__spec_plot_display = self.__analytics_display = False
         self.__visual, self.__auditory, self.__ffmpeg = Visual(), Auditory(), FFMPEG()
         self.__analytics, self.__cache = Analytics(), Cache()
-        self._start_time = 0
+        self._start_time, self._namespace = 0, None
+
+        # cache left over by the jobs that did not finish
+        remove_stale_namespaces()
 
         # communication manager
         self._communication = Communication()
@@ -182,19 +191,37 @@ class Controller:
         if not check_type_video(input_file):
             return
 
-        if self.__ffmpeg.split_video_audio(input_file):
-            Log.d("The input video has been split successfully")
-        # something went wrong [mostly video does not contain any audio]
-        else:
-            Log.e("Logging out")
-            return
-
-        self.__video_file = input_file
-        self.__audio_file = self.__ffmpeg.get_input_audio_file_name_path()
-        self.__de_noised_audio_file = self.__ffmpeg.get_output_audio_file_name_path()
+        # isolated cache for the job, the sub processes inherit it
+        self._namespace = new_namespace()
+        set_namespace(self._namespace)
+        Log.d(f"Cache namespace of the job {self._namespace}")
 
-        # starting the sub processes
-        self.__start_modules()
+        # the files and the cache of the job are removed however it ends
+        try:
+            # probed once, the stages and the render read it from the cache
+            try:
+                info = MediaInfo.probe(input_file).save()
+                Log.i(f"Video :: {info.width}x{info.height} {info.video_codec} {info.frame_rate} fps, "
+                      f"{info.duration} secs, audio :: {info.audio_codec} {info.channel_layout}")
+            except (ProbeException, OSError):
+                Log.w("Could not probe the video, the stages read the metadata themselves")
+
+            if self.__ffmpeg.split_video_audio(input_file):
+                Log.d("The input video has been split successfully")
+            # something went wrong [mostly video does not contain any audio]
+            else:
+                Log.e("Logging out")
+                return
+
+            self.__video_file = input_file
+            self.__audio_file = self.__ffmpeg.get_input_audio_file_name_path()
+            self.__de_noised_audio_file = self.__ffmpeg.get_output_audio_file_name_path()
+
+            # starting the sub processes
+            self.__start_modules()
+        finally:
+            self.__ffmpeg.clean_up()
+            set_namespace(None)
 
     def __start_modules(self):
         """
@@ -249,6 +276,10 @@ class Controller:
         if self.__watcher is not None:
             self.__watcher.stop()  # ending the watcher
 
+        features = self.__cache.read_data(CACHE_FEATURE_STATS)
+        if features is not None:
+            Log.i(f"Feature cache :: {features['hits']} hits {features['misses']} misses")
+
         if self.__analytics_display:
             #  separate process for analytics
             Process(target=self.__analytics.analyze, args=()).start()
@@ -277,7 +308,9 @@ class Controller:
             if self.__ffmpeg.gen_thumbnail(Ranking.get_thumbnail_sec()):
                 Log.d("Generated a thumbnail....")
 
-        self.__ffmpeg.clean_up()
+        # ranks are lost with the clean up
+        if Config.EXPORT_FEATURES:
+            export(self.__ffmpeg.get_input_file_name_path(), timestamps)
 
         if self.__App is not None:
             self.__App.set_percent_complete(100.0)
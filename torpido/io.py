@@ -5,8 +5,8 @@ using ffmpeg.
 """
 import os
 
-from torpido.config.constants import (CACHE_DIR, CACHE_NAME,
-                                      IN_AUDIO_FILE, OUT_AUDIO_FILE,
+from torpido.config.cache import Cache
+from torpido.config.constants import (IN_AUDIO_FILE, OUT_AUDIO_FILE,
                                       OUT_VIDEO_FILE, THUMBNAIL_FILE)
 from torpido.exceptions import AudioStreamMissingException, FFmpegProcessException
 from torpido.ffpbar import Progress
@@ -226,9 +226,8 @@ class FFMPEG:
             if os.path.isfile(os.path.join(self.__output_file_path, self.__output_audio_file_name)):
                 os.unlink(os.path.join(self.__output_file_path, self.__output_audio_file_name))
 
-        # cache storage file
-        if os.path.isfile(os.path.join(CACHE_DIR, CACHE_NAME)):
-            os.unlink(os.path.join(CACHE_DIR, CACHE_NAME))
+        # cache store of this job only
+        Cache().clear()
 
-        del self.__progress_bar
+        self.__progress_bar = None
         Log.d("Clean up completed.")
@@ -1,14 +1,17 @@
+from . import _async
 from . import _filter
 from . import _probe
+from ._async import FFmpegProgress, ProgressParser, run_async, run_all
 from ._filter import (
     input, filter, output, arg, graph, run, option,
-    concat, init, scale, crop, setpts, fade, afade,
-    command
+    concat, init, scale, crop, setpts, asetpts, fade, afade,
+    command, argv, remove_filter_script, Stream
 )
-from ._probe import probe
+from ._probe import probe, keyframes
 
 """ Usable functions """
 __all__ = [
     _filter.__all__ +
-    _probe.__all__
+    _probe.__all__ +
+    _async.__all__
 ]
@@ -0,0 +1,221 @@
+"""
+Runs the ffmpeg commands on an asyncio event loop. ffmpeg writes its progress with
+`-progress pipe:1` as blocks of key=value lines ending with progress=continue or
+progress=end, every block is parsed into an `FFmpegProgress`. Many commands run at
+the same time on one loop, a command is stopped when it is cancelled or times out.
+
+        async def main():
+            await pympeg.run_async(args, on_progress=print, timeout=60)
+"""
+
+import asyncio
+from collections import deque, namedtuple
+
+from ._exceptions import FFmpegException
+from ._filter import remove_filter_script
+
+__all__ = ["FFmpegProgress", "ProgressParser", "run_async", "run_all"]
+
+# secs ffmpeg is given to exit after it is asked to stop, it is killed after
+STOP_TIMEOUT = 5.0
+
+# lines of the stderr kept for the error
+ERROR_LINES = 10
+
+
+class FFmpegProgress(namedtuple("FFmpegProgress", ("frame", "fps", "out_time", "speed", "total_size", "end"))):
+    """
+    Progress of a ffmpeg command, a block of the -progress output. Missing or N/A
+    values are None
+
+    Attributes
+    ----------
+    frame : int
+        frames written
+    fps : float
+        frames encoded per sec
+    out_time : float
+        secs of the output written
+    speed : float
+        speed of the encoding, 2.0 is twice the real time
+    total_size : int
+        bytes written
+    end : bool
+        True for the last block
+    """
+    __slots__ = ()
+
+
+def _number(value, cast=float):
+    """ Number of a progress value, None if missing or N/A, ex: 1.5x -> 1.5 """
+    try:
+        return cast(value.rstrip("x")) if value is not None else None
+    except ValueError:
+        return None
+
+
+class ProgressParser:
+    """
+    Collects the key=value lines of the -progress output, a block is complete on
+    the progress key
+
+    Attributes
+    ----------
+    _values : dict
+        values of the current block
+    """
+
+    def __init__(self):
+        self._values = dict()
+
+    def parse(self, line):
+        """
+        Adds the line to the current block
+
+        Returns
+        -------
+        FFmpegProgress
+            progress if the line completes a block else None
+        """
+        key, _, value = line.strip().partition("=")
+        if not key:
+            return None
+
+        if key != "progress":
+            self._values[key] = value
+            return None
+
+        values, self._values = self._values, dict()
+        out_time = _number(values.get("out_time_us"), int)
+
+        return FFmpegProgress(frame=_number(values.get("frame"), int), fps=_number(values.get("fps")),
+                              out_time=out_time / 1e6 if out_time is not None and out_time >= 0 else None,
+                              speed=_number(values.get("speed")), total_size=_number(values.get("total_size"), int),
+                              end=value == "end")
+
+
+async def _stop(process):
+    """ Asks ffmpeg to stop and kills it if it does not """
+    if process.returncode is not None:
+        return
+
+    process.terminate()
+    try:
+        await asyncio.wait_for(process.wait(), STOP_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+
+async def _read_progress(stream, on_progress):
+    """ Parses the -progress output of the stdout """
+    parser = ProgressParser()
+
+    async for line in stream:
+        progress = parser.parse(line.decode("utf-8", "replace"))
+        if progress is not None and on_progress is not None:
+            on_progress(progress)
+
+
+async def _read_log(stream, on_log, lines):
+    """ Reads the log of the stderr, the last lines are kept """
+    async for line in stream:
+        line = line.decode("utf-8", "replace").rstrip()
+        lines.append(line)
+
+        if on_log is not None:
+            on_log(line)
+
+
+async def _run(args, on_progress, on_log):
+    """ Runs the arguments to the end, the process is stopped if the run is cancelled """
+    process = await asyncio.create_subprocess_exec(args[0], "-progress", "pipe:1", "-nostats", *args[1:],
+                                                   stdin=asyncio.subprocess.DEVNULL,
+                                                   stdout=asyncio.subprocess.PIPE,
+                                                   stderr=asyncio.subprocess.PIPE)
+    lines = deque(maxlen=ERROR_LINES)
+
+    try:
+        await asyncio.gather(_read_progress(process.stdout, on_progress), _read_log(process.stderr, on_log, lines))
+        code = await process.wait()
+    finally:
+        await asyncio.shield(_stop(process))
+
+    if code:
+        raise FFmpegException(args[0], '\n'.join(lines), 'Error code :: %s' % code)
+
+
+async def run_async(args, on_progress=None, on_log=None, timeout=None):
+    """
+    Runs the arguments of a command, see `argv`, the progress is reported as the
+    blocks of the -progress output are read. The filter script of the command is
+    removed after
+
+    Parameters
+    ----------
+    args : list
+        arguments of the command, the command first
+    on_progress : callable
+        called with every `FFmpegProgress`
+    on_log : callable
+        called with every line of the log
+    timeout : float
+        max secs of the run, no limit if None
+
+    Raises
+    ------
+    FFmpegException
+        ffmpeg exited with an error
+    asyncio.TimeoutError
+        the run took longer than timeout, ffmpeg is stopped
+    asyncio.CancelledError
+        the run was cancelled, ffmpeg is stopped
+    """
+    try:
+        await asyncio.wait_for(_run(args, on_progress, on_log), timeout)
+    finally:
+        remove_filter_script(args)
+
+
+async def run_all(commands, limit=None, on_progress=None, on_log=None, timeout=None, runner=None):
+    """
+    Runs the commands at the same time on the loop, at most limit at once. The first
+    error cancels the commands still running or waiting
+
+    Parameters
+    ----------
+    commands : list
+        list of the arguments of the commands
+    limit : int
+        max commands running at once, all if None
+    on_progress : callable
+        called with the index of the command and its `FFmpegProgress`
+    on_log : callable
+        called with the index of the command and the line of its log
+    timeout : float
+        max secs of every command, no limit if None
+    runner : callable
+        coroutine that runs a command with the arguments of `run_async`, ex: to wait
+        for a pool, `run_async` if None
+    """
+    runner = run_async if runner is None else runner
+    semaphore = asyncio.Semaphore(limit or max(1, len(commands)))
+
+    def callback(function, index):
+        return None if function is None else (lambda value: function(index, value))
+
+    async def run(index, args):
+        try:
+            async with semaphore:
+                await runner(args, on_progress=callback(on_progress, index), on_log=callback(on_log, index),
+                             timeout=timeout)
+        finally:
+            remove_filter_script(args)
+
+    tasks = [asyncio.ensure_future(run(index, args)) for index, args in enumerate(commands)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
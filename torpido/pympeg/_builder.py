@@ -1,11 +1,28 @@
 """ Builder to build the node chain """
 
+import threading
+from itertools import count
+
+# prefix of the generated labels, custom labels should not be the prefix followed by a number
+LABEL_PREFIX = "L"
+
+# builders of every thread, the last one is used by the functions
+_local = threading.local()
+
 
 class Stream:
     """
     Simple list manager, adds nodes and returns the chain
     of graph call. Also keeps track of labelling the input
-    nodes.
+    nodes and generates the labels of the streams.
+
+    A stream is the context the nodes are added to, every thread has its own
+    stream and a stream used in a with block is the context in the block. Graphs
+    can be built at the same time on separate threads or nested on one thread
+
+            with pympeg.Stream() as stream:
+                pympeg.input(name="example.mp4").output(name="example.wav")
+                args = pympeg.argv()
 
     Attributes
     ----------
@@ -13,11 +30,22 @@ class Stream:
             chain of the nodes
     count : int
             tracks the index of the InputNode
+    _labels : count
+            index of the next generated label
     """
 
     def __init__(self):
         self._stream = list()
         self.count = 0
+        self._labels = count()
+
+    def __enter__(self):
+        _builders().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _builders().pop()
+        return False
 
     def add(self, node):
         """ Add a node type to the chain """
@@ -27,3 +55,25 @@ class Stream:
     def graph(self):
         """ Returns the chain of the nodes """
         return self._stream
+
+    def label(self):
+        """ Returns the next label, unique in the stream and same for the same chain """
+        return "%s%d" % (LABEL_PREFIX, next(self._labels))
+
+    def clear(self):
+        """ Removes all the nodes, the labels start again """
+        self.__init__()
+        return self
+
+
+def _builders():
+    """ Returns the streams of the thread, the first is the default stream of the thread """
+    if not hasattr(_local, "builders"):
+        _local.builders = [Stream()]
+
+    return _local.builders
+
+
+def current():
+    """ Returns the stream the nodes are added to """
+    return _builders()[-1]
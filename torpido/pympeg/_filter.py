@@ -6,25 +6,31 @@ filter and is understandable by the ffmpeg command line.
 """
 
 import os
+import shlex
+import tempfile
 from subprocess import Popen, PIPE
 
-from ._builder import Stream
+from ._builder import Stream, current
 from ._exceptions import *
 from ._node import (InputNode, FilterNode, Label,
                     OptionNode, OutputNode, GlobalNode, stream)
-from ._util import get_str_from_filter, get_str_from_global
+from ._optimize import optimize
+from ._util import get_str_from_filter, get_str_from_global, get_str_from_input, get_args_from_input
 from torpido import ffpbar
 
 __all__ = ["input", "filter", "output", "arg", "run", "graph", "option",
-           "concat", "init", "scale", "crop", "setpts", "fade", "afade",
-           "command"]
-s = Stream()
+           "concat", "init", "scale", "crop", "setpts", "asetpts", "fade",
+           "afade", "command", "argv", "remove_filter_script", "Stream"]
+
+# filter graphs longer than this (in chars) are passed to ffmpeg in a script file
+FILTER_SCRIPT_LENGTH = 4096
+
+FILTER_SCRIPT = "-filter_complex_script"
 
 
 def init():
-    """ Re-initializes the stream object """
-    global s
-    s = Stream()
+    """ Re-initializes the stream object of the thread, or of the with block """
+    current().clear()
 
 
 def _check_arg_type(args):
@@ -167,7 +173,7 @@ def _no_filter_command(input_nodes, output_nodes, option_nodes, cmd="ffmpeg"):
     result.append(" -y")
 
     for inp in input_nodes:
-        result.append(" -i '%s' " % inp.name)
+        result.append(get_str_from_input(inp))
 
     # adding option nodes in filter
     for opt in option_nodes:
@@ -178,11 +184,12 @@ def _no_filter_command(input_nodes, output_nodes, option_nodes, cmd="ffmpeg"):
     return ''.join(result)
 
 
-def _get_command_from_graph(graph, cmd="ffmpeg"):
+def _get_command_from_graph(graph, cmd="ffmpeg", optimized=True):
     """
     Generates the command line for the graph, this command is
     then ran using subprocess which will raise any exception or
-    error on the ffmpeg side.
+    error on the ffmpeg side. The graph is optimised first, see
+    `optimize`
 
     Parameters
     ----------
@@ -190,6 +197,8 @@ def _get_command_from_graph(graph, cmd="ffmpeg"):
         nodes from the end of the run function
     cmd : str
         ffmpeg default command, may changed based on alias
+    optimized : bool
+        False to generate the graph as it was built
 
     Returns
     -------
@@ -202,6 +211,9 @@ def _get_command_from_graph(graph, cmd="ffmpeg"):
         raised when the subprocess function fails.
     """
     result = list()
+    if optimized:
+        graph = optimize(graph)
+
     input_nodes, option_nodes, filter_nodes, global_nodes, output_nodes = _get_nodes_from_graph(graph)
 
     # means that there is no filter
@@ -211,7 +223,7 @@ def _get_command_from_graph(graph, cmd="ffmpeg"):
     # adding input nodes in fiter
     result.append(cmd)
     for inp in input_nodes:
-        result.append(" -i '%s' " % inp.name)
+        result.append(get_str_from_input(inp))
 
     # adding option nodes in filter
     for opt in option_nodes:
@@ -241,18 +253,114 @@ def _get_command_from_graph(graph, cmd="ffmpeg"):
     return ''.join(result)
 
 
+def _get_filter_graph(filter_nodes, global_nodes):
+    """ Returns the filter graph of the filter and global nodes """
+    result = [get_str_from_filter(filter_) for filter_ in filter_nodes]
+    result.extend(get_str_from_global(global_) for global_ in global_nodes)
+
+    # getting rid of the semicolon at the end of the filter complex
+    return ''.join(result)[:-1]
+
+
+def _write_filter_script(filter_graph):
+    """ Writes the filter graph to a temp file and returns its name """
+    descriptor, file_name = tempfile.mkstemp(prefix="pympeg-", suffix=".graph")
+
+    with os.fdopen(descriptor, "w") as file:
+        file.write(filter_graph)
+
+    return file_name
+
+
+def _get_args_from_graph(graph, cmd="ffmpeg", optimized=True, script_length=FILTER_SCRIPT_LENGTH):
+    """
+    Generates the arguments of the command for the graph, to run without a shell.
+    File names and the filter graph are single arguments so nothing is quoted. A
+    filter graph longer than script_length chars is written to a temp file passed
+    with `-filter_complex_script`, ffmpeg reads it instead of parsing a huge argument
+    and the command stays within the limits on the length of the arguments. The
+    file is removed with `remove_filter_script`
+
+    Parameters
+    ----------
+    graph : list-type
+        nodes from the end of the run function
+    cmd : str
+        ffmpeg default command, may changed based on alias
+    optimized : bool
+        False to generate the graph as it was built
+    script_length : int
+        max length of the filter graph in the arguments, always inline if None
+
+    Returns
+    -------
+    list
+        arguments of the command, the command first
+    """
+    if optimized:
+        graph = optimize(graph)
+
+    input_nodes, option_nodes, filter_nodes, global_nodes, output_nodes = _get_nodes_from_graph(graph)
+    result = [cmd, "-y"]
+
+    for inp in input_nodes:
+        result.extend(get_args_from_input(inp))
+
+    for opt in option_nodes:
+        result.extend([opt.tag, str(opt.name)])
+
+    # means that there is no filter, the streams of the inputs are mapped
+    if len(filter_nodes) == 0 and len(global_nodes) == 0:
+        for out in output_nodes:
+            if out.map:
+                for inp in out.inputs:
+                    result.extend([out.map, inp.label])
+            result.append(out.name)
+        return result
+
+    filter_graph = _get_filter_graph(filter_nodes, global_nodes)
+    if script_length is not None and len(filter_graph) > script_length:
+        result.extend([FILTER_SCRIPT, _write_filter_script(filter_graph)])
+    else:
+        result.extend(["-filter_complex", filter_graph])
+
+    for out in output_nodes:
+        if out.map:
+            for inp in out.inputs:
+                result.extend([out.map, "[%s]" % inp.label])
+        result.append(out.name)
+
+    return result
+
+
+def remove_filter_script(args):
+    """ Removes the filter script of the arguments if they have one """
+    if FILTER_SCRIPT in args:
+        file_name = args[args.index(FILTER_SCRIPT) + 1]
+
+        if os.path.isfile(file_name):
+            os.remove(file_name)
+
+
 @stream()
-def input(*args, name):
+def input(*args, name, options=None, size=None):
     """
     Creates the input node. Can create multiple input nodes.
     Requires the named argument to execute.
             ffmpeg -i input_example.mp4 -i input.mp3 ...
 
+    Input options like seeking only read the part of the file needed.
+            ffmpeg -ss 10 -t 5 -i input_example.mp4 ...
+
     Parameters
     ----------
 
     name : str
         name and path of the file
+    options : dict
+        input options placed before the file, ex: {"-ss": 10, "-t": 5}
+    size : tuple
+        width and height of the video if known, scales to it are dropped
 
     Returns
     -------
@@ -271,10 +379,10 @@ def input(*args, name):
         raise FileExistsError(f"Input file {name} does not exits.")
 
     # creating a file input filter
-    node = InputNode(name, s.count)
+    node = InputNode(name, current().count, options, size)
 
     # adding to the stream
-    s.add(node).count += 1
+    current().add(node).count += 1
 
     return node
 
@@ -326,7 +434,7 @@ def filter(*args, **kwargs):
     else:
         filter_node.add_input(_get_label_param(inputs))
 
-    s.add(filter_node)
+    current().add(filter_node)
     return filter_node
 
 
@@ -371,7 +479,7 @@ def output(*args, **kwargs):
     else:
         node.add_input(_get_label_param(inputs))
 
-    s.add(node)
+    current().add(node)
     return node
 
 
@@ -438,7 +546,7 @@ def arg(caller=None, args=None, outputs=None, inputs=None):
     else:
         node.add_output(_get_label_param(outputs))
 
-    s.add(node)
+    current().add(node)
     return node
 
 
@@ -473,7 +581,7 @@ def option(*args, tag=None, name=None, output=None):
         outputs.append(_get_label_param(output))
 
     node = OptionNode(tag, name, output)
-    s.add(node)
+    current().add(node)
 
     return node
 
@@ -532,7 +640,7 @@ def concat(*args, inputs: list, outputs: int):
 
     # concat filter has different syntax so using Global Node
     node = GlobalNode(inputs=_inputs, args=command, outputs=_outputs)
-    s.add(node)
+    current().add(node)
 
     return node
 
@@ -587,7 +695,7 @@ def crop(*args, w: str, h: str, x="0", y="0", keep_aspect=1):
         }
     )
 
-    s.add(node)
+    current().add(node)
 
     return node
 
@@ -629,7 +737,7 @@ def scale(*args, w: str, h: str):
         }
     )
 
-    s.add(node)
+    current().add(node)
 
     return node
 
@@ -660,26 +768,28 @@ def run(caller, display_command=True):
     if not isinstance(caller, OutputNode):
         raise OutputNodeMissingInRun
 
-    graph = s.graph()
-    command = _get_command_from_graph(graph)
+    graph = current().graph()
+    command = _get_args_from_graph(graph)
 
     if display_command:
-        print(command)
+        print(shlex.join(command))
 
     progress = ffpbar.Progress()
-    process = Popen(
-        args=command,
-        shell=True,
-        stdout=PIPE,
-        stderr=PIPE,
-        universal_newlines=True,
-        encoding='utf-8'
-    )
+    try:
+        process = Popen(
+            args=command,
+            stdout=PIPE,
+            stderr=PIPE,
+            universal_newlines=True,
+            encoding='utf-8'
+        )
 
-    for out in process.stdout:
-        progress.display(out)
+        for out in process.stdout:
+            progress.display(out)
 
-    code = process.wait()
+        code = process.wait()
+    finally:
+        remove_filter_script(command)
 
     if code:
         progress.clear()
@@ -722,7 +832,7 @@ def setpts(*args, expr="setpts=PTS-STARTPTS"):
         outputs=Label()
     )
 
-    s.add(node)
+    current().add(node)
     return node
 
 
@@ -758,7 +868,7 @@ def asetpts(*args, expr="asetpts=N/SR/TB"):
         outputs=Label()
     )
 
-    s.add(node)
+    current().add(node)
     return node
 
 
@@ -806,7 +916,7 @@ def fade(*args, typ="in", st=0, d=5, color="black"):
         inputs=inputs
     )
 
-    s.add(node)
+    current().add(node)
     return node
 
 
@@ -854,17 +964,23 @@ def afade(*args, typ="in", st=0, d=5, curve="tri"):
         inputs=inputs
     )
 
-    s.add(node)
+    current().add(node)
     return node
 
 
 @stream()
 def graph(*args):
     """ Returns the chain of the nodes, printable for representations """
-    return s.graph()
+    return current().graph()
+
+
+@stream()
+def command(*args, optimized=True):
+    """ Returns the command for the chain, optimised unless told otherwise """
+    return _get_command_from_graph(current().graph(), optimized=optimized)
 
 
 @stream()
-def command(*args):
-    """ Returns the command for the chain """
-    return _get_command_from_graph(s.graph())
+def argv(*args, optimized=True, script_length=FILTER_SCRIPT_LENGTH):
+    """ Returns the arguments of the command for the chain to run without a shell, see `_get_args_from_graph` """
+    return _get_args_from_graph(current().graph(), optimized=optimized, script_length=script_length)
@@ -1,14 +1,14 @@
 """ All the node types """
 
 from ._exceptions import *
-from ._util import gen_labels
+from ._builder import current
 
 
 class Label:
     """
     Label class to add input and output label to each type of the node.
-    If label string is provided same would be used else a generator will
-    create a label of length 3 (alphabetic)
+    If label string is provided same would be used else the next label
+    of the current stream is used, ex: L0, L1 ...
 
     Attributes
     -----------
@@ -18,7 +18,7 @@ class Label:
 
     def __init__(self, label=None):
         if label is None:
-            self._label = gen_labels()
+            self._label = current().label()
         else:
             self._label = label
 
@@ -52,12 +52,22 @@ class InputNode:
             mp4 = pympeg.input(name="example.mp4")
             mp3 = pympeg.input(name="example.mp3")
 
+    Input options are placed before the file, ex: seeking the input
+
+            ffmpeg -ss 10 -t 5 -i example.mp4 ...
+
+            mp4 = pympeg.input(name="example.mp4", options={"-ss": 10, "-t": 5})
+
     Attributes
     ----------
     _name : str
             name of the input file
     _output : str
             label, representing the index of the input
+    _options : dict
+            input options, tag and value
+    _size : tuple
+            width and height of the video if known, lets the optimiser drop scales to it
 
     Raises
     -------
@@ -65,12 +75,17 @@ class InputNode:
             name or the output label is missing
     """
 
-    def __init__(self, name, output):
+    def __init__(self, name, output, options=None, size=None):
         if name is None or output is None:
             raise InputParamsMissing
 
         self._name = name
         self._output = str(output)
+        self._options = dict()
+        self._size = size
+
+        if options is not None:
+            self._options = options
 
     def __repr__(self):
         """ Pretty print """
@@ -81,6 +96,16 @@ class InputNode:
         """ returns name of the file """
         return self._name
 
+    @property
+    def options(self):
+        """ returns the input options """
+        return self._options
+
+    @property
+    def size(self):
+        """ returns the width and height of the video, None if not known """
+        return self._size
+
     @property
     def audio(self):
         """ returns the audio stream """
@@ -101,6 +126,16 @@ class InputNode:
         self._name = name
         return self
 
+    def set_option(self, tag, value):
+        """ sets an input option """
+        self._options[tag] = value
+        return self
+
+    def set_size(self, width, height):
+        """ sets the width and height of the video """
+        self._size = (width, height)
+        return self
+
 
 class OutputNode:
     """
@@ -0,0 +1,204 @@
+"""
+Optimisation pass over the chain of nodes before the command is generated. The
+graph is rewritten without changing its output
+
+    - scales to the size of the input are dropped (the input size must be known)
+    - adjacent trims (or atrims) are fused into one
+    - per frame filters (scale, setsar, ...) applied by all the branches of a split
+      directly after it are moved above the split, so they run once instead of once
+      per branch. Filters after a trim are kept, they only run on the frames kept
+
+The nodes are copied, the chain of the stream is not modified.
+"""
+
+import copy
+import re
+
+from ._node import InputNode, FilterNode, GlobalNode, OutputNode
+
+__all__ = ["optimize"]
+
+# filters that only change the frames and not the time
+SPATIAL = {"scale", "crop", "pad", "setsar", "setdar", "format"}
+
+# filters that do not change the size of the frames
+SIZE_PRESERVING = {"trim", "setpts", "setsar", "setdar", "format", "split"}
+
+# trim parameters that can be fused
+TRIM_PARAMS = {"start", "duration", "end"}
+
+# label of a video stream of an input, ex: 0, 0:v, 0:v:0
+INPUT_LABEL = re.compile(r"^(\d+)(:v(:0)?)?$")
+
+
+def optimize(graph):
+    """
+    Returns the optimised chain of the nodes
+
+    Parameters
+    ----------
+    graph : list
+        chain of the nodes
+
+    Returns
+    -------
+    list
+        optimised copy of the chain
+    """
+    graph = copy.deepcopy(graph)
+
+    _drop_noop_scales(graph)
+    _fuse_trims(graph)
+    _hoist_above_split(graph)
+
+    return graph
+
+
+def _names(node):
+    """ Names of the filters of the node, a global node can have a chain, ex: setsar=1,setdar=16/9 """
+    if isinstance(node, FilterNode):
+        return [node.name]
+
+    if isinstance(node, GlobalNode) and node.name:
+        return [part.split("=")[0].strip() for part in node.name.split(",")]
+
+    return list()
+
+
+def _linear(node):
+    """ True if the node is a filter with a single input and output """
+    return isinstance(node, (FilterNode, GlobalNode)) and len(node.inputs) == 1 and len(node.outputs) == 1
+
+
+def _consumers(graph, label):
+    """ Nodes with the label as an input """
+    return [node for node in graph if isinstance(node, (FilterNode, GlobalNode, OutputNode)) and label in node.inputs]
+
+
+def _producer(graph, label):
+    """ Node with the label as an output, an input node for the input labels """
+    match = INPUT_LABEL.match(label.label)
+    if match is not None:
+        return next((node for node in graph if isinstance(node, InputNode) and node.outputs == match.group(1)), None)
+
+    return next((node for node in graph if isinstance(node, (FilterNode, GlobalNode)) and label in node.outputs),
+                None)
+
+
+def _remove(graph, node):
+    """ Removes a linear node, its consumers take its input """
+    for consumer in _consumers(graph, node.outputs[0]):
+        consumer.inputs[:] = [node.inputs[0] if label == node.outputs[0] else label for label in consumer.inputs]
+
+    graph.remove(node)
+
+
+def _size(graph, label):
+    """ Size of the frames of the stream of the label, None if not known """
+    while True:
+        node = _producer(graph, label)
+
+        if isinstance(node, InputNode):
+            return node.size
+
+        if node is None or len(node.inputs) != 1 or not set(_names(node)) <= SIZE_PRESERVING:
+            return None
+
+        label = node.inputs[0]
+
+
+def _drop_noop_scales(graph):
+    """ Drops the scales to the size of their input """
+    for node in list(graph):
+        if not _linear(node) or _names(node) != ["scale"] or set(node.params) != {"w", "h"}:
+            continue
+
+        size = _size(graph, node.inputs[0])
+        if size is not None and (str(size[0]), str(size[1])) == (str(node.params["w"]), str(node.params["h"])):
+            _remove(graph, node)
+
+
+def _number(value):
+    """ Int if the float is whole """
+    return int(value) if float(value).is_integer() else value
+
+
+def _trim_range(params):
+    """ Start and end in secs of the trim, end is None if not limited """
+    start = float(params.get("start", 0))
+
+    if "duration" in params:
+        end = start + float(params["duration"])
+        return start, min(end, float(params["end"])) if "end" in params else end
+
+    return start, float(params["end"]) if "end" in params else None
+
+
+def _fuse_trims(graph):
+    """ Fuses a trim followed by a trim (or atrim by atrim), both on the time of the input """
+    for node in list(graph):
+        if not _linear(node) or _names(node) not in (["trim"], ["atrim"]) or not set(node.params) <= TRIM_PARAMS:
+            continue
+
+        consumers = _consumers(graph, node.outputs[0])
+        if len(consumers) != 1 or not _linear(consumers[0]) or _names(consumers[0]) != _names(node) \
+                or not set(consumers[0].params) <= TRIM_PARAMS:
+            continue
+
+        (first_start, first_end), (second_start, second_end) = _trim_range(node.params), _trim_range(
+            consumers[0].params)
+        start = max(first_start, second_start)
+        ends = [end for end in (first_end, second_end) if end is not None]
+
+        consumers[0].params.clear()
+        consumers[0].params["start"] = _number(start)
+        if ends:
+            consumers[0].params["duration"] = _number(max(min(ends) - start, 0))
+
+        _remove(graph, node)
+
+
+def _signature(node):
+    """ Identity of the filter of the node, same for filters doing the same """
+    params = tuple(sorted((key, str(value)) for key, value in node.params.items())) \
+        if isinstance(node, FilterNode) else None
+
+    return type(node), node.name, params
+
+
+def _hoist_above_split(graph):
+    """ Moves the per frame filters all the branches of a split start with above the split """
+    for split in list(graph):
+        if len(_names(split)) != 1 or _names(split)[0] != "split" or len(split.inputs) != 1:
+            continue
+
+        # per frame filters directly after the split, a trim (or any other filter) ends the chain
+        branches = list()
+        for label in split.outputs:
+            spatial = list()
+            while True:
+                consumers = _consumers(graph, label)
+                if len(consumers) != 1 or not _linear(consumers[0]) or not set(_names(consumers[0])) <= SPATIAL:
+                    break
+
+                spatial.append(consumers[0])
+                label = consumers[0].outputs[0]
+
+            branches.append(spatial)
+
+        signatures = {tuple(_signature(node) for node in branch) for branch in branches}
+        if len(signatures) != 1 or not branches[0]:
+            continue
+
+        for branch in branches:
+            for node in branch:
+                _remove(graph, node)
+
+        # first branch filters run before the split
+        source = split.inputs[0]
+        for node in branches[0]:
+            node.inputs[:] = [source]
+            source = node.outputs[0]
+            graph.append(node)
+
+        split.inputs[:] = [source]
@@ -4,7 +4,7 @@ import os
 
 from ._exceptions import ProbeException
 
-__all__ = ['probe']
+__all__ = ['probe', 'keyframes']
 
 
 def probe(filename, cmd='ffprobe', timeout=None):
@@ -35,3 +35,47 @@ def probe(filename, cmd='ffprobe', timeout=None):
     return json.loads(out.decode('utf-8'))
 
 
+def keyframes(filename, cmd='ffprobe', timeout=None):
+    """
+    Returns the sorted times (in secs) of the keyframes of the first video stream,
+    from the start of the file as -ss counts them. The packet times include the
+    start_time of the container, which is read in the same pass and subtracted.
+    Only the packets are read, nothing is decoded
+    """
+
+    # check if file exists
+    if not os.path.isfile(filename):
+        raise FileExistsError(f"Input file: {filename} does not exits.")
+
+    args = [cmd, '-v', 'error', '-select_streams', 'v:0', '-show_entries',
+            'packet=pts_time,flags:format=start_time', '-of', 'csv']
+    args += [filename]
+
+    p = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+
+    communicate_kwargs = {}
+    if timeout is not None:
+        communicate_kwargs['timeout'] = timeout
+
+    out, err = p.communicate(**communicate_kwargs)
+
+    if p.returncode != 0:
+        raise ProbeException('ffprobe', out, err)
+
+    # lines are prefixed by the section, packet,<pts_time>,<flags> and format,<start_time>
+    times, start_time = list(), 0.0
+    for line in out.decode('utf-8').splitlines():
+        section, _, values = line.partition(',')
+        if section == 'format':
+            start_time = float(values) if values not in ('', 'N/A') else 0.0
+            continue
+
+        pts_time, _, flags = values.partition(',')
+        if section == 'packet' and 'K' in flags and pts_time not in ('', 'N/A'):
+            times.append(float(pts_time))
+
+    return sorted(time - start_time for time in times)
@@ -26,6 +26,30 @@ def get_str_from_params(params: dict):
     return ''.join(result)
 
 
+def get_str_from_input(node):
+    """ Returns the string from the input node, options before the file """
+    result = list()
+
+    for tag, value in node.options.items():
+        result.append(" %s %s" % (tag, value))
+
+    result.append(" -i '%s' " % node.name)
+
+    return ''.join(result)
+
+
+def get_args_from_input(node):
+    """ Returns the arguments of the input node, options before the file """
+    result = list()
+
+    for tag, value in node.options.items():
+        result.extend([tag, str(value)])
+
+    result.extend(["-i", node.name])
+
+    return result
+
+
 def get_str_from_filter(filter):
     """ Returns the string from the filter """
     result = list()
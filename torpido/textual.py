@@ -14,9 +14,11 @@ from .config.cache import Cache
 from .config.config import Config
 from .config.constants import *
 from .exceptions import EastModelEnvironmentMissing
+from .tools.feature_cache import FeatureCache
+from .tools.features import FeatureArray, rerank
 from .tools.logger import Log
+from .tools.media_info import MediaInfo
 from .util import image
-from .tools.ranking import Ranking
 
 
 class Textual:
@@ -34,8 +36,8 @@ class Textual:
         video fps
     __frame_count : int
         number of frames in the video
-    __text_ranks : list
-        list of the ranks
+    __confidences : FeatureArray
+        max text confidence of every frame (float32)
     __video_getter : OpenCV
         opencv file reader
     __cache : Cache
@@ -54,14 +56,17 @@ class Textual:
         layer name to detect the text in the video and return the code
     __text_display_layer_names
         layers to detect and return the coordinates of the boxes of text detected
+    __features : FeatureCache
+        persistent cache of the features of the videos already processed
     """
 
     def __init__(self):
         cv2.setUseOptimized(True)
-        self.__fps = self.__frame_count = self.__text_ranks = self.__video_getter = None
+        self.__fps = self.__frame_count = self.__confidences = self.__video_getter = None
         self.__cache = Cache()
         self.__min_confidence, self.__skip_frames = Config.TEXT_MIN_CONFIDENCE, Config.TEXT_SKIP_FRAMES
         self.__WIDTH = self.__HEIGHT = 320  # same thing for this
+        self.__features = FeatureCache()
 
         # saving the original dim of the frame
         self._original_H, self._original_W = None, None
@@ -82,8 +87,8 @@ class Textual:
 
     def __run_text_detect(self, blob):
         """
-        Function to detect only text and no display. Gets the scores and calculates if the image
-        contains any text
+        Function to detect only text and no display. Gets the scores and returns the max
+        confidence, the image contains text if it is above the min confidence
 
         Parameters
         ----------
@@ -92,29 +97,14 @@ class Textual:
 
         Returns
         -------
-        bool
-            True denotes text detected
+        float
+            max confidence of the text in the image
         """
         self.__net.setInput(blob)
         scores = self.__net.forward(self.__text_detect_layer_name)
-        num_rows, num_cols = np.asarray(scores).shape[3: 5]
-        confidences = list()
 
-        # make this faster some how ?
         # since image is 320x320 the output is 80x80 (scores)
-        for x in range(0, num_rows):
-            score_data = scores[0][0][0][x]
-            for y in range(0, num_cols):
-                if score_data[y] < self.__min_confidence:
-                    continue
-
-                confidences.append(score_data[y])
-
-        # if confidences contain some value
-        if len(confidences) > 0:
-            return True
-
-        return False
+        return np.max(np.asarray(scores)[0, 0, 0])
 
     def __run_text_detect_display(self, blob, original):
         """
@@ -130,8 +120,8 @@ class Textual:
 
         Returns
         -------
-        bool
-            True denotes text detected
+        float
+            max confidence of the text in the image
         """
         # running the model
         self.__net.setInput(blob=blob)
@@ -200,9 +190,7 @@ class Textual:
         cv2.imshow("Text Detection", original)
         cv2.waitKey(1) & 0xFF
 
-        if len(confidences) > 0:
-            return True
-        return False
+        return np.max(scores[0, 0])
 
     def __timed_ranking_normalize(self):
         """
@@ -216,21 +204,12 @@ class Textual:
         results.
 
         we will read the list and slice the video to get 1 sec of frames and get
-        mean/average as the rank for the 1 sec
+        mean/average as the rank for the 1 sec. The frames are ranked from the raw
+        confidences in the cache, see `features.rerank`
         """
-        text_normalize = list()
-
-        if len(self.__text_ranks) == 0:
-            text_normalize.extend([0] * int(self.__frame_count))
-
-        for i in range(0, int(self.__frame_count), int(self.__fps)):
-            if len(self.__text_ranks) >= (i + int(self.__fps)):
-                text_normalize.append(np.mean(self.__text_ranks[i: i + int(self.__fps)]))
-            else:
-                break
+        text_normalize = rerank((CACHE_FEATURE_TEXT,), fps=self.__fps, frame_count=self.__frame_count,
+                                settings={"TEXT_MIN_CONFIDENCE": self.__min_confidence})[CACHE_RANK_TEXT]
 
-        # saving all processed stuffs
-        Ranking.add(CACHE_RANK_TEXT, text_normalize)
         Log.d(f"Textual rank length {len(text_normalize)}")
         Log.i("Textual ranking saved .............")
 
@@ -257,14 +236,29 @@ class Textual:
             Log.e(f"File {input_file} does not exists")
             return
 
+        # same video already analysed, only the ranking is done again
+        key = self.__features.key(input_file, "textual", {"skip_frames": Config.TEXT_SKIP_FRAMES})
+        entry = self.__features.get(key)
+        if entry is not None:
+            self.__features.restore(entry)
+            self.__fps, self.__frame_count = entry["cache"][CACHE_FPS], entry["cache"][CACHE_FRAME_COUNT]
+            self.__timed_ranking_normalize()
+            return
+
         self.__video_getter = cv2.VideoCapture(str(input_file))
-        self.__fps = self.__video_getter.get(cv2.CAP_PROP_FPS)
-        self.__frame_count = self.__video_getter.get(cv2.CAP_PROP_FRAME_COUNT)
+
+        # metadata probed by the job, opencv if the video was not probed
+        info = MediaInfo.load(input_file)
+        if info is not None and info.has_frames:
+            self.__fps, self.__frame_count = info.fps, info.frame_count
+        else:
+            self.__fps = self.__video_getter.get(cv2.CAP_PROP_FPS)
+            self.__frame_count = self.__video_getter.get(cv2.CAP_PROP_FRAME_COUNT)
         self.__skip_frames = int(self.__fps * self.__skip_frames)
 
-        # maintaining the ranks for text detection
+        # maintaining the confidences for text detection
         count, original = 0, None
-        self.__text_ranks = list()
+        self.__confidences = FeatureArray(np.float32)
 
         while True:
             ret, frame = self.__video_getter.read()
@@ -293,17 +287,13 @@ class Textual:
 
                 # run text detection
                 if display:
-                    detected_text = self.__run_text_detect_display(blob, original)
+                    confidence = self.__run_text_detect_display(blob, original)
                 else:
-                    detected_text = self.__run_text_detect(blob)
+                    confidence = self.__run_text_detect(blob)
 
-                # if text is detected
-                if detected_text:
-                    self.__text_ranks.extend([Config.RANK_TEXT] * int(self.__skip_frames))
-                    Log.d("Text detected.")
-                else:
-                    self.__text_ranks.extend([0] * int(self.__skip_frames))
-                    Log.d("No text detected.")
+                # same confidence for all the skipped frames
+                self.__confidences.append(confidence, int(self.__skip_frames))
+                Log.d("Text detected." if confidence >= self.__min_confidence else "No text detected.")
 
         # clearing the memory
         self.__video_getter.release()
@@ -311,5 +301,14 @@ class Textual:
         if display:
             cv2.destroyAllWindows()
 
-        # calling the normalization of ranking
+        # saving the raw confidences and calling the normalization of ranking
+        confidences = np.asarray(self.__confidences.array())
+        self.__cache.write_data(CACHE_FEATURE_TEXT, confidences)
         self.__timed_ranking_normalize()
+
+        self.__features.put(key, {"cache": {CACHE_FPS: self.__fps, CACHE_FRAME_COUNT: self.__frame_count}},
+                            arrays={CACHE_FEATURE_TEXT: confidences})
+
+        # mapped array is released before its file
+        del confidences
+        self.__confidences.close()
@@ -0,0 +1,192 @@
+"""
+Export of the ranks of the job before the cache is cleaned up. The per bin ranks and
+raw values of all the features, their sum and the timestamps are written in a columnar format
+(.npz and .parquet if pyarrow is installed) along with the cut list as an EDL and
+a JSON file, so other tools can use them without running the analysis again.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from ..config.cache import Cache
+from ..config.config import Config
+from ..config.constants import (CACHE_FPS, CACHE_FRAME_COUNT, CACHE_FEATURE_MOTION, CACHE_FEATURE_BLUR,
+                                CACHE_FEATURE_TEXT, CACHE_FEATURE_AUDIO, EXPORT_FEATURES_FILE, EXPORT_CUTS_FILE)
+from ..tools.features import FEATURES, per_bin
+from ..tools.logger import Log
+from ..tools.ranking import Ranking
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# names of the columns of the features in the order of the ranks
+COLUMNS = ("motion", "blur", "text", "audio")
+
+# columns of the raw features, per bin mean of the frames
+RAW_COLUMNS = {CACHE_FEATURE_MOTION: "motion_raw", CACHE_FEATURE_BLUR: "blur_raw",
+               CACHE_FEATURE_TEXT: "text_raw", CACHE_FEATURE_AUDIO: "audio_raw"}
+
+
+def feature_table():
+    """
+    Returns the ranks and the raw values of the features of the job as columns, time
+    is the start of every bin in secs and rank the sum of all the features
+
+    Returns
+    -------
+    dict
+        name of the column -> np.ndarray
+    """
+    matrix = Ranking.matrix()
+    table = {"time": np.arange(matrix.shape[1]) * Config.RANK_RESOLUTION}
+    table.update(zip(COLUMNS, matrix))
+    table.update(raw_features(matrix.shape[1]))
+    table["rank"] = Ranking.sum_ranks()
+
+    return table
+
+
+def raw_features(bins):
+    """
+    Returns the raw values of the features of the job per bin, the per frame values
+    are averaged over the frames of a bin. Bins without a value (ex: the feature is
+    missing) are NaN
+
+    Parameters
+    ----------
+    bins : int
+        no of bins of the ranks
+
+    Returns
+    -------
+    dict
+        name of the column -> np.ndarray
+    """
+    cache, table = Cache(), dict()
+    fps, frame_count = cache.read_data(CACHE_FPS), cache.read_data(CACHE_FRAME_COUNT)
+
+    for feature, column in RAW_COLUMNS.items():
+        values, table[column] = cache.read_data(feature), np.full(bins, np.nan)
+        if values is None or len(values) == 0 or (FEATURES[feature].per_frame and fps is None):
+            continue
+
+        values = per_bin(values, fps, frame_count) if FEATURES[feature].per_frame else np.asarray(values)
+        length = min(bins, len(values))
+        table[column][:length] = values[:length]
+
+    return table
+
+
+def write_npz(file_name, table, timestamps):
+    """ Writes the columns and the (start, end) timestamps as a compressed .npz """
+    np.savez_compressed(file_name, timestamps=np.asarray(timestamps, dtype=np.float64).reshape(-1, 2), **table)
+
+
+def write_parquet(file_name, table):
+    """
+    Writes the columns as a parquet file
+
+    Returns
+    -------
+    bool
+        False if pyarrow is not installed
+    """
+    if pyarrow is None:
+        return False
+
+    pyarrow.parquet.write_table(pyarrow.table({name: np.asarray(column) for name, column in table.items()}),
+                                file_name)
+    return True
+
+
+def timecode(sec, fps):
+    """ Non drop frame timecode HH:MM:SS:FF of the secs """
+    base = max(1, int(round(fps)))
+    frames = int(round(sec * base))
+
+    return "%02d:%02d:%02d:%02d" % (frames // (3600 * base), frames // (60 * base) % 60, frames // base % 60,
+                                    frames % base)
+
+
+def write_edl(file_name, timestamps, source, fps):
+    """
+    Writes the cut list as a CMX 3600 EDL, every cut is an event from the source placed
+    one after the other on the record side
+
+    Parameters
+    ----------
+    file_name : str
+        output file
+    timestamps : list
+        list of [start, end] in secs
+    source : str
+        input video file
+    fps : float
+        frames per sec of the video
+    """
+    record = 0
+    lines = [f"TITLE: {os.path.splitext(os.path.basename(source))[0]}", "FCM: NON-DROP FRAME", ""]
+
+    for event, (start, end) in enumerate(timestamps, start=1):
+        lines.append("%03d  AX       AA/V  C        %s %s %s %s" % (event, timecode(start, fps), timecode(end, fps),
+                                                                   timecode(record, fps),
+                                                                   timecode(record + end - start, fps)))
+        lines.append(f"* FROM CLIP NAME: {os.path.basename(source)}")
+        lines.append("")
+        record += end - start
+
+    with open(file_name, "w") as file:
+        file.write("\n".join(lines))
+
+
+def write_cut_json(file_name, timestamps, source, fps):
+    """ Writes the cut list as JSON with the source, fps and the cuts in secs """
+    with open(file_name, "w") as file:
+        json.dump({
+            "source": os.path.abspath(source), "fps": fps, "resolution": Config.RANK_RESOLUTION,
+            "cuts": [{"start": start, "end": end, "duration": end - start} for start, end in timestamps]
+        }, file, indent=2)
+
+
+def export(video_file, timestamps=None, output_path=None):
+    """
+    Exports the ranks and the cut list of the job next to the video file or in the
+    output path, ex: video_features.npz, video_features.parquet, video_cuts.edl and
+    video_cuts.json
+
+    Parameters
+    ----------
+    video_file : str
+        input video file
+    timestamps : list
+        list of [start, end] in secs, timestamps of the job if None
+    output_path : str
+        directory to write to, directory of the video file if None
+
+    Returns
+    -------
+    list
+        files written
+    """
+    timestamps = Ranking.get_timestamps() if timestamps is None else timestamps
+    output_path = os.path.dirname(os.path.abspath(video_file)) if output_path is None else output_path
+    base_name = os.path.join(output_path, os.path.splitext(os.path.basename(video_file))[0])
+    table, fps = feature_table(), Cache().read_data(CACHE_FPS)
+
+    features, cuts = base_name + EXPORT_FEATURES_FILE, base_name + EXPORT_CUTS_FILE
+    written = [features + ".npz", cuts + ".edl", cuts + ".json"]
+
+    write_npz(written[0], table, timestamps)
+    write_edl(written[1], timestamps, video_file, fps)
+    write_cut_json(written[2], timestamps, video_file, fps)
+
+    if write_parquet(features + ".parquet", table):
+        written.append(features + ".parquet")
+
+    Log.i(f"Exported the features and the cut list :: {', '.join(written)}")
+    return written
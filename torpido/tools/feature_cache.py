@@ -0,0 +1,273 @@
+"""
+Persistent cache of the analysis results (ranks and the stage outputs). An entry is
+addressed by a fast content hash of the input file and the settings that affect the
+stage, so re-running a video with only the cut settings changed skips the analysis.
+
+The cache is bounded in size, the least recently used entries are evicted. Hits and
+misses are counted per job and over the life of the cache.
+
+The arrays of an entry (ex: the raw features, the de-noised audio) are stored as .npy
+files of their own next to the entry, they are read back memory mapped and evicted
+with the entry. An entry is {"cache": small values of the job cache, "arrays": names
+of its arrays} and any other small values of the stage.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from ..config.cache import Cache
+from ..config.config import Config
+from ..config.constants import (FEATURE_CACHE_NAME, FEATURE_CACHE_PREFIX,
+                                FEATURE_CACHE_STATS, CACHE_FEATURE_STATS)
+from ..tools.logger import Log
+from ..tools.ranking import Ranking
+
+# no of blocks read from the file for the content hash and the size of each
+HASH_BLOCKS, HASH_BLOCK_SIZE = 16, 1 << 16
+
+# bumped when the stored features change, old entries then never match
+FEATURE_VERSION = 1
+
+# separates the key of an entry and the name of its array, never in the key of an entry
+ARRAY_SEPARATOR = "."
+
+
+def content_hash(file_name, blocks=HASH_BLOCKS, block_size=HASH_BLOCK_SIZE):
+    """
+    Fast content hash of a file, the size and evenly spaced blocks (including the first
+    and the last) are hashed instead of the entire file
+
+    Parameters
+    ----------
+    file_name : str
+        file to hash
+    blocks : int
+        no of blocks to read
+    block_size : int
+        size of each block in bytes
+
+    Returns
+    -------
+    str
+        hex digest
+    """
+    size = os.path.getsize(file_name)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=20)
+
+    with open(file_name, "rb") as file:
+        if size <= blocks * block_size:
+            digest.update(file.read())
+        else:
+            step = (size - block_size) // (blocks - 1)
+            for i in range(blocks):
+                file.seek(i * step)
+                digest.update(file.read(block_size))
+
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    Content addressed cache of the results of an analysis stage, shared by all the jobs
+
+    Attributes
+    ----------
+    __cache : Cache
+        store of the entries, in its own namespace
+    __max_size : int
+        max size of all the entries in bytes
+    __enabled : bool
+        False to always miss and never store
+    """
+
+    def __init__(self, max_size=None, enabled=None):
+        self.__cache = Cache(FEATURE_CACHE_NAME)
+        self.__max_size = int((Config.FEATURE_CACHE_SIZE if max_size is None else max_size) * (1 << 20))
+        self.__enabled = Config.FEATURE_CACHE if enabled is None else enabled
+
+    @staticmethod
+    def key(input_file, stage, settings):
+        """
+        Returns the key of the entry for the input and settings of a stage
+
+        Parameters
+        ----------
+        input_file : str
+            input of the stage
+        stage : str
+            name of the stage
+        settings : dict
+            settings that change the output of the stage
+
+        Returns
+        -------
+        str
+            key of the entry
+        """
+        digest = hashlib.blake2b(content_hash(input_file).encode(), digest_size=20)
+        digest.update(repr((FEATURE_VERSION, sorted(settings.items()))).encode())
+        return f"{FEATURE_CACHE_PREFIX}{stage}-{digest.hexdigest()}"
+
+    def get(self, key):
+        """
+        Returns the entry and marks it as recently used, the hit or miss is counted
+
+        Parameters
+        ----------
+        key : str
+            key of the entry
+
+        Returns
+        -------
+        dict
+            stored entry, "arrays" is the dict of the name and the memory mapped
+            array, None if missing
+        """
+        entry = self.__cache.read_data(key) if self.__enabled else None
+
+        # an entry is only complete with all its arrays
+        if entry is not None:
+            arrays = {name: self.array(key, name) for name in entry.get("arrays", ())}
+            entry = None if any(array is None for array in arrays.values()) else dict(entry, arrays=arrays)
+
+        if entry is None:
+            self.__count("misses")
+            Log.i(f"[FEATURE CACHE] miss {key}")
+            return None
+
+        for name in [None] + list(entry.get("arrays", ())):
+            self.__cache.touch(key if name is None else _array_key(key, name))
+        self.__count("hits")
+        Log.i(f"[FEATURE CACHE] hit {key}")
+        return entry
+
+    def put(self, key, entry, arrays=None):
+        """
+        Stores the entry and evicts the least recently used ones over the size
+
+        Parameters
+        ----------
+        key : str
+            key of the entry
+        entry : dict
+            results of the stage
+        arrays : dict
+            large arrays of the entry by name, stored as .npy files, see `array`
+        """
+        if not self.__enabled:
+            return
+
+        # arrays first, so the entry is never read without them
+        arrays = arrays or dict()
+        for name, value in arrays.items():
+            self.__cache.write_data(_array_key(key, name), np.asarray(value))
+
+        self.__cache.write_data(key, dict(entry, arrays=sorted(arrays)))
+        self.evict()
+
+    def array(self, key, name):
+        """
+        Returns an array stored with the entry
+
+        Parameters
+        ----------
+        key : str
+            key of the entry
+        name : str
+            name of the array
+
+        Returns
+        -------
+        np.ndarray
+            read only memory mapped array or None if missing
+        """
+        return self.__cache.read_data(_array_key(key, name)) if self.__enabled else None
+
+    @staticmethod
+    def restore(entry, arrays=None):
+        """
+        Writes the values, the arrays (ex: raw features) and the ranks of the entry to
+        the cache of the job, as the stage would have done
+
+        Parameters
+        ----------
+        entry : dict
+            "cache" dict of the cache keys and values, "arrays" dict of the cache keys
+            and arrays, "rank" dict of the rank keys and ranks, as returned by `get`
+        arrays : iterable
+            names of the arrays written to the cache of the job, all if None
+        """
+        cache, stored = Cache(), entry.get("arrays", dict())
+        for key, value in entry.get("cache", dict()).items():
+            cache.write_data(key, value)
+
+        for key in stored if arrays is None else arrays:
+            cache.write_data(key, stored[key])
+
+        for key, rank in entry.get("rank", dict()).items():
+            Ranking.add(key, rank)
+
+    def evict(self):
+        """
+        Removes the least recently used entries until all fit in the max size, the
+        arrays of an entry are counted in its size and removed with it
+
+        Returns
+        -------
+        list
+            keys of the removed entries
+        """
+        # key of the entry -> [size, last access, keys of the entry and its arrays]
+        entries = dict()
+        for key, entry_size, accessed in self.__cache.entries():
+            if not key.startswith(FEATURE_CACHE_PREFIX):
+                continue
+
+            entry = entries.setdefault(key.partition(ARRAY_SEPARATOR)[0], [0, 0.0, list()])
+            entry[0] += entry_size
+            entry[2].append(key)
+            if ARRAY_SEPARATOR not in key:
+                entry[1] = accessed
+
+        size, removed = sum(entry[0] for entry in entries.values()), list()
+
+        for key, (entry_size, _, keys) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if size <= self.__max_size:
+                break
+
+            # the entry first, so it is never read without its arrays
+            for name in sorted(keys, key=len):
+                self.__cache.delete_data(name)
+            size -= entry_size
+            removed.append(key)
+            Log.d(f"[FEATURE CACHE] evicted {key}")
+
+        return removed
+
+    def stats(self):
+        """
+        Returns the hits and misses over the life of the cache
+
+        Returns
+        -------
+        dict
+            hits and misses
+        """
+        return self.__cache.read_data(FEATURE_CACHE_STATS) or {"hits": 0, "misses": 0}
+
+    def clear(self):
+        """ Removes all the entries and the stats """
+        self.__cache.clear()
+
+    def __count(self, name):
+        """ Counts the hit or miss for the job and the cache """
+        for cache, key in ((self.__cache, FEATURE_CACHE_STATS), (Cache(), CACHE_FEATURE_STATS)):
+            cache.update_data(key, lambda stats: dict(stats, **{name: stats[name] + 1}),
+                              default={"hits": 0, "misses": 0})
+
+
+def _array_key(key, name):
+    """ Returns the key of an array of the entry """
+    return f"{key}{ARRAY_SEPARATOR}{name}"
@@ -0,0 +1,244 @@
+"""
+Ranking of the raw measurements of the analysers. Visual, Textual and Auditory store
+the raw per frame values (blur variance, motion, text confidence and audio rms) and
+the ranks are derived from them here in vectorised numpy, so a change of a threshold
+or a rank weight only needs a re-rank and not a re-run of the analysis.
+
+Ranks are per bin of `RANK_RESOLUTION` secs, shared by all the analysers.
+
+The per frame values are appended to a `FeatureArray` (a temporary file read back
+memory mapped) and ranked chunk by chunk, so the memory used does not grow with the
+length of the video.
+"""
+
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+
+from ..config.cache import Cache
+from ..config.config import Config
+from ..config.constants import (CACHE_FPS, CACHE_FRAME_COUNT,
+                                CACHE_FEATURE_MOTION, CACHE_FEATURE_BLUR,
+                                CACHE_FEATURE_TEXT, CACHE_FEATURE_AUDIO,
+                                CACHE_RANK_MOTION, CACHE_RANK_BLUR,
+                                CACHE_RANK_TEXT, CACHE_RANK_AUDIO)
+from ..tools.ranking import Ranking
+
+# no of frames held in memory and ranked at a time
+CHUNK_SIZE = 1 << 16
+
+# how a raw feature is ranked, a value passing the compare with the threshold gets the weight
+Rule = namedtuple("Rule", ("rank", "threshold", "weight", "compare", "per_frame"))
+
+FEATURES = {
+    CACHE_FEATURE_MOTION: Rule(CACHE_RANK_MOTION, "MOTION_THRESHOLD", "RANK_MOTION", np.greater, True),
+    CACHE_FEATURE_BLUR: Rule(CACHE_RANK_BLUR, "BLUR_THRESHOLD", "RANK_BLUR", np.less, True),
+    CACHE_FEATURE_TEXT: Rule(CACHE_RANK_TEXT, "TEXT_MIN_CONFIDENCE", "RANK_TEXT", np.greater_equal, True),
+    CACHE_FEATURE_AUDIO: Rule(CACHE_RANK_AUDIO, "SILENCE_THRESHOLD", "RANK_AUDIO", np.greater, False),
+}
+
+
+class FeatureArray:
+    """
+    Per frame values appended in chunks to a temporary file, which is removed when
+    closed. Only the current chunk is held in memory, the values are read back memory
+    mapped
+
+    Attributes
+    ----------
+    __buffer : np.ndarray
+        current chunk
+    __used : int
+        no of values in the current chunk
+    __length : int
+        no of values written to the file
+    __file : file
+        temporary file of the values
+    """
+
+    def __init__(self, dtype, chunk_size=CHUNK_SIZE):
+        self.__buffer = np.empty(chunk_size, dtype=dtype)
+        self.__used = self.__length = 0
+        self.__file = tempfile.TemporaryFile(prefix="torpido-feature-")
+
+    def __len__(self):
+        return self.__length + self.__used
+
+    def append(self, value, repeat=1):
+        """
+        Appends the value repeat times
+
+        Parameters
+        ----------
+        value : int or float
+            per frame value
+        repeat : int
+            no of frames with the value
+        """
+        while repeat > 0:
+            count = min(repeat, len(self.__buffer) - self.__used)
+            self.__buffer[self.__used: self.__used + count] = value
+            self.__used, repeat = self.__used + count, repeat - count
+
+            if self.__used == len(self.__buffer):
+                self.__flush()
+
+    def array(self):
+        """
+        Returns all the values appended so far
+
+        Returns
+        -------
+        np.ndarray
+            read only memory mapped values
+        """
+        self.__flush()
+        if self.__length == 0:
+            return np.empty(0, dtype=self.__buffer.dtype)
+
+        return np.memmap(self.__file, dtype=self.__buffer.dtype, mode="r", shape=(self.__length,))
+
+    def close(self):
+        """ Removes the temporary file, arrays returned before must not be used after """
+        self.__file.close()
+
+    def __flush(self):
+        """ Writes the current chunk to the file """
+        if self.__used:
+            self.__file.write(self.__buffer[: self.__used].tobytes())
+            self.__file.flush()
+            self.__length, self.__used = self.__length + self.__used, 0
+
+
+def per_bin(values, fps, frame_count=None, resolution=None, transform=None, chunk_size=CHUNK_SIZE):
+    """
+    Mean of the values of every complete bin of resolution secs, the frames of the
+    last incomplete bin are dropped. Bins follow the real time of the frames, so a
+    non integer no of frames per bin (ex: 29.97 fps) does not drift. The values are
+    read chunk by chunk, so they can be memory mapped
+
+    Parameters
+    ----------
+    values : np.ndarray
+        per frame values
+    fps : float
+        frames per sec
+    frame_count : int
+        frames in the video, values past it are dropped
+    resolution : float
+        secs per bin, `RANK_RESOLUTION` if None
+    transform : callable
+        applied to every chunk of values before the mean, ex: the ranking
+    chunk_size : int
+        max no of values read at a time
+
+    Returns
+    -------
+    np.ndarray
+        per bin means
+    """
+    values = np.asarray(values)
+    transform = (lambda chunk: chunk) if transform is None else transform
+    frames = fps * (Config.RANK_RESOLUTION if resolution is None else resolution)
+    bins = int(len(values) / frames)
+    if frame_count is not None:
+        bins = min(bins, int(np.ceil(int(frame_count) / frames)))
+
+    # whole no of frames per bin, chunks of whole bins
+    if float(frames).is_integer():
+        step, result = int(frames), np.empty(bins)
+        rows = max(1, chunk_size // step)
+        for start in range(0, bins, rows):
+            stop = min(bins, start + rows)
+            chunk = np.asarray(transform(values[start * step: stop * step]))
+            result[start: stop] = chunk.reshape(stop - start, step).mean(axis=1)
+        return result
+
+    sums, counts = np.zeros(bins), np.zeros(bins, dtype=np.int64)
+    for start in range(0, min(len(values), int(np.ceil(bins * frames))), chunk_size):
+        chunk = np.asarray(transform(values[start: start + chunk_size]))
+        index = (np.arange(start, start + len(chunk)) / frames).astype(np.int64)
+        valid = index < bins
+        sums += np.bincount(index[valid], weights=chunk[valid], minlength=bins)
+        counts += np.bincount(index[valid], minlength=bins)
+
+    # bins shorter than a frame take the frame covering them
+    covering = np.asarray(transform(values[(np.arange(bins) * frames).astype(np.int64)]))
+    return np.where(counts > 0, sums / np.maximum(counts, 1), covering)
+
+
+def rank(feature, values, settings=None):
+    """
+    Ranks the raw values of the feature, a value passing the threshold of the feature
+    gets the rank weight else 0
+
+    Parameters
+    ----------
+    feature : str
+        cache key of the feature
+    values : np.ndarray
+        raw values
+    settings : dict
+        overrides of the Config thresholds and weights, ex: {"MOTION_THRESHOLD": 30}
+
+    Returns
+    -------
+    np.ndarray
+        ranks of the values
+    """
+    rule, settings = FEATURES[feature], settings or dict()
+    threshold = settings.get(rule.threshold, getattr(Config, rule.threshold))
+    weight = settings.get(rule.weight, getattr(Config, rule.weight))
+
+    return np.where(rule.compare(values, threshold), weight, 0)
+
+
+def rerank(features=None, settings=None, fps=None, frame_count=None, save=True):
+    """
+    Ranks the raw features stored in the cache and saves the per bin ranks. Missing
+    features are skipped
+
+    Parameters
+    ----------
+    features : iterable
+        cache keys of the features, all if None
+    settings : dict
+        overrides of the Config thresholds and weights
+    fps : float
+        frames per sec, read from the cache if None
+    frame_count : int
+        frames in the video, read from the cache if None
+    save : bool
+        save the ranks with `Ranking`
+
+    Returns
+    -------
+    dict
+        rank key -> per bin ranks as np.ndarray
+    """
+    cache, ranks = Cache(), dict()
+
+    for feature in FEATURES if features is None else features:
+        values, rule = cache.read_data(feature), FEATURES[feature]
+        if values is None:
+            continue
+
+        if rule.per_frame:
+            fps = cache.read_data(CACHE_FPS) if fps is None else fps
+            frame_count = cache.read_data(CACHE_FRAME_COUNT) if frame_count is None else frame_count
+
+            # nothing measured, no rank for the whole video
+            if len(values) == 0:
+                result = np.zeros(int(np.ceil(int(frame_count) / (fps * Config.RANK_RESOLUTION))))
+            else:
+                result = per_bin(values, fps, frame_count,
+                                 transform=lambda chunk: rank(feature, chunk, settings))
+        else:
+            result = rank(feature, values, settings)
+
+        ranks[rule.rank] = np.asarray(result, dtype=np.float64)
+        if save:
+            Ranking.add(rule.rank, ranks[rule.rank])
+
+    return ranks
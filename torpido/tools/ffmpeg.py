@@ -1,60 +1,708 @@
 """
 Utility functions to run subprocess with generated FFmpeg queries.
-Function to build the commands live here.
+Function to build the commands live here. The commands are lists of arguments
+run without a shell, so file names are never quoted.
 """
 
+import asyncio
+import functools
+import heapq
+import itertools
+import os
+import shlex
 import subprocess
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
 
 from torpido import pympeg
+from torpido.config.config import Config
 from torpido.exceptions.custom import FFmpegProcessException
+from torpido.pympeg._exceptions import FFmpegException, ProbeException
 from torpido.tools.filelogger import FileLogger
 from torpido.tools.logger import Log
 
+# render strategies of the final cut, see `merge`
+RENDER_SMART, RENDER_PARALLEL, RENDER_SEEK, RENDER_FILTER = "smart", "parallel", "seek", "filter"
+
+# encoder settings shared by all the pieces of the parallel render, so they join without encoding
+PARALLEL_VIDEO = {"-c:v": "libx264", "-preset": "faster", "-pix_fmt": "yuv420p"}
+PARALLEL_AUDIO = {"-c:a": "aac", "-ar": "48000", "-ac": "1"}
+
+# priority of the ffmpeg jobs, lower runs first
+PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW = 0, 10, 20
+
+# options of the simple and of the complex filter graphs, the filter threads are set only if one is used
+FILTER_OPTIONS = ("-vf", "-af", "-filter", "-filter:v", "-filter:a", "-filter_script")
+COMPLEX_FILTER_OPTIONS = ("-filter_complex", "-filter_complex_script", "-lavfi")
+
+# secs between the updates of the progress of the parallel render
+PROGRESS_INTERVAL = 0.5
+
+# encoders for the partial GOPs of the smart render, by the codec of the video
+SMART_ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+
+# profiles of the encoders by the profile ffprobe reports
+SMART_PROFILES = {
+    "h264": {"constrained baseline": "baseline", "baseline": "baseline", "main": "main", "high": "high",
+             "high 10": "high10", "high 4:2:2": "high422", "high 4:4:4 predictive": "high444"},
+    "hevc": {"main": "main", "main 10": "main10", "main still picture": "mainstillpicture"}
+}
+
+
+def _own_stream(builder):
+    """ Builds the command in a stream of its own, so commands can be built on any thread at the same time """
+
+    @functools.wraps(builder)
+    def wrapper(*args, **kwargs):
+        with pympeg.Stream():
+            return builder(*args, **kwargs)
+
+    return wrapper
+
+
+class _Waiter:
+    """ Job waiting in the queue of the executor, woken when it is granted the threads """
+    __slots__ = ("requested", "threads", "wake", "granted", "cancelled", "alone")
+
+    def __init__(self, requested, wake):
+        self.requested, self.threads, self.wake = requested, None, wake
+        self.granted = self.cancelled = self.alone = False
+
+    def __lt__(self, other):
+        return False
+
+    def command(self, command):
+        """ Returns the command with the threads given, as it is for a job without -threads running alone """
+        return list(command) if self.alone else _with_threads(command, self.threads)
+
+
+class FFmpegExecutor:
+    """
+    Runs the ffmpeg processes of torpido. At most `FFMPEG_JOBS` processes run at once
+    and their threads share a budget of `FFMPEG_CORES` cores, so batches of renders do
+    not oversubscribe the host. Jobs wait in a queue by the priority (lower first) and
+    the order they were submitted.
+
+    A job asks for the -threads of its command, the fair share of the cores among the
+    jobs running and waiting if it is not set. It starts once it can have its threads
+    or the fair share and is given at most the free cores, the command runs with
+    -threads of the threads given, and -filter_threads (or -filter_complex_threads) if
+    it filters. A job without -threads running alone is given all the cores and its
+    command is left as it is. The time a job waited in the queue and the time it ran
+    are reported separately
+
+    Attributes
+    ----------
+    __jobs : int
+        max processes at once, `FFMPEG_JOBS` if None
+    __cores : int
+        cores shared by the processes, `FFMPEG_CORES` if None
+    __queue : list
+        heap of (priority, index, waiter) of the waiting jobs
+    __running : int
+        no of processes running
+    __used : int
+        cores given to the running processes
+    __stats : dict
+        no of jobs, total secs waited and ran
+    """
+
+    def __init__(self, jobs=None, cores=None):
+        self.__jobs, self.__cores = jobs, cores
+        self.__lock = threading.Lock()
+        self.__queue, self.__index = list(), itertools.count()
+        self.__running = self.__used = 0
+        self.__stats = {"jobs": 0, "wait": 0.0, "run": 0.0}
+
+    @property
+    def cores(self):
+        """ Returns the cores shared by the processes, all the cpus if 0 """
+        return int(Config.FFMPEG_CORES if self.__cores is None else self.__cores) or os.cpu_count() or 1
+
+    @property
+    def jobs(self):
+        """ Returns the max no of processes at once, no of cores if 0 """
+        return int(Config.FFMPEG_JOBS if self.__jobs is None else self.__jobs) or self.cores
+
+    def threads(self, jobs):
+        """ Returns the threads of a job when the jobs run at once """
+        return max(1, self.cores // max(1, min(jobs, self.jobs)))
+
+    def stats(self):
+        """ Returns the no of jobs done, running and waiting, the total secs waited and ran """
+        with self.__lock:
+            return dict(self.__stats, running=self.__running, queued=len(self.__queue))
+
+    @contextmanager
+    def job(self, command, priority=PRIORITY_NORMAL):
+        """
+        Waits for the turn of the command, blocks the thread. A job interrupted in
+        the queue leaves it
+
+        Yields
+        ------
+        list
+            arguments of the command with the threads given
+        """
+        event, queued = threading.Event(), time.monotonic()
+        waiter = self.__submit(command, priority, event.set)
+
+        try:
+            event.wait()
+        except BaseException:
+            self.__cancel(waiter)
+            raise
+
+        started = time.monotonic()
+        try:
+            yield waiter.command(command)
+        finally:
+            self.__release(waiter)
+            self.__report(command, waiter, started - queued, time.monotonic() - started)
+
+    @asynccontextmanager
+    async def job_async(self, command, priority=PRIORITY_NORMAL):
+        """ Same as `job` without blocking the event loop, a job cancelled in the queue leaves it """
+        loop, queued = asyncio.get_running_loop(), time.monotonic()
+        future = loop.create_future()
+        waiter = self.__submit(command, priority, lambda: loop.call_soon_threadsafe(_resolve, future))
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            self.__cancel(waiter)
+            raise
+
+        started = time.monotonic()
+        try:
+            yield waiter.command(command)
+        finally:
+            self.__release(waiter)
+            self.__report(command, waiter, started - queued, time.monotonic() - started)
+
+    async def run_async(self, command, priority=PRIORITY_NORMAL, **kwargs):
+        """ Runs the command with `pympeg.run_async` once it is its turn """
+        async with self.job_async(command, priority) as command:
+            await pympeg.run_async(command, **kwargs)
+
+    def __submit(self, command, priority, wake):
+        """ Adds the job to the queue, it is woken at once if it can run """
+        waiter = _Waiter(_requested_threads(command), wake)
+
+        with self.__lock:
+            heapq.heappush(self.__queue, (priority, next(self.__index), waiter))
+            self.__grant()
+
+        return waiter
+
+    def __grant(self):
+        """ Starts the jobs at the head of the queue while there are processes and cores for them """
+        cores = self.cores
+
+        while self.__queue:
+            waiter = self.__queue[0][-1]
+            if waiter.cancelled:
+                heapq.heappop(self.__queue)
+                continue
+
+            # share of the cores among the jobs running and waiting, all of them for a job alone
+            waiting = sum(not queued[-1].cancelled for queued in self.__queue)
+            share = self.threads(self.__running + waiting)
+            threads = waiter.requested or share
+
+            free = cores - self.__used
+            if self.__running >= self.jobs or free < min(threads, share):
+                break
+
+            heapq.heappop(self.__queue)
+            waiter.threads, waiter.granted = min(threads, free), True
+            waiter.alone = waiter.requested is None and self.__running == 0 and waiting == 1
+            self.__running, self.__used = self.__running + 1, self.__used + waiter.threads
+            waiter.wake()
+
+    def __release(self, waiter):
+        """ Returns the process and the cores of the job """
+        with self.__lock:
+            self.__running, self.__used = self.__running - 1, self.__used - waiter.threads
+            self.__grant()
+
+    def __cancel(self, waiter):
+        """ Removes the job from the queue, or releases it if it was started meanwhile """
+        with self.__lock:
+            waiter.cancelled = True
+            granted = waiter.granted
+
+        if granted:
+            self.__release(waiter)
+
+    def __report(self, command, waiter, wait, run):
+        """ Adds the times of the job to the stats """
+        with self.__lock:
+            self.__stats["jobs"] += 1
+            self.__stats["wait"] += wait
+            self.__stats["run"] += run
+
+        Log.d(f"FFMPEG {os.path.basename(str(command[-1]))} with {waiter.threads} threads :: waited {wait:.2f} secs, "
+              f"ran {run:.2f} secs")
+
+
+def _resolve(future):
+    """ Wakes the job waiting on the future, unless it was cancelled """
+    if not future.done():
+        future.set_result(None)
+
+
+def _threads_index(command):
+    """ Returns the index of the last -threads before the output, the one of the encoding, None if not set """
+    for index in range(len(command) - 2, 0, -1):
+        if command[index] == "-threads":
+            return index
+
+    return None
+
+
+def _requested_threads(command):
+    """ Returns the -threads of the encoding of the command, None if not set """
+    index = _threads_index(command)
+    return None if index is None else int(command[index + 1])
+
+
+def _with_threads(command, threads):
+    """ Returns the command with the threads of the encoding (before the output) and of the filters if it filters """
+    command, index = list(command), _threads_index(command)
+
+    if index is not None:
+        command[index + 1] = str(threads)
+    else:
+        command[-1:-1] = ["-threads", str(threads)]
+
+    if any(option in command for option in COMPLEX_FILTER_OPTIONS):
+        filter_threads = "-filter_complex_threads"
+    elif any(option in command for option in FILTER_OPTIONS):
+        filter_threads = "-filter_threads"
+    else:
+        return command
+
+    if filter_threads not in command:
+        command[1:1] = [filter_threads, str(threads)]
+
+    return command
+
+
+# executor of all the ffmpeg processes
+EXECUTOR = FFmpegExecutor()
+
 
 def split(input_file, output_audio_file):
     """ Splitting the input video file into audio """
     command = _build_split_command(input_file, output_audio_file)
-    command = ' '.join(command)
-    Log.i(command)
+    Log.i(_display(command))
 
-    for log in _ffmpeg_runner(command, "No audio stream found"):
+    for log in _ffmpeg_runner(command, "No audio stream found", PRIORITY_HIGH):
         yield log
 
 
 def merge(video_file, audio_file, output_file, timestamps, intro=None, outro=None):
-    """ Merging the final video using the de-noised audio and the video stream """
-    command = _build_merge_command_v2(video_file, audio_file, output_file, timestamps, intro, outro)
-    Log.i(command)
-
+    """
+    Merging the final video using the de-noised audio and the video stream. The render
+    strategy is set by `RENDER_STRATEGY`, "smart" copies the video between keyframes
+    and only encodes the partial GOPs at the cuts, "parallel" encodes every segment in
+    its own ffmpeg process, "seek" reads only the segments of the inputs and "filter"
+    trims the whole inputs in the filter graph. Smart and parallel fall back to seek,
+    seek falls back to filter. Seek opens the inputs once per segment, so cuts with
+    more than `SEEK_MAX_SEGMENTS` segments are trimmed in the filter graph
+    """
     exception = "Error while merging the final cut" if not intro or not outro else ("No audio stream found in intro or "
                                                                                     "outro. Requires audio streams. ")
+    strategy = Config.RENDER_STRATEGY
+
+    if strategy not in (RENDER_SMART, RENDER_PARALLEL, RENDER_SEEK, RENDER_FILTER):
+        Log.w(f"Unknown render strategy {strategy}, trimming the whole video")
+        strategy = RENDER_FILTER
+
+    if strategy in (RENDER_SMART, RENDER_PARALLEL):
+        render = _smart_merge if strategy == RENDER_SMART else _parallel_merge
+        try:
+            for log in render(video_file, audio_file, output_file, timestamps, intro, outro, exception):
+                yield log
+            return
+        except (FFmpegProcessException, ProbeException) as error:
+            Log.w(f"The {strategy} render is not possible, encoding in a single process :: {error}")
+            strategy = RENDER_SEEK
+
+    if strategy == RENDER_SEEK and len(timestamps) > int(Config.SEEK_MAX_SEGMENTS):
+        Log.w(f"{len(timestamps)} segments are too many to seek, trimming the whole video")
+        strategy = RENDER_FILTER
+
+    if strategy == RENDER_SEEK:
+        command = _build_merge_command_seek(video_file, audio_file, output_file, timestamps, intro, outro)
+        Log.i(_display(command))
+
+        try:
+            for log in _ffmpeg_runner(command, exception):
+                yield log
+            return
+        except FFmpegProcessException:
+            Log.w("Seeking the segments failed, trimming the whole video instead")
+
+    command = _build_merge_command_v2(video_file, audio_file, output_file, timestamps, intro, outro)
+    Log.i(_display(command))
 
     for log in _ffmpeg_runner(command, exception):
         yield log
 
 
+def _smart_merge(video_file, audio_file, output_file, timestamps, intro, outro, exception):
+    """
+    Renders the final cut in pieces, the video between the keyframes of a segment is
+    copied and the rest is encoded with the parameters of the video. The pieces are
+    joined with the concat demuxer without encoding again, the audio of the cut is
+    encoded once and muxed with them
+
+    Raises
+    ------
+    FFmpegProcessException
+        video can not be copied (intro/outro, parameters that can not be matched) or a piece failed
+    ProbeException
+        keyframes or codec could not be read
+    """
+    # the index needs the cache, which imports the tools
+    from torpido.tools.keyframes import KeyframeIndex
+
+    if intro is not None or outro is not None:
+        raise FFmpegProcessException("intro and outro need the segments to be encoded")
+
+    encoder = _get_encoder(video_file)
+    pieces = _plan_smart_render(timestamps, KeyframeIndex.load(video_file), Config.SMART_RENDER_SNAP)
+    copied = sum(end - start for start, end, copy in pieces if copy)
+    Log.i(f"Smart render of {len(pieces)} pieces, {copied:.2f} secs copied without encoding")
+
+    # pieces are mpeg-ts, the parameters of the encoded and the copied video are in the stream
+    with tempfile.TemporaryDirectory(prefix="torpido-render-", dir=os.path.dirname(os.path.abspath(output_file))) \
+            as directory:
+        files = list()
+        for i, (start, end, copy) in enumerate(pieces):
+            files.append(os.path.join(directory, "piece_%05d.ts" % i))
+            command = _build_piece_command(video_file, files[-1], start, end, None if copy else encoder)
+            Log.d(_display(command))
+
+            for log in _ffmpeg_runner(command, exception):
+                yield log
+
+        # audio of the whole cut encoded once, an encode per piece adds gaps at every join
+        audio_cut = os.path.join(directory, "audio.m4a")
+        command = _build_cut_audio_command(audio_file, audio_cut, _piece_segments(pieces))
+        Log.d(_display(command))
+
+        for log in _ffmpeg_runner(command, exception):
+            yield log
+
+        list_file = os.path.join(directory, "pieces.txt")
+        _write_concat_list(list_file, files)
+
+        command = _build_concat_command(list_file, output_file, audio_cut)
+        Log.i(_display(command))
+
+        for log in _ffmpeg_runner(command, exception):
+            yield log
+
+
+def _parallel_merge(video_file, audio_file, output_file, timestamps, intro, outro, exception):
+    """
+    Encodes every segment (and the intro and outro) as a separate piece, at most
+    `RENDER_WORKERS` ffmpeg processes at once on an event loop, all with the same
+    encoder settings, and joins the pieces with the concat demuxer without encoding
+    again. Progress is the sum of the -progress output of the pieces
+
+    Raises
+    ------
+    FFmpegProcessException
+        a piece failed, took longer than `RENDER_TIMEOUT` or the join failed
+    """
+    output_width, output_height, setsardar = get_width_height(video_file)
+    fps = _get_frame_rate(video_file)
+
+    # (input, audio input, start, end) of the pieces in the output order
+    jobs = [(video_file, audio_file, start, end) for start, end in timestamps]
+    if intro is not None:
+        jobs.insert(0, (intro, None, 0, _get_duration(intro)))
+    if outro is not None:
+        jobs.append((outro, None, 0, _get_duration(outro)))
+
+    workers = _render_workers(len(jobs))
+    threads, total = EXECUTOR.threads(workers), sum(end - start for _, _, start, end in jobs)
+    Log.i(f"Parallel render of {len(jobs)} pieces with {workers} workers")
+
+    with tempfile.TemporaryDirectory(prefix="torpido-render-", dir=os.path.dirname(os.path.abspath(output_file))) \
+            as directory:
+        files = [os.path.join(directory, "piece_%05d.ts" % i) for i in range(len(jobs))]
+        commands = [_build_parallel_piece_command(name, audio, files[i], start, end, output_width, output_height,
+                                                  setsardar, fps, threads)
+                    for i, (name, audio, start, end) in enumerate(jobs)]
+
+        # lines the progress bar understands, the duration of the output and the time encoded
+        yield "Duration: %s" % _format_time(total)
+
+        # secs encoded of every piece, from the progress of its ffmpeg
+        encoded = [0.0] * len(jobs)
+
+        def on_progress(index, progress):
+            _, _, start, end = jobs[index]
+            if progress.out_time is not None:
+                encoded[index] = min(progress.out_time, end - start)
+            if progress.end:
+                Log.d(f"Piece {index + 1}/{len(jobs)} encoded, {jobs[index][0]} {start} - {end}")
+
+        loop = asyncio.new_event_loop()
+        render = loop.create_task(_render_all(commands, exception, workers, on_progress))
+        try:
+            while not render.done():
+                loop.run_until_complete(asyncio.wait([render], timeout=PROGRESS_INTERVAL))
+                yield "time=%s" % _format_time(sum(encoded))
+
+            render.result()
+        finally:
+            # stops the pieces still encoding if the render failed or was stopped
+            render.cancel()
+            loop.run_until_complete(asyncio.gather(render, return_exceptions=True))
+            loop.close()
+
+        list_file = os.path.join(directory, "pieces.txt")
+        _write_concat_list(list_file, files)
+
+        command = _build_concat_command(list_file, output_file)
+        Log.i(_display(command))
+
+        for _ in _ffmpeg_runner(command, exception):
+            pass
+
+
+async def _render_all(commands, exception, workers, on_progress):
+    """
+    Runs the commands on the event loop, at most workers at once, the logs of all the
+    commands go to one log file
+
+    Raises
+    ------
+    FFmpegProcessException
+        a command failed or took longer than `RENDER_TIMEOUT`
+    """
+    logger = FileLogger().open()
+    for command in commands:
+        logger.log(_display(command))
+
+    try:
+        await pympeg.run_all(commands, limit=workers, on_progress=on_progress,
+                             on_log=lambda index, line: logger.log("[%d] %s" % (index, line)),
+                             timeout=float(Config.RENDER_TIMEOUT) or None, runner=EXECUTOR.run_async)
+    except (FFmpegException, asyncio.TimeoutError, OSError) as error:
+        logger.log(error).log(exception)
+        Log.e("FFMPEG has encounter an error! Check the logs for details")
+        raise FFmpegProcessException(exception) from error
+    finally:
+        logger.close()
+
+
+def _render_workers(jobs):
+    """ Returns the no of ffmpeg processes of the parallel render, `RENDER_WORKERS` or half the cpus """
+    workers = int(Config.RENDER_WORKERS) or max(1, (os.cpu_count() or 1) // 2)
+
+    return max(1, min(workers, jobs))
+
+
+def _format_time(sec):
+    """ HH:MM:SS of the secs, as in the ffmpeg logs """
+    sec = int(sec)
+
+    return "%02d:%02d:%02d" % (sec // 3600, sec // 60 % 60, sec % 60)
+
+
+def _get_frame_rate(video_file):
+    """ Returns the frame rate of the video as the ffmpeg fraction, ex: 30000/1001 """
+    frame_rate = _media_info(video_file).frame_rate
+    if frame_rate in (None, '0/0'):
+        raise FFmpegProcessException("no frame rate of the video")
+
+    return frame_rate
+
+
+def _get_duration(video_file):
+    """ Returns the duration of the video in secs """
+    duration = _media_info(video_file).duration
+    if duration is None:
+        raise FFmpegProcessException(f"no duration of {video_file}")
+
+    return duration
+
+
+def _get_size(video_file):
+    """ Returns the width and height of the video, None if not known. Scales to it are dropped from the graph """
+    try:
+        info = _media_info(video_file)
+    except (ProbeException, OSError):
+        return None
+
+    return (info.width, info.height) if isinstance(info.width, int) and isinstance(info.height, int) else None
+
+
+def _media_info(video_file):
+    """ Returns the info of the video of the job, other videos are probed """
+    # the info needs the cache, which imports the tools
+    from torpido.tools.media_info import MediaInfo
+
+    return MediaInfo.get(video_file)
+
+
+def _write_concat_list(list_file, files):
+    """ Writes the files to join in the format of the concat demuxer """
+    with open(list_file, "w") as file:
+        file.writelines("file '%s'\n" % name.replace("'", "'\\''") for name in files)
+
+
+def _get_encoder(video_file):
+    """
+    Returns the options to encode the partial GOPs of the video, so they can be joined
+    with the copied ones. The codec, pixel format, profile, level, size, SAR, frame
+    rate and time base are those of the video
+
+    Returns
+    -------
+    dict
+        tag -> value of the options of the encoder
+
+    Raises
+    ------
+    FFmpegProcessException
+        a parameter of the video is not known or can not be matched
+    """
+    info = _media_info(video_file)
+    if info.video_codec not in SMART_ENCODERS:
+        raise FFmpegProcessException("no encoder to match the codec of the video")
+
+    if None in (info.pix_fmt, info.profile, info.level, info.width, info.height, info.sar, info.frame_rate,
+                info.time_base) or info.frame_rate == '0/0':
+        raise FFmpegProcessException("the encoding parameters of the video are not known")
+
+    profile = SMART_PROFILES[info.video_codec].get(info.profile.lower())
+    if profile is None:
+        raise FFmpegProcessException(f"no encoder profile to match the {info.profile} profile of the video")
+
+    options = {"-c:v": SMART_ENCODERS[info.video_codec], "-preset": "faster", "-pix_fmt": info.pix_fmt,
+               "-profile:v": profile, "-s": "%dx%d" % (info.width, info.height),
+               "-vf": "setsar=%s" % info.sar.replace(":", "/"), "-r": info.frame_rate,
+               "-enc_time_base": info.time_base}
+
+    # ffprobe reports the h264 level x10 and the hevc level x30
+    if info.video_codec == "h264":
+        if info.level < 10:
+            raise FFmpegProcessException("the level of the video can not be matched")
+        options["-level"] = "%.1f" % (info.level / 10)
+    else:
+        options["-x265-params"] = "level-idc=%.1f" % (info.level / 30)
+
+    return options
+
+
+def _piece_segments(pieces):
+    """ Returns the [start, end] of the segments of the pieces, touching pieces are one segment """
+    segments = list()
+    for start, end, _ in pieces:
+        if segments and abs(segments[-1][1] - start) < 1e-6:
+            segments[-1][1] = end
+        else:
+            segments.append([start, end])
+
+    return segments
+
+
+def _plan_smart_render(timestamps, keyframes, snap=0.0):
+    """
+    Splits the segments into the pieces that can be copied (from a keyframe to a
+    keyframe) and the partial GOPs at the start and end of the segments that have to
+    be encoded. Cuts within snap secs of a keyframe are moved to it
+
+    Parameters
+    ----------
+    timestamps : list
+        list of start and end of the segments in secs
+    keyframes : KeyframeIndex
+        keyframes of the video
+    snap : float
+        max secs a cut is moved to a keyframe
+
+    Returns
+    -------
+    list
+        list of (start, end, copy) of the pieces
+    """
+    pieces, times = list(), keyframes.times.tolist()
+
+    for start, end in timestamps:
+        snapped = keyframes.snap(start, snap), keyframes.snap(end, snap)
+        if snapped[0] < snapped[1]:
+            start, end = snapped
+
+        # first and last keyframe in the segment
+        first, last = keyframes.after(start), keyframes.before(end)
+        if first >= last:
+            pieces.append((start, end, False))
+            continue
+
+        if start < times[first]:
+            pieces.append((start, times[first], False))
+
+        pieces.append((times[first], times[last], True))
+
+        if times[last] < end:
+            pieces.append((times[last], end, False))
+
+    return pieces
+
+
 def thumbnail(video_file, output_file, sec):
     """ Generates a thumbnail for the video using the time in the video """
     command = _build_thumbnail_gen(video_file, output_file, sec)
-    Log.i(command)
+    Log.i(_display(command))
 
-    for log in _ffmpeg_runner(command, "Error generating the thumbnail"):
+    for log in _ffmpeg_runner(command, "Error generating the thumbnail", PRIORITY_LOW):
         yield log
 
 
-def _ffmpeg_runner(command, exception=''):
-    logger = FileLogger().open().log(command)
-    run = subprocess.Popen(args=command,
-                           shell=True,
-                           stdout=subprocess.PIPE,
-                           stderr=subprocess.STDOUT,
-                           universal_newlines=True)
-    for stdout in iter(run.stdout.readline, ""):
-        logger.log(stdout)
-        yield stdout
+def _display(command):
+    """ Returns the arguments of the command as a line for the logs """
+    return shlex.join(str(arg) for arg in command)
 
-    run.stdout.close()
-    if run.wait():
+
+def _ffmpeg_runner(command, exception='', priority=PRIORITY_NORMAL):
+    """
+    Runs the arguments of the command without a shell once it is its turn in the
+    executor, the filter script of the command is removed after
+    """
+    with EXECUTOR.job(command, priority) as command:
+        logger = FileLogger().open().log(_display(command))
+        try:
+            try:
+                run = subprocess.Popen(args=command,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT,
+                                       universal_newlines=True)
+            except OSError as error:
+                logger.log(error).log(exception).close()
+                Log.e(f"FFMPEG could not be started :: {error}")
+                raise FFmpegProcessException(exception) from error
+
+            for stdout in iter(run.stdout.readline, ""):
+                logger.log(stdout)
+                yield stdout
+
+            run.stdout.close()
+            code = run.wait()
+        finally:
+            pympeg.remove_filter_script(command)
+
+    if code:
         logger.log(exception).close()
         Log.e("FFMPEG has encounter an error! Check the logs for details")
         raise FFmpegProcessException(exception)
@@ -98,31 +746,18 @@ def _build_split_command(input_file, output_audio_file):
         'ffmpeg',
         '-y',
         '-i',
-        "'" + str(input_file) + "'",
+        str(input_file),
         '-ac',
         '1',
-        "'" + str(output_audio_file) + "'"
+        str(output_audio_file)
     ]
 
 
 def get_width_height(video_file):
-    """ Getting the original videos resolution """
-    output = pympeg.probe(video_file)
-    width, height, sar, dar = None, None, None, None
-
-    for stream in output['streams']:
-        if 'width' in stream and 'height' in stream:
-            width = stream['width']
-            height = stream['height']
-            sar = stream['sample_aspect_ratio']
-            dar = stream['display_aspect_ratio']
-            break
-
-    if sar is None:
-        sar = "1:1"
-
-    if dar is None:
-        dar = "16:9"
+    """ Getting the original videos resolution, from the info of the job if it is of the video """
+    info = _media_info(video_file)
+    width, height = info.width, info.height
+    sar, dar = info.sar or "1:1", info.dar or "16:9"
 
     sar_dar = "setsar=sar=%s,setdar=dar=%s" % (sar.replace(":", "/"), dar.replace(":", "/"))
 
@@ -132,21 +767,20 @@ def get_width_height(video_file):
     return 1920, 720, sar_dar
 
 
+@_own_stream
 def _build_merge_command_v2(video_file, audio_file, output_file, timestamps, intro=None, outro=None):
-    pympeg.init()
-
     # getting output video resolution using ffprobe
     output_width, output_height, setsardar = get_width_height(video_file)
 
     # creating the input nodes
-    in_file = pympeg.option(tag="-preset", name="faster").input(name=video_file)
+    in_file = pympeg.option(tag="-preset", name="faster").input(name=video_file, size=_get_size(video_file))
     in_audio = pympeg.input(name=audio_file)
 
     if intro is not None:
-        intro = pympeg.input(name=intro)
+        intro = pympeg.input(name=intro, size=_get_size(intro))
 
     if outro is not None:
-        outro = pympeg.input(name=outro)
+        outro = pympeg.input(name=outro, size=_get_size(outro))
 
     # for multiple trims
     trim_filters = list()
@@ -203,20 +837,177 @@ def _build_merge_command_v2(video_file, audio_file, output_file, timestamps, int
     )
 
     # returning the command
-    return pympeg.output([op[0], op[1]], name=output_file).command()
+    return pympeg.output([op[0], op[1]], name=output_file).argv()
+
+
+@_own_stream
+def _build_merge_command_seek(video_file, audio_file, output_file, timestamps, intro=None, outro=None):
+    """
+    Creates the merge command where every segment is a separate input seeked with
+    `-ss` and limited with `-t`, so ffmpeg only decodes the segments and not the entire
+    video. The segments are scaled and concatenated like `_build_merge_command_v2`
+
+    `ffmpeg -ss 10 -t 5 -i video.mp4 -ss 10 -t 5 -i audio.wav ... -filter_complex "... concat ..." out.mp4`
+
+    Parameters
+    ----------
+    video_file : str
+        input video file
+    audio_file : str
+        de-noised audio file
+    output_file : str
+        output video file
+    timestamps : list
+        list of start and end of the segments in secs
+    intro : str
+        video to add at the start
+    outro : str
+        video to add at the end
+
+    Returns
+    -------
+    list
+        arguments of the command to pass to the subprocess
+    """
+    # getting output video resolution using ffprobe
+    output_width, output_height, setsardar = get_width_height(video_file)
+
+    # preset is an output option, placed after the inputs
+    pympeg.option(tag="-preset", name="faster")
+
+    if intro is not None:
+        intro = pympeg.input(name=intro, size=_get_size(intro))
+
+    if outro is not None:
+        outro = pympeg.input(name=outro, size=_get_size(outro))
 
+    # video and audio of every segment read from the inputs
+    segments = list()
+    for start, end in timestamps:
+        seek = {"-ss": start, "-t": end - start}
 
+        video = pympeg.input(name=video_file, options=seek, size=_get_size(video_file))
+        segments.append(
+            pympeg.setpts(video.video)
+                .scale(w=str(output_width), h=str(output_height))
+                .arg(args=setsardar)
+        )
+        segments.append(pympeg.input(name=audio_file, options=dict(seek)).asetpts())
+
+    # scaling the intro and outro if present
+    if intro is not None:
+        segments.insert(0, intro.scale(w=str(output_width), h=str(output_height)).arg(args=setsardar))
+        segments.insert(1, intro.audio)
+
+    if outro is not None:
+        segments.append(outro.scale(w=str(output_width), h=str(output_height)).arg(args=setsardar))
+        segments.append(outro.audio)
+
+    # final concatenation of all the streams
+    op = pympeg.concat(inputs=segments, outputs=2)
+
+    return pympeg.output([op[0], op[1]], name=output_file).argv()
+
+
+@_own_stream
+def _build_piece_command(video_file, output_file, start, end, encoder=None):
+    """
+    Creates the command for the video of a piece of the smart render, the video is
+    copied if there are no options of the encoder, see `_get_encoder`
+
+    `ffmpeg -ss 10 -t 5 -i video.mp4 -map 0:v:0 -c:v copy piece.ts`
+    """
+    seek = {"-ss": round(start, 6), "-t": round(end - start, 6)}
+
+    video = pympeg.input(name=video_file, options=seek)
+    pympeg.option(tag="-map", name="0:v:0")
+
+    for tag, name in ({"-c:v": "copy"} if encoder is None else encoder).items():
+        pympeg.option(tag=tag, name=name)
+
+    return video.output(name=output_file, map_cmd="").argv()
+
+
+@_own_stream
+def _build_cut_audio_command(audio_file, output_file, segments):
+    """
+    Creates the command encoding the segments of the de-noised audio as one stream
+
+    `ffmpeg -i audio.wav -filter_complex "[0]atrim=...[a];[a]asetpts...;...concat=n=2:v=0:a=1[audio]" ... audio.m4a`
+    """
+    audio = pympeg.input(name=audio_file)
+    trims = [
+        audio
+            .filter(filter_name="atrim", params={"start": round(start, 6), "duration": round(end - start, 6)})
+            .asetpts()
+        for start, end in segments
+    ]
+
+    joined = pympeg.arg(inputs=trims, args="concat=n=%d:v=0:a=1" % len(trims), outputs=["audio"])
+    pympeg.option(tag="-c:a", name="aac")
+
+    return joined.output(name=output_file).argv()
+
+
+@_own_stream
+def _build_parallel_piece_command(video_file, audio_file, output_file, start, end, width, height, setsardar, fps,
+                                  threads):
+    """
+    Creates the command for a piece of the parallel render. The video is scaled like
+    `_build_merge_command_v2` and encoded with the settings shared by all the pieces.
+    A segment takes the audio from the de-noised audio file, the intro and outro (no
+    audio file) their own audio
+
+    `ffmpeg -ss 10 -t 5 -i video.mp4 -ss 10 -t 5 -i audio.wav ... -c:v libx264 ... -r 25 -threads 4 piece.ts`
+    """
+    seek = {"-ss": round(start, 6), "-t": round(end - start, 6)} if audio_file is not None else None
+
+    video = pympeg.input(name=video_file, options=seek, size=_get_size(video_file))
+    audio = video.audio if audio_file is None else pympeg.input(name=audio_file, options=dict(seek))
+
+    video_out = (
+        pympeg.setpts(video.video)
+            .scale(w=str(width), h=str(height))
+            .arg(args=setsardar)
+    )
+    audio_out = pympeg.asetpts(audio)
+
+    for tag, name in dict(PARALLEL_VIDEO, **PARALLEL_AUDIO, **{"-r": fps, "-threads": threads}).items():
+        pympeg.option(tag=tag, name=name)
+
+    return pympeg.output([video_out, audio_out], name=output_file).argv()
+
+
+@_own_stream
+def _build_concat_command(list_file, output_file, audio_file=None):
+    """
+    Joins the pieces listed in the file with the concat demuxer without encoding, the
+    audio is taken from the audio file if there is one
+
+    `ffmpeg -f concat -safe 0 -i pieces.txt -i audio.m4a -map 0:v:0 -map 1:a:0 -c copy out.mp4`
+    """
+    pieces = pympeg.input(name=list_file, options={"-f": "concat", "-safe": "0"})
+
+    if audio_file is not None:
+        pympeg.input(name=audio_file)
+        pympeg.option(tag="-map", name="0:v:0")
+        pympeg.option(tag="-map", name="1:a:0")
+
+    pympeg.option(tag="-c", name="copy")
+
+    return pieces.output(name=output_file, map_cmd="").argv()
+
+
+@_own_stream
 def _build_thumbnail_gen(video_file, output_file, sec):
     """ ffmpeg -i example_02.mp4 -ss 20 -frames 1 output.png """
-    pympeg.init()
-
     command = (
         pympeg
             .option(tag="-ss", name=str(sec))
             .option(tag="-frames", name="1")
             .input(name=video_file)
             .output(name=output_file, map_cmd="")
-            .command()
+            .argv()
     )
 
     return command
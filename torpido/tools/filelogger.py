@@ -1,14 +1,17 @@
+from itertools import count
 from time import time
-from os import mkdir, path
+from os import makedirs, path
+
+# unique log names for the ffmpeg processes running at the same time
+_ids = count()
 
 
 class FileLogger:
     DIRNAME = "ffmpeg_logs"
 
     def __init__(self):
-        if not path.isdir(FileLogger.DIRNAME):
-            mkdir(FileLogger.DIRNAME)
-        self._filename, self._file = (str(time()) + "_error.log"), None
+        makedirs(FileLogger.DIRNAME, exist_ok=True)
+        self._filename, self._file = "%s_%d_error.log" % (time(), next(_ids)), None
 
     def open(self):
         self._file = open(path.join(FileLogger.DIRNAME, self._filename), "w")
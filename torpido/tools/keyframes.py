@@ -0,0 +1,108 @@
+"""
+Index of the keyframes of the input video. The keyframes are read from the packet
+flags in one pass (nothing is decoded) and kept in the feature cache by the content
+hash and the modified time of the file, so a video is probed only once.
+
+The smart render snaps the cuts to the keyframes and copies the video between them.
+"""
+
+import os
+
+import numpy as np
+
+from .. import pympeg
+from ..tools.feature_cache import FeatureCache
+from ..tools.logger import Log
+
+
+class KeyframeIndex:
+    """
+    Sorted times of the keyframes with nearest keyframe look ups. The look ups take a
+    time or an array of times
+
+    Attributes
+    ----------
+    __times : np.ndarray
+        sorted times of the keyframes in secs, read only
+    """
+
+    def __init__(self, times):
+        self.__times = np.sort(np.asarray(times, dtype=np.float64))
+        self.__times.setflags(write=False)
+
+    @classmethod
+    def load(cls, video_file, features=None):
+        """
+        Returns the index of the video, probed only if it is not in the feature cache
+
+        Parameters
+        ----------
+        video_file : str
+            input video file
+        features : FeatureCache
+            cache of the index, default feature cache if None
+
+        Returns
+        -------
+        KeyframeIndex
+            keyframes of the first video stream
+        """
+        features = FeatureCache() if features is None else features
+        key = features.key(video_file, "keyframes", {"mtime": os.stat(video_file).st_mtime_ns})
+
+        entry = features.get(key)
+        if entry is not None:
+            return cls(entry["arrays"]["keyframes"])
+
+        times = np.asarray(pympeg.keyframes(video_file), dtype=np.float64)
+        features.put(key, dict(), arrays={"keyframes": times})
+        Log.d(f"Keyframes of {video_file} :: {len(times)}")
+
+        return cls(times)
+
+    def __len__(self):
+        return len(self.__times)
+
+    @property
+    def times(self):
+        """ Returns the sorted times of the keyframes """
+        return self.__times
+
+    def before(self, sec):
+        """ Returns the index of the last keyframe at or before the time, -1 if none """
+        return _scalar(np.searchsorted(self.__times, sec, side="right") - 1)
+
+    def after(self, sec):
+        """ Returns the index of the first keyframe at or after the time, len if none """
+        return _scalar(np.searchsorted(self.__times, sec, side="left"))
+
+    def nearest(self, sec):
+        """
+        Returns the time of the keyframe nearest to the time, ties go to the earlier one
+
+        Raises
+        ------
+        ValueError
+            there are no keyframes
+        """
+        if len(self.__times) == 0:
+            raise ValueError("no keyframes in the index")
+
+        after = np.minimum(self.after(sec), len(self.__times) - 1)
+        before = np.maximum(after - 1, 0)
+        earlier = np.abs(self.__times[before] - sec) <= np.abs(self.__times[after] - sec)
+
+        return _scalar(np.where(earlier, self.__times[before], self.__times[after]))
+
+    def snap(self, sec, tolerance):
+        """ Returns the nearest keyframe if it is within tolerance secs of the time else the time """
+        if len(self.__times) == 0:
+            return sec
+
+        nearest = self.nearest(sec)
+        return _scalar(np.where(np.abs(nearest - sec) <= tolerance, nearest, sec))
+
+
+def _scalar(value):
+    """ Python scalar of a 0-d array, arrays are returned as is """
+    return value.item() if np.ndim(value) == 0 else value
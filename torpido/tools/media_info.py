@@ -0,0 +1,179 @@
+"""
+Metadata of the input video read with a single ffprobe at the start of the job. The
+info is written to the cache of the job, so the stages (running in their own
+processes) and the render read the same values without probing the video again.
+The probe is also kept in the feature cache, so a video is probed only once.
+"""
+
+import os
+from collections import namedtuple
+from fractions import Fraction
+
+from .. import pympeg
+from ..config.cache import Cache
+from ..config.constants import CACHE_MEDIA_INFO
+from ..tools.feature_cache import FeatureCache
+
+FIELDS = ("file_name", "duration", "fps", "frame_rate", "time_base", "frame_count", "width", "height",
+          "sar", "dar", "video_codec", "pix_fmt", "profile", "level", "audio_codec", "sample_rate", "channels",
+          "channel_layout")
+
+
+def _fraction(value):
+    """ Float of a ffprobe fraction (ex: 30000/1001), None if missing or 0/0 """
+    try:
+        return float(Fraction(value))
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def _number(value, cast=float):
+    """ Number of a ffprobe value, None if missing or N/A """
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class MediaInfo(namedtuple("MediaInfo", FIELDS)):
+    """
+    Duration, frame rate and time base, dimensions, SAR/DAR, codecs and the audio
+    layout of the first video and audio streams. Missing values are None
+
+    Attributes
+    ----------
+    file_name : str
+        absolute path of the video
+    duration : float
+        duration in secs
+    fps : float
+        average frame rate
+    frame_rate : str
+        frame rate as the ffmpeg fraction, ex: 30000/1001
+    time_base : str
+        time base of the video stream, ex: 1/30000
+    frame_count : int
+        no of frames, estimated from the duration if the container does not store it
+    width, height : int
+        dimensions of the video
+    sar, dar : str
+        sample and display aspect ratio, ex: 1:1 and 16:9
+    video_codec, pix_fmt : str
+        codec and pixel format of the video
+    profile : str
+        profile of the codec, ex: High
+    level : int
+        level of the codec as ffprobe reports it, ex: 40 for h264 4.0
+    audio_codec : str
+        codec of the audio
+    sample_rate, channels : int
+        sample rate and no of channels of the audio
+    channel_layout : str
+        layout of the audio channels, ex: stereo
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_probe(cls, file_name, output):
+        """
+        Creates the info from the output of `pympeg.probe`
+
+        Parameters
+        ----------
+        file_name : str
+            probed video
+        output : dict
+            json output of ffprobe
+
+        Returns
+        -------
+        MediaInfo
+            info of the video
+        """
+        streams = output.get("streams", list())
+        video = next((stream for stream in streams if stream.get("codec_type") == "video"), dict())
+        audio = next((stream for stream in streams if stream.get("codec_type") == "audio"), dict())
+
+        duration = _number(output.get("format", dict()).get("duration")) or _number(video.get("duration"))
+        fps = _fraction(video.get("avg_frame_rate")) or _fraction(video.get("r_frame_rate"))
+        frame_count = _number(video.get("nb_frames"), int)
+        if frame_count is None and duration and fps:
+            frame_count = int(round(duration * fps))
+
+        return cls(file_name=os.path.abspath(file_name), duration=duration, fps=fps,
+                   frame_rate=video.get("r_frame_rate"), time_base=video.get("time_base"), frame_count=frame_count,
+                   width=video.get("width"), height=video.get("height"),
+                   sar=video.get("sample_aspect_ratio"), dar=video.get("display_aspect_ratio"),
+                   video_codec=video.get("codec_name"), pix_fmt=video.get("pix_fmt"),
+                   profile=video.get("profile"), level=video.get("level"),
+                   audio_codec=audio.get("codec_name"), sample_rate=_number(audio.get("sample_rate"), int),
+                   channels=audio.get("channels"), channel_layout=audio.get("channel_layout"))
+
+    @classmethod
+    def probe(cls, file_name, features=None):
+        """
+        Returns the info of the video, probed only if it is not in the feature cache
+
+        Parameters
+        ----------
+        file_name : str
+            video file
+        features : FeatureCache
+            cache of the probe, default feature cache if None
+
+        Returns
+        -------
+        MediaInfo
+            info of the video
+        """
+        features = FeatureCache() if features is None else features
+        key = features.key(file_name, "media", {"mtime": os.stat(file_name).st_mtime_ns})
+
+        entry = features.get(key)
+        if entry is None:
+            entry = {"info": cls.from_probe(file_name, pympeg.probe(file_name))._asdict()}
+            features.put(key, entry)
+
+        return cls(**dict(entry["info"], file_name=os.path.abspath(file_name)))
+
+    @classmethod
+    def load(cls, file_name=None):
+        """
+        Returns the info of the job from the cache
+
+        Parameters
+        ----------
+        file_name : str
+            video the info should be of, any if None
+
+        Returns
+        -------
+        MediaInfo
+            info of the job, None if not probed or of another video
+        """
+        info = Cache().read_data(CACHE_MEDIA_INFO)
+        if info is None or (file_name is not None and info["file_name"] != os.path.abspath(file_name)):
+            return None
+
+        return cls(**info)
+
+    @classmethod
+    def get(cls, file_name):
+        """ Returns the info of the job if it is of the video else probes the video """
+        info = cls.load(file_name)
+        return cls.probe(file_name) if info is None else info
+
+    def save(self):
+        """ Writes the info to the cache of the job """
+        Cache().write_data(CACHE_MEDIA_INFO, self._asdict())
+        return self
+
+    @property
+    def has_audio(self):
+        """ True if the video has an audio stream """
+        return self.audio_codec is not None
+
+    @property
+    def has_frames(self):
+        """ True if the frame rate and no of frames are known """
+        return bool(self.fps) and bool(self.frame_count)
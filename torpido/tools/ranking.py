@@ -1,132 +1,247 @@
-import os
-
-from joblib import load, dump
+import numpy as np
 
 from ..tools.logger import Log
 from ..exceptions.custom import RankingOfFeatureMissing
-from ..config.cache import Cache
+from ..config.cache import Cache, get_namespace
 from ..config.config import Config
 from ..config.constants import (CACHE_FRAME_COUNT, CACHE_FPS,
-                                CACHE_DIR, CACHE_NAME,
                                 CACHE_RANK_MOTION, CACHE_RANK_BLUR,
                                 CACHE_RANK_TEXT, CACHE_RANK_AUDIO)
 
 
 class _RankCache:
-    RANK_KEY = "rank"  # key val for the rank cache dict
+    RANK_KEY = "rank"  # prefix of the rank keys in the cache store
 
     def __init__(self):
-        if not os.path.isdir(CACHE_DIR):
-            os.mkdir(CACHE_DIR)
-        self._filename = os.path.join(CACHE_DIR, CACHE_NAME)
+        self._cache = Cache()
+
+    @staticmethod
+    def _key(key):
+        return f"{_RankCache.RANK_KEY}:{key}"
 
     def write(self, key, val):
-        if os.path.isfile(self._filename):
-            data = load(self._filename)
-        else:
-            data = dict()
-
-        if _RankCache.RANK_KEY not in data:
-            rank = dict()
-            rank[key] = val
-            data[_RankCache.RANK_KEY] = rank
-        else:
-            data[_RankCache.RANK_KEY][key] = val
-
-        dump(data, self._filename)
+        self._cache.write_data(_RankCache._key(key), val)
         Log.d(f"[RANK CACHE] {key} stored")
 
     def read(self, key):
-        if os.path.isfile(self._filename):
-            data = load(self._filename)
-            if _RankCache.RANK_KEY in data:
-                if key in data[_RankCache.RANK_KEY]:
-                    return data[_RankCache.RANK_KEY][key]
-                return None
-        return None
+        return self._cache.read_data(_RankCache._key(key))
 
     def all_ranks(self):
-        if os.path.isfile(self._filename):
-            data = load(self._filename)
-            return list(data[_RankCache.RANK_KEY].values())
+        prefix = _RankCache._key("")
+        return [self._cache.read_data(key) for key in self._cache.keys() if key.startswith(prefix)]
 
 
 class Ranking:
+    """
+    Ranking engine over the ranks of the job. The ranks are loaded once as a
+    (features x bins) matrix, a bin is `RANK_RESOLUTION` secs and the timestamps are found with vectorised run
+    detection, both are memoised for the job until a rank or a setting changes.
+
+    The segments are post processed to get fewer and longer cuts, a segment
+    continues till the rank falls below the min rank - `RANK_HYSTERESIS`, segments
+    closer than `SEGMENT_MERGE_GAP` are merged, ones shorter than `SEGMENT_MIN_LENGTH`
+    are dropped and only the `SEGMENT_MAX_COUNT` best ranked are kept
+    """
+    KEYS = (CACHE_RANK_MOTION, CACHE_RANK_BLUR, CACHE_RANK_TEXT, CACHE_RANK_AUDIO)
+
+    # namespace of the job -> (signature of the ranks, results)
+    _memo = dict()
+
+    @staticmethod
+    def _max_length():
+        cache = Cache()
+        frame_count, fps = cache.read_data(CACHE_FRAME_COUNT), cache.read_data(CACHE_FPS)
+        if frame_count is None or not fps:
+            raise RankingOfFeatureMissing
+
+        return int(frame_count / fps / Config.RANK_RESOLUTION)
+
     @staticmethod
-    def _add_padding(val):
-        _max_length = int(Cache().read_data(CACHE_FRAME_COUNT) / Cache().read_data(CACHE_FPS))
+    def _add_padding(val, max_length=None):
+        """ Pads the rank with its mean or trims it to the video length """
+        _max_length = Ranking._max_length() if max_length is None else max_length
+        val = np.asarray(val, dtype=np.float64)
+
+        if len(val) == 0:
+            raise RankingOfFeatureMissing
+
         if len(val) < _max_length:
-            val.extend([sum(val) / len(val)] * abs(_max_length - len(val)))
-            return val
+            return np.concatenate((val, np.full(_max_length - len(val), val.mean())))
         return val[0: _max_length]
 
     @staticmethod
-    def _trim_by_rank(ranks):
-        timestamps = list()
-        _min_rank = Config.MIN_RANK_OUT_VIDEO
-        start, end, prev_end, i = None, None, 0, 0
+    def _runs(mask):
+        """ Start and stop (exclusive) indices of the runs of True in the mask """
+        edges = np.diff(np.concatenate(([False], mask, [False])).astype(np.int8))
+        return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+    @staticmethod
+    def _trim_by_rank(ranks, hysteresis=0):
+        """
+        Runs of the ranks above the min rank as [start, end], end is the last index of
+        the run or the length of the ranks for a run till the end. With hysteresis a run
+        continues while the rank is above min rank - hysteresis
+        """
+        ranks = np.asarray(ranks)
+        above = ranks > Config.MIN_RANK_OUT_VIDEO - hysteresis
+        starts, stops = Ranking._runs(above)
+
+        # only the runs reaching the min rank
+        if hysteresis:
+            reached = np.concatenate(([0], np.cumsum(ranks > Config.MIN_RANK_OUT_VIDEO)))
+            keep = reached[stops] > reached[starts]
+            starts, stops = starts[keep], stops[keep]
+
+        # closed runs end on their last index
+        ends = np.where(stops < len(above), stops - 1, stops)
+        return [[int(start), int(end)] for start, end in zip(starts, ends)]
+
+    @staticmethod
+    def _post_process(timestamps, ranks, merge_gap=0, min_length=0, max_count=0):
+        """
+        Merges the segments closer than merge_gap, drops the ones shorter than min_length
+        (and the empty ones) and keeps the max_count best ranked segments in order
+
+        Returns
+        -------
+        list
+            list of [start, end]
+        """
+        if len(timestamps) == 0:
+            return list()
+
+        starts, ends = np.asarray(timestamps).T
+
+        # a new segment where the gap to the previous one is big enough
+        first = np.flatnonzero(np.concatenate(([True], starts[1:] - ends[:-1] > merge_gap)))
+        last = np.concatenate((first[1:] - 1, [len(starts) - 1]))
+        starts, ends = starts[first], ends[last]
+
+        keep = (ends - starts > 0) & (ends - starts >= min_length)
+        starts, ends = starts[keep], ends[keep]
+
+        if max_count and len(starts) > max_count:
+            total = np.concatenate(([0], np.cumsum(ranks)))
+            score = total[np.minimum(ends, len(ranks))] - total[starts]
+            best = np.sort(np.argsort(-score, kind="stable")[: max_count])
+            starts, ends = starts[best], ends[best]
+
+        return [[int(start), int(end)] for start, end in zip(starts, ends)]
+
+    @staticmethod
+    def _signature():
+        """ Changes whenever a rank, the video length or the min rank changes """
+        entries = {key: (size, mtime) for key, size, mtime in Cache().entries()}
+        keys = [_RankCache._key(key) for key in Ranking.KEYS] + [CACHE_FPS, CACHE_FRAME_COUNT]
+        return tuple(entries.get(key) for key in keys), Ranking._settings()
 
-        for i in range(len(ranks)):
-            if start is None and ranks[i] > _min_rank:
-                start = i
+    @staticmethod
+    def _settings():
+        """ Settings of the segments """
+        return (Config.MIN_RANK_OUT_VIDEO, Config.RANK_HYSTERESIS, Config.SEGMENT_MERGE_GAP,
+                Config.SEGMENT_MIN_LENGTH, Config.SEGMENT_MAX_COUNT, Config.RANK_RESOLUTION)
 
-            if start is not None and end is None and ranks[i] <= _min_rank:
-                end = i - 1
+    @staticmethod
+    def _to_seconds(timestamps):
+        """ Bins to secs, whole secs are kept as int """
+        resolution = Config.RANK_RESOLUTION
+        if float(resolution).is_integer():
+            return [[start * int(resolution), end * int(resolution)] for start, end in timestamps]
 
-            if start is not None and end is not None:
-                timestamps.append([start, end])
-                start, end = None, None
+        return [[round(start * resolution, 6), round(end * resolution, 6)] for start, end in timestamps]
+
+    @staticmethod
+    def _memoised(name, compute):
+        """ Result of compute, computed once per job until the signature changes """
+        namespace, signature = get_namespace(), Ranking._signature()
+        memo = Ranking._memo.get(namespace)
 
-        if end is None and start is not None:
-            timestamps.append([start, i + 1])
+        if memo is None or memo[0] != signature:
+            memo = Ranking._memo[namespace] = (signature, dict())
 
-        return timestamps
+        if name not in memo[1]:
+            memo[1][name] = compute()
+        return memo[1][name]
 
     @staticmethod
-    def add(key, rank: list):
-        _RankCache().write(key, rank)
+    def add(key, rank):
+        """ Stores the per bin ranks of the feature once as an array, read back zero copy """
+        _RankCache().write(key, np.asarray(rank, dtype=np.float64))
+        Ranking._memo.pop(get_namespace(), None)
 
     @staticmethod
     def get(key):
+        """ Returns the per bin ranks of the feature as a read only memory mapped array, None if missing """
         return _RankCache().read(key)
 
     @staticmethod
-    def ranks():
-        keys = [CACHE_RANK_MOTION, CACHE_RANK_BLUR, CACHE_RANK_TEXT, CACHE_RANK_AUDIO]
-        return [Ranking._add_padding(Ranking.get(key) if Ranking.get(key) else list()) for key in keys]
+    def matrix():
+        """
+        Ranks of all the features padded to the video length
+
+        Returns
+        -------
+        np.ndarray
+            (features x bins) ranks in the order of `KEYS`, read only
+        """
+        def compute():
+            max_length = Ranking._max_length()
+            ranks = [Ranking.get(key) for key in Ranking.KEYS]
+            if any(rank is None for rank in ranks):
+                raise RankingOfFeatureMissing
+
+            matrix = np.stack([Ranking._add_padding(rank, max_length) for rank in ranks])
+            matrix.flags.writeable = False
+            return matrix
+
+        return Ranking._memoised("matrix", compute)
 
     @staticmethod
-    def get_timestamps():
-        sum_ranks = [sum(rank_list) for rank_list in zip(* Ranking.ranks())]
+    def ranks():
+        return [rank.tolist() for rank in Ranking.matrix()]
 
-        if sum_ranks is None:
-            raise RankingOfFeatureMissing
+    @staticmethod
+    def sum_ranks(weights=None):
+        """
+        Weighted sum of the ranks of all the features
 
-        timestamps, final = Ranking._trim_by_rank(sum_ranks), list()
+        Parameters
+        ----------
+        weights : iterable
+            weight of every feature in the order of `KEYS`, 1 for all if None
 
-        for clip in timestamps:
-            if len(clip) % 2 == 0:
-                start, end = clip
-                if end - start > 0:  # not storing 0 or negative timestamp
-                    final.append(clip)
+        Returns
+        -------
+        np.ndarray
+            rank of every bin
+        """
+        if weights is None:
+            return Ranking._memoised("sum", lambda: Ranking.matrix().sum(axis=0))
 
-        return final
+        return (Ranking.matrix() * np.asarray(weights, dtype=np.float64)[:, None]).sum(axis=0)
 
     @staticmethod
-    def get_video_length():
-        video_length, timestamps = 0, Ranking.get_timestamps()
+    def get_timestamps():
+        def compute():
+            ranks = Ranking.sum_ranks()
+            timestamps = Ranking._trim_by_rank(ranks, Config.RANK_HYSTERESIS)
 
-        if len(timestamps) < 0:
-            return 0
+            # not storing 0 or negative timestamp
+            resolution = Config.RANK_RESOLUTION
+            return Ranking._to_seconds(Ranking._post_process(timestamps, ranks,
+                                                             Config.SEGMENT_MERGE_GAP / resolution,
+                                                             Config.SEGMENT_MIN_LENGTH / resolution,
+                                                             Config.SEGMENT_MAX_COUNT))
 
-        for start, end in timestamps:
-            video_length += abs(end - start)
+        return [list(clip) for clip in Ranking._memoised("timestamps", compute)]
 
-        return video_length
+    @staticmethod
+    def get_video_length():
+        return sum(end - start for start, end in Ranking.get_timestamps())
 
     @staticmethod
     def get_thumbnail_sec():
-        from random import randint
+        from random import randint, uniform
 
         timestamps = Ranking.get_timestamps()
         if len(timestamps) == 0:
@@ -135,4 +250,6 @@ class Ranking:
         first = timestamps[0]
         start, end = first[0], first[1]
 
-        return randint(start, end)
+        if isinstance(start, int) and isinstance(end, int):
+            return randint(start, end)
+        return round(uniform(start, end), 3)
@@ -36,7 +36,7 @@ def add_padding(rank_list: list, length):
 
 def read_rankings():
     """
-    Reads the ranking using the joblib files and calculate
+    Reads the ranking from the cache store and calculate
     the final sum ranks
 
     Getting the ranking length for the ranks for the features from max
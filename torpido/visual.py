@@ -1,7 +1,7 @@
 """
 This file reads the video and gives ranking to frames
 that have motion in it, saves in the dictionary with frame numbers
-this dictionary is then saved in a joblib file defined in constants.py
+this dictionary is then saved in the cache store defined in constants.py
 """
 
 from time import sleep
@@ -13,8 +13,10 @@ import numpy as np
 from .config.cache import Cache
 from .config.config import Config
 from .config.constants import *
+from .tools.feature_cache import FeatureCache
+from .tools.features import FeatureArray, rerank
 from .tools.logger import Log
-from .tools.ranking import Ranking
+from .tools.media_info import MediaInfo
 from .video import Stream
 
 
@@ -34,14 +36,16 @@ class Visual:
         input video fps
     self.__frame_count : int
         number of frames
-    self.__motion : list
-        list of the ranks for the motion feature
-    self.__blur : list
-        list of the ranks for the blur feature
+    self.__motion : FeatureArray
+        max pixel change between the frames (uint8)
+    self.__blur : FeatureArray
+        variance of the laplacian of the frames (float32)
     self.__cache : Cache
         cache object to store the data
     self.__video_stream : Stream
         video reader object to read the video and save it in thread
+    self.__features : FeatureCache
+        persistent cache of the features of the videos already processed
     """
 
     def __init__(self):
@@ -50,20 +54,25 @@ class Visual:
         self.__blur_threshold, self.__motion_threshold = Config.BLUR_THRESHOLD, Config.MOTION_THRESHOLD
         self.__frame_count = self.__fps = self.__motion = self.__blur = None
         self.__video_stream = self.__video_pipe = None
+        self.__features = FeatureCache()
 
     def __detect_blur(self, image):
         """
         Laplacian take 2nd derivative of one channel of the image(gray scale)
         It highlights regions of an image containing rapid intensity changes, much like the Sobel and Scharr operators.
-        And then calculates the variance (squared SD), then check if the variance satisfies the Threshold value/
+        And then calculates the variance (squared SD), the frame is blurry if the variance is below the Threshold value
 
         Parameters
         ---------
         image : array
             frame from the video file
+
+        Returns
+        -------
+        float
+            variance of the laplacian
         """
-        # if blur rank is 0 else RANK_BLUR
-        return 0 if cv2.Laplacian(image, cv2.CV_64F).var() >= self.__blur_threshold else Config.RANK_BLUR
+        return cv2.Laplacian(image, cv2.CV_64F).var()
 
     def __timed_ranking_normalize(self):
         """
@@ -77,21 +86,14 @@ class Visual:
         results.
 
         We will read both the list and slice the video to get 1 sec of frames(1 * fps) and get
-        mean/average as the rank for the 1 sec
+        mean/average as the rank for the 1 sec. The frames are ranked from the raw features
+        in the cache, see `features.rerank`
 
         """
-        motion_normalize, blur_normalize = list(), list()
-        for i in range(0, int(self.__frame_count), int(self.__fps)):
-            if len(self.__motion) >= (i + int(self.__fps)):
-                motion_normalize.append(np.mean(self.__motion[i: i + int(self.__fps)]))
-                blur_normalize.append(np.mean(self.__blur[i: i + int(self.__fps)]))
-            else:
-                break
+        ranks = rerank((CACHE_FEATURE_MOTION, CACHE_FEATURE_BLUR), fps=self.__fps, frame_count=self.__frame_count,
+                       settings={"BLUR_THRESHOLD": self.__blur_threshold, "MOTION_THRESHOLD": self.__motion_threshold})
 
-        # saving all processed stuffs
-        Ranking.add(CACHE_RANK_MOTION, motion_normalize)
-        Ranking.add(CACHE_RANK_BLUR, blur_normalize)
-        Log.d(f"Visual rank length {len(motion_normalize)}  {len(blur_normalize)}")
+        Log.d(f"Visual rank length {len(ranks[CACHE_RANK_MOTION])}  {len(ranks[CACHE_RANK_BLUR])}")
         Log.i(f"Visual ranking saved .............")
 
     def __del__(self):
@@ -117,29 +119,43 @@ class Visual:
             Log.e(f"File {input_file} does not exists")
             return
 
-        # maintaining the motion and blur frames list
-        self.__motion, self.__blur = list(), list()
+        # same video already analysed, only the ranking is done again
+        key = self.__features.key(input_file, "visual", dict())
+        entry = self.__features.get(key)
+        if entry is not None:
+            self.__features.restore(entry)
+            self.__fps, self.__frame_count = entry["cache"][CACHE_FPS], entry["cache"][CACHE_FRAME_COUNT]
+            self.__timed_ranking_normalize()
+            if pipe is not None:
+                pipe.send(ID_COM_PROGRESS, 95.0)
+            return
+
+        # maintaining the motion and blur of the frames, out of memory for long videos
+        self.__motion, self.__blur = FeatureArray(np.uint8), FeatureArray(np.float32)
         self.__video_stream = Stream(str(input_file)).start()
         my_clip = self.__video_stream.stream
 
         if not self.__video_stream.more():
             sleep(0.1)
 
-        fps = my_clip.get(cv2.CAP_PROP_FPS)
-        total_frames = my_clip.get(cv2.CAP_PROP_FRAME_COUNT)
+        # metadata probed by the job, opencv if the video was not probed
+        info = MediaInfo.load(input_file)
+        if info is not None and info.has_frames:
+            fps, total_frames, width, height = info.fps, info.frame_count, info.width, info.height
+        else:
+            fps, total_frames = my_clip.get(cv2.CAP_PROP_FPS), my_clip.get(cv2.CAP_PROP_FRAME_COUNT)
+            width, height = int(my_clip.get(cv2.CAP_PROP_FRAME_WIDTH)), int(my_clip.get(cv2.CAP_PROP_FRAME_HEIGHT))
         self.__fps, self.__frame_count = fps, total_frames
 
         self.__cache.write_data(CACHE_FPS, self.__fps)
         self.__cache.write_data(CACHE_FRAME_COUNT, self.__frame_count)
-        self.__cache.write_data(CACHE_VIDEO_WIDTH, cv2.CAP_PROP_FRAME_WIDTH)
-        self.__cache.write_data(CACHE_VIDEO_HEIGHT, cv2.CAP_PROP_FRAME_HEIGHT)
+        self.__cache.write_data(CACHE_VIDEO_WIDTH, width)
+        self.__cache.write_data(CACHE_VIDEO_HEIGHT, height)
 
         # printing some info
         Log.d(f"Total count of video frames :: {total_frames}")
         Log.i(f"Video fps :: {fps}")
-        Log.i(f"Bit rate :: {cv2.CAP_PROP_BITRATE}")
-        Log.i(f"Video format :: {cv2.CAP_PROP_FORMAT}")
-        Log.i(f"Video four cc :: {cv2.CAP_PROP_FOURCC}")
+        Log.i(f"Video size :: {width}x{height}")
 
         first_frame = self.__video_stream.read()
         first_frame_processed, original, count = True, None, 0
@@ -163,15 +179,9 @@ class Visual:
                 first_frame = cv2.GaussianBlur(first_frame, (21, 21), 0)
                 first_frame_processed = False
 
+            # max change of a pixel, motion if it is above the threshold
             frame_delta = cv2.absdiff(first_frame, frame)
-            thresh = cv2.threshold(frame_delta, self.__motion_threshold, 255, cv2.THRESH_BINARY)[1]
-            # thresh = cv2.adaptiveThreshold(frameDelta, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-
-            thresh_max = np.max(thresh)
-            if thresh_max > 0:
-                self.__motion.append(Config.RANK_MOTION)
-            else:
-                self.__motion.append(0)
+            self.__motion.append(np.max(frame_delta))
 
             if display:
 
@@ -198,9 +208,21 @@ class Visual:
         # clearing memory
         self.__video_stream.stop()
 
-        # calling the normalization of ranking
+        # saving the raw features and calling the normalization of ranking
+        motion, blur = np.asarray(self.__motion.array()), np.asarray(self.__blur.array())
+        self.__cache.write_data(CACHE_FEATURE_MOTION, motion)
+        self.__cache.write_data(CACHE_FEATURE_BLUR, blur)
         self.__timed_ranking_normalize()
 
+        self.__features.put(key, {"cache": {CACHE_FPS: self.__fps, CACHE_FRAME_COUNT: self.__frame_count,
+                                            CACHE_VIDEO_WIDTH: width, CACHE_VIDEO_HEIGHT: height}},
+                            arrays={CACHE_FEATURE_MOTION: motion, CACHE_FEATURE_BLUR: blur})
+
+        # mapped arrays are released before their files
+        del motion, blur
+        self.__motion.close()
+        self.__blur.close()
+
     def set_pipe(self, pipe):
         """
         Send video frame to the ui threads for displaying, since open cv
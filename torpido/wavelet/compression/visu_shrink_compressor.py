@@ -3,7 +3,7 @@
 import numpy as np
 
 from torpido.wavelet.compression.compressor import Compressor
-from torpido.wavelet.util.utility import threshold, mad
+from torpido.wavelet.util.utility import threshold, mad, getLevelSlices
 
 
 class VisuShrinkCompressor:
@@ -16,37 +16,81 @@ class VisuShrinkCompressor:
         object to call the compress function
     __threshold: float
         threshold for the signal
+    __sigma: float
+        noise estimate carried across the blocks
+    __smoothing: float
+        weight of the newest block in the noise estimate
+    __maxChange: float
+        max factor by which a block can move the noise estimate
+    __mode: str
+        thresholding mode, hard, soft or garrote
 
     References
     ------
     Can be used to reduce noise from a audio signal. Better noise
-    threshold calculation
+    threshold calculation. The noise is estimated from the finest detail
+    level, sigma = MAD / 0.6745 (Donoho & Johnstone)
     """
 
-    def __init__(self):
+    def __init__(self, smoothing=0.2, maxChange=2., mode="soft"):
         self.__compressor = Compressor()
-        self.__threshold = None
+        self.__threshold = self.__sigma = None
+        self.__smoothing, self.__maxChange, self.__mode = smoothing, maxChange, mode
 
-    def compress(self, coefficients):
+    def compress(self, coefficients, level=None):
         """
-        Thresholding by generated the threshold value
+        Thresholding by generated the threshold value. The noise is estimated
+        on every block and the detail levels are thresholded, the approximation
+        is kept as it is. An array of doubles is thresholded in place
 
         Parameters
         ----------
         coefficients: array_like
             input coefficients,  output of the decompose method
+        level: int
+            level used for the decomposition, max level if None
 
         Returns
         -------
         array_like
             thresholded coefficients
         """
-        # calculating the threshold only once
-        if self.__threshold is None:
-            sigma = mad(coefficients)
-            self.__threshold = sigma * np.sqrt(2 * np.log(len(coefficients)))
+        coefficients = np.asarray(coefficients, dtype=np.float64)
+        _, details = getLevelSlices(len(coefficients), level)
 
-        return threshold(coefficients, self.__threshold)
+        # nothing to threshold
+        if len(details) == 0:
+            return coefficients
+
+        # noise from the finest level only, it is mostly noise
+        finest = np.concatenate([coefficients[index] for index in details[0]])
+        self.__sigma = self.__update(mad(finest) / 0.6745)
+        self.__threshold = self.__sigma * np.sqrt(2 * np.log(len(coefficients)))
+
+        return threshold(coefficients, self.__threshold, mode=self.__mode, out=coefficients,
+                         keepApproximation=True, level=level)
+
+    def __update(self, sigma):
+        """
+        Streaming estimate of the noise, the block estimate is clipped to
+        within maxChange of the previous estimate and then smoothed so that a
+        single loud or silent block cannot swing the threshold
+
+        Parameters
+        ----------
+        sigma: float
+            noise estimated from the current block
+
+        Returns
+        -------
+        float
+            updated noise estimate
+        """
+        if self.__sigma is None or self.__sigma == 0:
+            return sigma
+
+        sigma = np.clip(sigma, self.__sigma / self.__maxChange, self.__sigma * self.__maxChange)
+        return self.__sigma + self.__smoothing * (sigma - self.__sigma)
 
     def getCompressionRate(self, data):
         """
@@ -75,3 +119,14 @@ class VisuShrinkCompressor:
             threshold value
         """
         return self.__threshold
+
+    def getNoise(self):
+        """
+        Returns the current noise estimate for the signal
+
+        Returns
+        -------
+        float
+            noise (sigma) value
+        """
+        return self.__sigma
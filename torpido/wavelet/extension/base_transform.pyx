@@ -6,8 +6,8 @@ import numpy as np
 
 
 cdef class BaseTransform:
-    def __init__(self, waveletName):
-        self.wavelet = WaveletTransform(waveletName)
+    def __init__(self, waveletName, convolution="auto"):
+        self.wavelet = WaveletTransform(waveletName, convolution)
 
     cpdef waveDec1(self, np.ndarray arrTime, int level):
         cdef int length = 0
@@ -0,0 +1,203 @@
+"""
+FFT path for the wavelet transform. The direct loop costs O(n * taps) per level
+which makes long filters like dmey, db20 or sym20 very slow, the same circular
+convolution is done here in O(n log n) independent of the no of taps.
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+from torpido.wavelet.exceptions import WaveletException
+
+# shortest signal for the fft path, below it the direct loop is always faster
+FFT_MIN_LENGTH = 256
+
+# filter length from which the fft path is faster, measured by calibrate()
+_crossover = None
+
+
+class FFTTransform:
+    """
+    Computes the same periodic dwt & idwt as the WaveletTransform with the
+    filters applied in the frequency domain. Short signals are transformed
+    with a single circular fft, longer ones by overlap-save in blocks of at
+    least 8 times the filter length, so the cost per sample stays flat.
+
+    Attributes
+    ----------
+    __bank : FilterBank
+        filters of the wavelet
+    __block : int
+        fft size for the overlap-save
+    __spectra : dict
+        fft size -> spectra of the filters
+    """
+
+    def __init__(self, bank):
+        if bank.length % 2:
+            raise WaveletException("FFT transform requires a filter with an even no of taps")
+
+        self.__bank = bank
+        self.__block = max(1024, 1 << int(np.ceil(np.log2(bank.length * 8))))
+        self.__spectra = dict()
+
+    def __getSpectra(self, length):
+        """
+        Returns the spectra of the filters wrapped around the length,
+        decomposition filters are conjugated as the dwt is a correlation
+        """
+        if length not in self.__spectra:
+            taps = np.arange(self.__bank.length) % length
+            spectra = list()
+
+            for values in (self.__bank.decompositionLowFilter, self.__bank.decompositionHighFilter,
+                           self.__bank.reconstructionLowFilter, self.__bank.reconstructionHighFilter):
+                wrapped = np.zeros(length)
+                np.add.at(wrapped, taps, values)
+                spectra.append(np.fft.rfft(wrapped))
+
+            spectra[0], spectra[1] = np.conj(spectra[0]), np.conj(spectra[1])
+            self.__spectra[length] = spectra
+
+        return self.__spectra[length]
+
+    def __frames(self, extended, level, block, hop):
+        """ Overlapping blocks of the extended signal, every block gives hop outputs """
+        count = -(-level // hop)
+
+        padded = np.zeros((count - 1) * hop + block)
+        padded[: len(extended)] = extended
+
+        return np.lib.stride_tricks.sliding_window_view(padded, block)[::hop]
+
+    def dwt(self, arrTime, level):
+        """ Single level decomposition of the first level values of the signal """
+        arrTime = np.asarray(arrTime[: level])
+        arrHilbert = np.empty(level)
+        half = level >> 1
+
+        # whole signal in one circular fft
+        if level <= self.__block:
+            decompLF, decompHF, _, _ = self.__getSpectra(level)
+            spectrum = np.fft.rfft(arrTime)
+            arrHilbert[: half] = np.fft.irfft(spectrum * decompLF, level)[::2]
+            arrHilbert[half:] = np.fft.irfft(spectrum * decompHF, level)[::2]
+            return arrHilbert
+
+        # overlap-save, the signal is extended circularly by the no of taps
+        block, taps = self.__block, self.__bank.length
+        hop, quarter = block - taps, block >> 2
+        decompLF, decompHF, _, _ = self.__getSpectra(block)
+        spectrum = np.fft.rfft(self.__frames(np.concatenate((arrTime, arrTime[: taps])), level, block, hop), axis=-1)
+
+        # only the even outputs are kept, so decimating in the frequency domain
+        # D[k] = (C[k] + conj(C[block / 2 - k])) / 2 and a half size inverse
+        for filterSpectrum, out in ((decompLF, arrHilbert[: half]), (decompHF, arrHilbert[half:])):
+            correlation = spectrum * filterSpectrum
+            decimated = (correlation[:, : quarter + 1] + np.conj(correlation[:, quarter * 2: quarter - 1: -1])) / 2
+            out[...] = np.fft.irfft(decimated, block >> 1)[:, : hop >> 1].reshape(-1)[: half]
+
+        return arrHilbert
+
+    def idwt(self, arrHilbert, level):
+        """ Single level reconstruction of the first level values of the coefficients """
+        arrHilbert = np.asarray(arrHilbert[: level])
+        half = level >> 1
+
+        # whole signal in one circular fft
+        if level <= self.__block:
+            approx, detail = np.zeros(level), np.zeros(level)
+            approx[::2], detail[::2] = arrHilbert[: half], arrHilbert[half:]
+
+            _, _, reconLF, reconHF = self.__getSpectra(level)
+            return np.fft.irfft(np.fft.rfft(approx) * reconLF + np.fft.rfft(detail) * reconHF, level)
+
+        # overlap-save, the coefficients are extended circularly by half the no of taps in front
+        block, taps = self.__block, self.__bank.length
+        hop, quarter = block - taps, block >> 2
+        _, _, reconLF, reconHF = self.__getSpectra(block)
+        spectrum = None
+
+        # spectrum of the upsampled block is the half size spectrum repeated
+        for coefficients, filterSpectrum in ((arrHilbert[: half], reconLF), (arrHilbert[half:], reconHF)):
+            extended = np.concatenate((coefficients[half - (taps >> 1):], coefficients))
+            halfSpectrum = np.fft.rfft(self.__frames(extended, half, block >> 1, hop >> 1), axis=-1)
+            upsampled = np.concatenate((halfSpectrum, np.conj(halfSpectrum[:, quarter - 1:: -1])), axis=-1)
+
+            if spectrum is None:
+                spectrum = upsampled * filterSpectrum
+            else:
+                spectrum += upsampled * filterSpectrum
+
+        return np.fft.irfft(spectrum, block)[:, taps:].reshape(-1)[: level]
+
+
+def getCrossover():
+    """ Returns the filter length from which the fft path is used, calibrates on first call """
+    if _crossover is None:
+        setCrossover(calibrate())
+
+    return _crossover
+
+
+def setCrossover(length):
+    """ Sets the filter length from which the fft path is used """
+    global _crossover
+    _crossover = int(length)
+
+
+def calibrate(signalLength=1 << 14, repeat=3):
+    """
+    Measures the filter length from which the fft path is faster than the direct
+    loop on this machine. Every registered filter length is timed for a single
+    level decomposition and reconstruction, the crossover is the shortest length
+    after which the fft path always wins
+
+    Parameters
+    ----------
+    signalLength : int
+        power of 2 length of the signal to time with
+    repeat : int
+        best of no of runs
+
+    Returns
+    -------
+    int
+        crossover filter length
+    """
+    from torpido.wavelet.extension.wavelet_transform import WaveletTransform
+    from torpido.wavelet.wavelets import getAllWavelets, getFilterBank
+
+    # one wavelet per filter length
+    names = dict()
+    for name in getAllWavelets():
+        names.setdefault(getFilterBank(name).length, name)
+
+    signal = np.random.default_rng(0).standard_normal(signalLength)
+    faster = dict()
+
+    for length, name in sorted(names.items()):
+        direct, fft = WaveletTransform(name, convolution="direct"), WaveletTransform(name, convolution="fft")
+        faster[length] = _time(fft, signal, repeat) < _time(direct, signal, repeat)
+
+    crossover = max(names) + 1
+    for length in sorted(faster, reverse=True):
+        if not faster[length]:
+            break
+        crossover = length
+
+    return crossover
+
+
+def _time(transform, signal, repeat):
+    """ Best time for a decomposition and reconstruction of the signal """
+    best = None
+
+    for _ in range(repeat):
+        start = perf_counter()
+        transform.idwt(transform.dwt(signal, len(signal)), len(signal))
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
@@ -3,19 +3,32 @@ import numpy as np
 cimport cython
 
 
-from torpido.wavelet.wavelets import getWaveletDefinition
+from torpido.wavelet.extension.fft_transform import FFTTransform, FFT_MIN_LENGTH, getCrossover
+from torpido.wavelet.exceptions import WaveletException
+from torpido.wavelet.wavelets import getFilterBank
 
 
 class WaveletTransform:
-    def __init__(self, waveletName):
-        self.w = getWaveletDefinition(waveletName)
+    def __init__(self, waveletName, convolution="auto"):
+        if convolution not in ("auto", "direct", "fft"):
+            raise WaveletException("Convolution should be auto, direct or fft")
+
+        self.w = getFilterBank(waveletName)
+        self.fft = None
+
+        # long filters are convolved in the frequency domain
+        if convolution == "fft" or (convolution == "auto" and self.w.length >= getCrossover()):
+            self.fft = FFTTransform(self.w)
+        self.fftMinLength = 2 if convolution == "fft" else FFT_MIN_LENGTH
 
     @cython.boundscheck(False)
     @cython.wraparound(False)
     def dwt(self, double[:] arrTime, int level):
+        if self.fft is not None and level >= self.fftMinLength:
+            return self.fft.dwt(arrTime, level)
 
-        cdef double[:] decompHF = np.array(self.w.decompositionHighFilter)
-        cdef double[:] decompLF = np.array(self.w.decompositionLowFilter)
+        cdef const double[:] decompHF = self.w.decompositionHighFilter
+        cdef const double[:] decompLF = self.w.decompositionLowFilter
 
         cdef np.ndarray arrHilbert = np.zeros(level)
         cdef double[:] arrHilbert_view = arrHilbert
@@ -25,7 +38,7 @@ class WaveletTransform:
         cdef int i
         cdef int j
         cdef int k
-        cdef int motherWaveletLength = self.w.__motherWaveletLength__
+        cdef int motherWaveletLength = self.w.length
 
         for i in range(a):
             for j in range(motherWaveletLength):
@@ -45,9 +58,11 @@ class WaveletTransform:
     @cython.boundscheck(False)
     @cython.wraparound(False)
     def idwt(self, double[:] arrHilbert, int level):
+        if self.fft is not None and level >= self.fftMinLength:
+            return self.fft.idwt(arrHilbert, level)
 
-        cdef double[:] reconLF = np.array(self.w.reconstructionLowFilter)
-        cdef double[:] reconHF = np.array(self.w.reconstructionHighFilter)
+        cdef const double[:] reconLF = self.w.reconstructionLowFilter
+        cdef const double[:] reconHF = self.w.reconstructionHighFilter
 
         cdef np.ndarray arrTime = np.zeros(level)
         cdef double[:] arrTime_view = arrTime
@@ -57,7 +72,7 @@ class WaveletTransform:
         cdef int i
         cdef int j
         cdef int k
-        cdef int motherWaveletLength = self.w.__motherWaveletLength__
+        cdef int motherWaveletLength = self.w.length
 
         for i in range(a):
             for j in range(motherWaveletLength):
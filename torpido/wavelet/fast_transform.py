@@ -10,10 +10,13 @@ class FastWaveletTransform(BaseTransform):
     """
     Reads the dimensions of the input signal and calls
     the respective functions of the Base Transform class
+
+    The convolution is auto, direct or fft. Auto uses the fft path for the
+    wavelets with filters longer than the calibrated crossover
     """
 
-    def __init__(self, waveletName):
-        super().__init__(waveletName)
+    def __init__(self, waveletName, convolution="auto"):
+        super().__init__(waveletName, convolution)
 
     def waverec(self, arrHilbert, level=None):
         """
@@ -6,6 +6,9 @@ import numpy as np
 
 from torpido.wavelet.exceptions import WaveletException
 
+# no of coefficients thresholded at a time, keeps the scratch buffer in cache
+CHUNK_SIZE = 1 << 14
+
 
 def getExponent(value):
     """Returns the exponent for the data Ex: 8 -> 3 [2 ^ 3]"""
@@ -50,33 +53,177 @@ def decomposeArbitraryLength(number):
     return tempArray[:position]
 
 
-def threshold(data, value, substitute=0):
-    """Soft thresholding"""
+def threshold(data, value, substitute=0, mode="soft", out=None, keepApproximation=False, level=None,
+              chunkSize=CHUNK_SIZE):
+    """
+    Thresholding of the coefficients without temporaries of the size of the
+    data. The data is processed in chunks with a scratch buffer of chunkSize
+    so big blocks stay in cache, pass out=data to threshold in place.
 
-    magnitude = np.absolute(data)
+    Modes
+    -----
+    hard : x if |x| >= value else 0
+    soft : sign(x) * max(|x| - value, 0)
+    garrote : x - value^2 / x if |x| > value else 0
 
-    with np.errstate(divide='ignore'):
-        # divide by zero okay as np.inf values get clipped, so ignore warning.
-        thresholded = (1 - value / magnitude)
-        thresholded.clip(min=0, max=None, out=thresholded)
-        thresholded *= data
+    Parameters
+    ----------
+    data: array_like
+        input coefficients
+    value: float
+        threshold value
+    substitute: float
+        value to put in place of the coefficients below the threshold
+    mode: str
+        hard, soft or garrote
+    out: array_like
+        output array of the same shape, new array if None
+    keepApproximation: bool
+        True to leave the approximation band of the decomposition as it is
+    level: int
+        level used for the decomposition, needed with keepApproximation
+    chunkSize: int
+        no of coefficients processed at a time
 
-    if substitute == 0:
-        return thresholded
-    else:
-        cond = np.less(magnitude, value)
-        return np.where(cond, substitute, thresholded)
+    Returns
+    -------
+    array_like
+        thresholded coefficients
+    """
+    if mode not in ("hard", "soft", "garrote"):
+        raise WaveletException("Threshold mode should be hard, soft or garrote")
+
+    data = np.asarray(data, dtype=np.float64)
+    if out is None:
+        out = np.empty_like(data)
+    elif out.shape != data.shape:
+        raise WaveletException("Output should have the same shape as the data")
+
+    flatData, flatOut = data.reshape(-1), out.reshape(-1)
+
+    # regions to threshold, all of it or everything between the approximations
+    regions = [(0, len(flatData))]
+    if keepApproximation:
+        approximation, _ = getLevelSlices(len(flatData), level)
+        regions = [(a.stop, b.start) for a, b in zip(approximation, approximation[1:] + [slice(len(flatData), None)])]
+
+        if flatOut is not flatData and not np.shares_memory(flatOut, flatData):
+            for index in approximation:
+                flatOut[index] = flatData[index]
+
+    scratch = np.empty(min(chunkSize, len(flatData)), dtype=np.float64)
+    below = np.empty(len(scratch), dtype=np.bool_) if substitute != 0 or mode == "hard" else None
+
+    for start, stop in regions:
+        for begin in range(start, stop, chunkSize):
+            end = min(begin + chunkSize, stop)
+            x, y, magnitude = flatData[begin: end], flatOut[begin: end], scratch[: end - begin]
+
+            np.absolute(x, out=magnitude)
+            if below is not None:
+                np.less(magnitude, value, out=below[: end - begin])
+
+            if mode == "hard":
+                y[...] = x
+                y[below[: end - begin]] = substitute
+                continue
+
+            with np.errstate(divide='ignore'):
+                # divide by zero okay as np.inf values get clipped, so ignore warning.
+                np.divide(value, magnitude, out=magnitude)
+
+            if mode == "garrote":
+                np.square(magnitude, out=magnitude)
+
+            np.subtract(1., magnitude, out=magnitude)
+            np.maximum(magnitude, 0., out=magnitude)
+            np.multiply(x, magnitude, out=y)
+
+            if substitute != 0:
+                y[below[: end - begin]] = substitute
+
+    return out
+
+
+def getLevelSlices(length, level=None):
+    """
+    Returns the positions of the coefficients of every level in the output of
+    the decomposition of a signal of arbitrary length. Each power of 2 partition
+    is laid out as [approx][detail level n] ... [detail level 2][detail level 1]
+
+    Examples
+    --------
+    length 12 : partitions 8, 4
+    approximation : [0:1], [8:9]
+    details : [[4:8], [10:12]], [[2:4], [9:10]], [[1:2]]
+
+    Parameters
+    ----------
+    length: int
+        length of the signal
+    level: int
+        level for decomposition, max level if None
+
+    Returns
+    -------
+    tuple
+        slices of the approximation and list of slices of the details per
+        level, the finest level first
+    """
+    if level is None:
+        level = getExponent(length)
+
+    approximation, details, offset = list(), list(), 0
+
+    for power in decomposeArbitraryLength(length):
+        steps = min(power, level)
+
+        for j in range(1, steps + 1):
+            if len(details) < j:
+                details.append(list())
+            details[j - 1].append(slice(offset + (1 << (power - j)), offset + (1 << (power - j + 1))))
+
+        approximation.append(slice(offset, offset + (1 << (power - steps))))
+        offset += 1 << power
+
+    return approximation, details
+
+
+def median(data, overwrite=False):
+    """
+    Median by selection using np.partition, runs in O(n) instead of
+    sorting the data. If overwrite the data is partitioned in place
+    """
+    data = np.asarray(data).ravel()
+    if not overwrite:
+        data = data.copy()
+
+    half = len(data) >> 1
+    data.partition(half)
+
+    if len(data) % 2:
+        return data[half]
+
+    return (data[:half].max() + data[half]) / 2.
 
 
 def mad(data):
     """
     Median Absolute Deviation: a "Robust" version of standard deviation.
-    Indices variability of the sample.
+    Indices variability of the sample. Both the medians are selections
+    over a single working copy of the data.
     https://en.wikipedia.org/wiki/Median_absolute_deviation
     """
-    data = np.ma.array(data).compressed()
-    med = np.median(data)
-    return np.median(np.abs(data - med))
+    if np.ma.isMaskedArray(data):
+        data = data.compressed()
+
+    data = np.array(data, dtype=np.float64).ravel()
+    med = median(data, overwrite=True)
+
+    np.subtract(data, med, out=data)
+    np.absolute(data, out=data)
+
+    return median(data, overwrite=True)
 
 
 def snr(data, axis=0, ddof=0):